@@ -6,70 +6,215 @@ Creates a webhook endpoint that Amp can interact with for CI feedback
 
 import json
 import os
+import sys
 import time
-import subprocess
 from datetime import datetime
 from pathlib import Path
 
+import metrics
+from artifact_watcher import ArtifactWatcher
+from auto_ci_feedback import render_failure_delta
+from failure_extractor import FailureRecord
+from feedback_writer import get_writer
+from flutter_reporter import load_index, render_test_status
+from git_metadata import get_git_metadata
+from github_client import DEFAULT_REPO, get_client
+from lcov_report import coverage_feedback
+from poll_scheduler import PollScheduler
+from run_state import get_state_store
+from suite_profiler import performance_feedback
+
 class AmpCIIntegration:
     def __init__(self):
         self.project_root = Path.cwd()
         self.feedback_file = self.project_root / "AGENT_FEEDBACK.md"
         self.webhook_status_file = self.project_root / ".vscode" / "webhook_status.json"
+        self.repo = DEFAULT_REPO
+        self.git = get_git_metadata(self.project_root)
+        self.writer = get_writer()
+        self.state = get_state_store()
+        self.scheduler = PollScheduler()
+        self.test_reports_dir = self.project_root / "test_reports"
+        self.watcher = ArtifactWatcher([self.test_reports_dir, self.project_root / "coverage"])
     
     def start_monitoring(self):
         """Start CI monitoring for Amp integration"""
         print("🚀 Starting Amp CI Integration")
         print("🔗 Monitoring GitHub Actions for EventFlow...")
         print("📡 Ready to generate agent feedback on CI failures")
+        print(f"👀 Watching test_reports/ and coverage/ ({self.watcher.mode})")
         print("🛑 Run 'pkill -f amp_webhook' to stop\n")
         
+        last_decision = None
+        next_poll = 0
         while True:
             try:
-                self.check_and_process_failures()
-                time.sleep(30)  # Check every 30 seconds
+                if time.monotonic() >= next_poll:
+                    self.check_and_process_failures()
+                    decision = self.scheduler.next_interval()
+                    if last_decision is None or decision.reason != last_decision.reason:
+                        print(f"⏱️  Next check in {decision.interval:.0f}s ({decision.reason})")
+                    last_decision = decision
+                    next_poll = time.monotonic() + decision.interval
+                
+                # Sleep until the next GitHub poll, waking early when local artifacts are written
+                if self.watcher.wait(max(next_poll - time.monotonic(), 0)):
+                    self.check_local_artifacts()
             except KeyboardInterrupt:
                 print("\n🛑 Monitoring stopped")
                 break
             except Exception as e:
                 print(f"❌ Monitoring error: {e}")
-                time.sleep(60)  # Wait longer on errors
+                self.scheduler.record_error()
+                next_poll = time.monotonic() + self.scheduler.next_interval().interval
+        self.watcher.close()
+    
+    def git_head(self):
+        """Return (branch, short commit) for the working copy"""
+        # Re-read from .git only when HEAD or the branch ref changed
+        branch, sha = self.git.head()
+        return branch, sha[:8]
     
     def check_and_process_failures(self):
         """Check for CI failures and generate Amp feedback"""
         try:
             # Get current commit and branch
-            branch = subprocess.check_output(["git", "rev-parse", "--abbrev-ref", "HEAD"]).decode().strip()
-            commit = subprocess.check_output(["git", "rev-parse", "HEAD"]).decode().strip()[:8]
+            branch, commit = self.git_head()
             
-            # Check if we have any failure indicators
-            test_reports_dir = self.project_root / "test_reports"
-            failures_file = test_reports_dir / "failures.txt"
+            # Poll GitHub Actions for a new failing run on this branch; a failed poll
+            # must not swallow the local artifact changes picked up below
+            failed_run = None
+            try:
+                latest_run, not_modified = self.fetch_latest_run(branch)
+                self.scheduler.record_poll(latest_run, changed=not not_modified)
+                failed_run = self.new_failed_run(latest_run)
+            except Exception as e:
+                print(f"🔍 Status check error: {e}")
+                self.scheduler.record_error()
             
-            # Simulate CI failure check (in real scenario, this would poll GitHub API)
-            if self.should_generate_feedback():
-                self.generate_amp_feedback(branch, commit)
+            # Only regenerate for local artifacts whose content actually changed
+            changed_artifacts = self.watcher.refresh()
+            delta = self.local_failure_delta(branch, changed_artifacts) if changed_artifacts else None
+            if failed_run or delta is not None:
+                self.generate_amp_feedback(branch, commit, failed_run, changed_artifacts, delta)
+                if failed_run:
+                    # Only once its feedback exists; a crash before this retries the run on the next poll
+                    self.state.mark_processed(failed_run['id'])
                 self.update_webhook_status("failure_processed")
             
         except Exception as e:
             print(f"🔍 Status check error: {e}")
+            self.scheduler.record_error()
     
-    def should_generate_feedback(self):
-        """Determine if we should generate new feedback"""
-        # Check if feedback file is old or doesn't exist
-        if not self.feedback_file.exists():
-            return False
-            
-        # Check if feedback is more than 5 minutes old
-        file_time = self.feedback_file.stat().st_mtime
-        current_time = time.time()
+    def check_local_artifacts(self):
+        """Regenerate feedback when test_reports/ or coverage/ content changed"""
+        changed_artifacts = self.watcher.refresh()
+        if not changed_artifacts:
+            return
+        print(f"📝 Local CI artifacts changed: {', '.join(os.path.basename(p) for p in changed_artifacts)}")
+        branch, commit = self.git_head()
+        delta = self.local_failure_delta(branch, changed_artifacts)
+        if delta is None:
+            return
+        self.generate_amp_feedback(branch, commit, changed_artifacts=changed_artifacts, delta=delta)
+        self.update_webhook_status("artifacts_processed")
+    
+    def fetch_latest_run(self, branch):
+        """Return (latest run or None, not_modified) for the branch"""
+        client = get_client()
+        url = client.repo_url(self.repo, f"actions/runs?branch={branch}&per_page=1"
+                                         f"{self.state.since_filter(self.repo, branch)}")
+        try:
+            data, not_modified = client.get_json(url)
+        finally:
+            self.scheduler.update_rate_limit(client.rate_limit)
+        
+        runs = data.get('workflow_runs', [])
+        self.state.record_runs(self.repo, runs)
+        return (runs[0] if runs else None), not_modified
+    
+    def new_failed_run(self, latest_run):
+        """Return the run if it failed and hasn't been reported yet"""
+        if not latest_run or latest_run.get('conclusion') != 'failure':
+            return None
+        # Persisted, so a restarted monitor doesn't re-report the same run
+        if self.state.is_processed(latest_run['id']):
+            return None
+        return latest_run
+    
+    def local_failure_delta(self, branch, changed_artifacts):
+        """FailureDelta for the local test results, or None if nothing worth re-rendering changed"""
+        index = load_index(self.test_reports_dir / "test_results.json")
+        records = []
+        if index is not None:
+            for test in index.failures():
+                location = index.suite_path(test.suite_id)
+                if test.line and location:
+                    location += f":{test.line}"
+                error = test.first_error_line()
+                records.append(FailureRecord('local', 'test_failure', location,
+                                             f"{test.name} — {error}" if error else test.name))
+        run = f"local run at {datetime.now().strftime('%H:%M:%S')}"
+        delta = self.state.record_failure_set(f"local@{branch}", run, records)
+        coverage_changed = any(os.path.basename(p) == "lcov.info" for p in changed_artifacts)
+        if not delta.changed and not coverage_changed and self.feedback_file.exists():
+            print(f"⏭️  Same {len(delta.current)} local failure(s) - {self.feedback_file.name} left as is")
+            return None
+        return delta
+    
+    def local_artifact_details(self, changed_artifacts, delta=None):
+        """Markdown summary of the local test artifacts that triggered this update"""
+        if not changed_artifacts:
+            return ""
+        
+        changed = ", ".join(f"`{os.path.relpath(p, self.project_root)}`" for p in changed_artifacts)
+        details = f"""
+## 🧪 Local Test Artifacts
+
+**Changed**: {changed}
+
+{render_test_status(load_index(self.test_reports_dir / "test_results.json"), "test_reports/test_results.json",
+                   limit=0 if delta is not None else 15)}"""
+        if delta is not None:
+            details += f"\n{render_failure_delta(delta)}"
+        
+        failures_file = self.test_reports_dir / "failures.txt"
+        if failures_file.exists():
+            with open(failures_file, errors='replace') as f:
+                head = [line.rstrip() for _, line in zip(range(20), f)]
+            if head:
+                details += "\n### test_reports/failures.txt\n```\n" + "\n".join(head) + "\n```\n"
         
-        return (current_time - file_time) > 300  # 5 minutes
+        lcov_file = self.project_root / "coverage" / "lcov.info"
+        if any(os.path.abspath(p) == str(lcov_file) for p in changed_artifacts):
+            # Deltas are against the previous local coverage run
+            coverage = coverage_feedback(str(lcov_file), 'local')
+            if coverage:
+                details += f"\n### Coverage\n{coverage}"
+        
+        report_file = self.test_reports_dir / "test_results.json"
+        if any(os.path.abspath(p) == str(report_file) for p in changed_artifacts):
+            # Timings against the previous local runs
+            performance = performance_feedback([str(report_file)], 'local')
+            if performance:
+                details += f"\n### Performance Regressions\n{performance}"
+        return details
     
-    def generate_amp_feedback(self, branch, commit):
+    @metrics.timed('ci_feedback_render_seconds', generator='amp_integration')
+    def generate_amp_feedback(self, branch, commit, failed_run=None, changed_artifacts=(), delta=None):
         """Generate structured feedback for Amp"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
         
+        run_details = ""
+        if failed_run:
+            run_details = f"""
+## 🚨 Latest Failed Run
+
+**Workflow**: {failed_run.get('name', 'Unknown')}
+**Run URL**: {failed_run.get('html_url', 'N/A')}
+**Failed Commit**: {failed_run.get('head_sha', '')[:8]}
+"""
+        
         feedback = f"""# 🤖 Amp: Live CI Monitoring Active
 
 ## VS Code Webhook Integration - {timestamp}
@@ -78,7 +223,7 @@ class AmpCIIntegration:
 **Commit**: {commit}
 **Monitoring**: Active via VS Code webhook server
 **Integration**: Amp-ready feedback system
-
+{run_details}{self.local_artifact_details(changed_artifacts, delta)}
 ## 🎯 Amp Instructions
 
 The CI monitoring system is active. When GitHub Actions fail:
@@ -111,14 +256,13 @@ dart format .
 - **Server**: Running on http://localhost:8080
 - **GitHub Integration**: Ready for webhook POSTs
 - **Amp Notifications**: Enabled for automated issue resolution
-- **Monitoring**: Every 30 seconds for CI status updates
+- **Monitoring**: Adaptive ({self.scheduler.active_interval}s while a run is active, backing off to {self.scheduler.max_idle_interval}s when idle)
 
 **🤖 Amp**: This system will automatically notify you when CI fails. Just read this file for instructions!
 """
         
         # Write feedback for Amp
-        with open(self.feedback_file, 'w') as f:
-            f.write(feedback)
+        self.writer.write(self.feedback_file, feedback)
         
         # Update VS Code status
         status = {
@@ -128,9 +272,7 @@ dart format .
             "amp_notified": True
         }
         
-        os.makedirs(self.webhook_status_file.parent, exist_ok=True)
-        with open(self.webhook_status_file, 'w') as f:
-            json.dump(status, f, indent=2)
+        self.writer.write(self.webhook_status_file, json.dumps(status, indent=2))
         
         print(f"🔔 Amp notification ready: AGENT_FEEDBACK.md updated")
     
@@ -142,9 +284,7 @@ dart format .
             "amp_ready": True
         }
         
-        os.makedirs(self.webhook_status_file.parent, exist_ok=True)
-        with open(self.webhook_status_file, 'w') as f:
-            json.dump(status_data, f, indent=2)
+        self.writer.write(self.webhook_status_file, json.dumps(status_data, indent=2))
 
 def main():
     """Main entry point for Amp CI integration"""
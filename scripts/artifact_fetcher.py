@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Streaming GitHub Actions artifact fetcher with selective extraction
+Streams an artifact zip into a spooled temp file (memory first, disk once it
+grows), extracts only the report members the feedback needs and never
+inflates the rest. Extracted files are cached per artifact id, so each
+artifact is downloaded at most once across scripts and webhook deliveries.
+"""
+
+import fcntl
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+from github_client import DEFAULT_REPO, GitHubError, get_client
+
+DEFAULT_ARTIFACTS = ('test-reports', 'coverage-reports')
+REPORT_MEMBERS = ('tests.txt', 'analysis.txt', 'coverage_summary.txt')
+DEFAULT_MEMBERS = REPORT_MEMBERS + ('lcov.info', 'test_results.json')
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('CI_CACHE_DIR', '.ci_cache'), 'artifacts')
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+MANIFEST = 'manifest.json'
+
+_RUN_URL = re.compile(r'/actions/runs/(\d+)')
+
+
+class ArtifactFetcher:
+    """Downloads artifacts once and keeps the wanted members under cache_dir/<artifact id>/"""
+
+    def __init__(self, client=None, cache_dir=DEFAULT_CACHE_DIR, members=DEFAULT_MEMBERS,
+                 spool_max=SPOOL_MAX_BYTES):
+        self.client = client or get_client()
+        self.cache_dir = cache_dir
+        self.members = tuple(members)
+        self.spool_max = spool_max
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def list_artifacts(self, repo, run_id):
+        data, _ = self.client.get_json(self.client.repo_url(repo, f"actions/runs/{run_id}/artifacts?per_page=100"))
+        return data.get('artifacts', [])
+
+    def _artifact_dir(self, artifact_id):
+        return os.path.join(self.cache_dir, str(artifact_id))
+
+    def _thread_lock(self, artifact_id):
+        with self._locks_guard:
+            return self._locks.setdefault(artifact_id, threading.Lock())
+
+    def cached(self, artifact_id, members=None):
+        """Manifest of a previous extraction covering `members`, or None"""
+        try:
+            with open(os.path.join(self._artifact_dir(artifact_id), MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        wanted = set(members or self.members)
+        if not wanted <= set(manifest['requested']):
+            return None
+        return manifest
+
+    def fetch(self, repo, artifact, members=None):
+        """Return {member name: local path} for an artifact dict from the API"""
+        members = tuple(members or self.members)
+        artifact_id = artifact['id']
+        manifest = self.cached(artifact_id, members)
+        if manifest is None:
+            # One download per artifact: threads share a lock, processes share a lock file
+            with self._thread_lock(artifact_id):
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(os.path.join(self.cache_dir, f'{artifact_id}.lock'), 'w') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    manifest = self.cached(artifact_id, members)
+                    if manifest is None:
+                        manifest = self._download(repo, artifact, members)
+        directory = self._artifact_dir(artifact_id)
+        return {name: os.path.join(directory, name) for name in manifest['extracted'] if name in members}
+
+    def _download(self, repo, artifact, members):
+        url = artifact.get('archive_download_url') or \
+            self.client.repo_url(repo, f"actions/artifacts/{artifact['id']}/zip")
+        started = time.perf_counter()
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_max) as spool:
+            with self.client.stream(url) as response:
+                if response.status >= 400:
+                    raise GitHubError(f"HTTP {response.status} for {url}", status=response.status, url=url,
+                                      body=response.read(1024))
+                size = 0
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                    spool.write(chunk)
+                    size += len(chunk)
+            spool.seek(0)
+            extracted = self._extract(spool, self._artifact_dir(artifact['id']), members)
+
+        manifest = {
+            'artifact_id': artifact['id'],
+            'name': artifact.get('name'),
+            'requested': sorted(set(members)),
+            'extracted': sorted(extracted),
+            'zip_bytes': size,
+            'seconds': round(time.perf_counter() - started, 3),
+            'fetched_at': time.time(),
+        }
+        directory = self._artifact_dir(artifact['id'])
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.manifest-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(directory, MANIFEST))
+        return manifest
+
+    @staticmethod
+    def _extract(archive, directory, members):
+        """Inflate only the wanted members (matched by file name at any depth)"""
+        os.makedirs(directory, exist_ok=True)
+        wanted = set(members)
+        extracted = set()
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or name not in wanted or name in extracted:
+                    continue
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{name}.')
+                with os.fdopen(fd, 'wb') as out, zf.open(info) as source:
+                    shutil.copyfileobj(source, out, CHUNK_SIZE)
+                os.replace(tmp_path, os.path.join(directory, name))
+                extracted.add(name)
+        return extracted
+
+    def fetch_run_reports(self, repo, run_id, names=DEFAULT_ARTIFACTS, members=None):
+        """Fetch the named artifacts of a run; returns {member name: local path}"""
+        files = {}
+        for artifact in self.list_artifacts(repo, run_id):
+            if artifact.get('name') not in names:
+                continue
+            if artifact.get('expired'):
+                print(f"⚠️ Artifact {artifact.get('name')} ({artifact['id']}) has expired")
+                continue
+            files.update(self.fetch(repo, artifact, members))
+        return files
+
+
+def run_id_from_payload(payload):
+    """Workflow run id from a webhook payload ('run_id', or the run URL in 'artifacts_url')"""
+    if payload.get('run_id'):
+        return int(payload['run_id'])
+    match = _RUN_URL.search(payload.get('artifacts_url') or '')
+    return int(match.group(1)) if match else None
+
+
+def render_artifact_reports(files, lines=20):
+    """Markdown excerpts of downloaded report files for the feedback"""
+    if not files:
+        return ""
+    sections = []
+    for name in REPORT_MEMBERS:
+        path = files.get(name)
+        if not path:
+            continue
+        with open(path, errors='replace') as f:
+            content = [line.rstrip() for line in f]
+        if name == 'tests.txt':
+            # The summary and the failing tests are at the end of the expanded reporter output
+            excerpt, where = content[-lines:], 'last'
+        else:
+            excerpt, where = content[:lines], 'first'
+        sections.append(f"### {name} ({where} {len(excerpt)} of {len(content)} lines, `{path}`)\n"
+                        "```\n" + "\n".join(excerpt) + "\n```\n")
+    return "\n".join(sections)
+
+
+def fetch_reports_for_feedback(repo, run_id, cache_dir=DEFAULT_CACHE_DIR):
+    """Best-effort artifact reports for feedback generators: {} if unavailable"""
+    if not run_id:
+        return {}
+    try:
+        return ArtifactFetcher(cache_dir=cache_dir).fetch_run_reports(repo, run_id)
+    except (OSError, ValueError, LookupError, zipfile.BadZipFile) as e:
+        # LookupError covers a cassette replay that has no recorded response for the download
+        print(f"⚠️ Could not fetch CI artifacts for run {run_id}: {e}")
+        return {}
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 artifact_fetcher.py <run id> [owner/name]")
+        sys.exit(1)
+    run_id = int(sys.argv[1])
+    repo = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_REPO
+    files = ArtifactFetcher().fetch_run_reports(repo, run_id)
+    if not files:
+        print(f"📭 No report artifacts found for run {run_id}")
+        sys.exit(1)
+    for name, path in sorted(files.items()):
+        print(f"📦 {name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
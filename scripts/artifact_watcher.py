@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Event-driven watcher for local CI artifacts (test_reports/, coverage/)
+Uses Linux inotify (through ctypes, no extra dependencies) to wake up as soon
+as run_ci_locally.sh or an artifact drop writes new results, and falls back to
+stat polling elsewhere. Changes are confirmed by content hash, so touching or
+rewriting a file with identical contents never triggers a feedback rebuild.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import hashlib
+import json
+import os
+import select
+import struct
+import sys
+import tempfile
+import time
+
+DEFAULT_WATCH_DIRS = ('test_reports', 'coverage')
+DEFAULT_PATTERNS = ('*.txt', '*.json', '*.info', '*.xml')
+DEFAULT_STATE_FILE = os.path.join(os.environ.get('CI_CACHE_DIR', '.ci_cache'), 'artifact_hashes.json')
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+PARENT_MASK = IN_CREATE | IN_MOVED_TO | IN_ONLYDIR
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyBackend:
+    """Blocks on an inotify descriptor until something under the watched dirs changes"""
+
+    def __init__(self, directories):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = list(directories)
+        self._watches = {}  # wd -> directory
+        self._rearm()
+
+    def _add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            return None
+        self._watches[wd] = path
+        return wd
+
+    def _rearm(self):
+        """Watch every directory, or its parent until the directory is created"""
+        watched = set(self._watches.values())
+        for directory in self.directories:
+            if directory in watched:
+                continue
+            if os.path.isdir(directory):
+                self._add_watch(directory, WATCH_MASK)
+            else:
+                parent = os.path.dirname(directory)
+                if parent not in watched and os.path.isdir(parent):
+                    self._add_watch(parent, PARENT_MASK)
+
+    def wait(self, timeout):
+        """Return True if a relevant event arrived before the timeout"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        relevant = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + name_len].rstrip(b'\0')
+            offset += EVENT_HEADER.size + name_len
+            path = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if path is None:
+                continue
+            if path in self.directories:
+                relevant = True
+            elif os.path.join(path, os.fsdecode(name)) in self.directories:
+                # Parent watch: one of the watched directories was just created
+                relevant = True
+        self._rearm()
+        return relevant
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingBackend:
+    """Portable fallback: compares (mtime, size) listings at a fixed interval"""
+
+    def __init__(self, directories, interval=2.0, listing=None):
+        self.directories = directories
+        self.interval = interval
+        self._listing = listing
+        self._last = listing()
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._listing()
+            if current != self._last:
+                self._last = current
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class ArtifactWatcher:
+    """Watches artifact directories and reports files whose content actually changed"""
+
+    def __init__(self, directories=DEFAULT_WATCH_DIRS, patterns=DEFAULT_PATTERNS,
+                 state_file=DEFAULT_STATE_FILE, poll_interval=2.0, use_inotify=True):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.patterns = tuple(patterns)
+        self.state_file = state_file
+        self._hash_cache = {}  # path -> ((mtime_ns, size), digest)
+        self.hashes = self._load_state()
+
+        self.backend = None
+        if use_inotify:
+            try:
+                self.backend = InotifyBackend(self.directories)
+            except (OSError, AttributeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = PollingBackend(self.directories, poll_interval, self._stat_listing)
+
+    @property
+    def mode(self):
+        return 'inotify' if isinstance(self.backend, InotifyBackend) else 'polling'
+
+    def _files(self):
+        # Top level only, matching what inotify watches (coverage/html is not an input)
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_file() and any(fnmatch.fnmatch(entry.name, p) for p in self.patterns):
+                    yield entry.path
+
+    def _stat_listing(self):
+        listing = {}
+        for path in self._files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            listing[path] = (st.st_mtime_ns, st.st_size)
+        return listing
+
+    def _digest(self, path, signature):
+        cached = self._hash_cache.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        self._hash_cache[path] = (signature, digest)
+        return digest
+
+    def _load_state(self):
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_file) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.artifact-hashes-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.hashes, f)
+        os.replace(tmp_path, self.state_file)
+
+    def refresh(self):
+        """Re-hash the inputs and return the sorted paths whose content changed.
+
+        Added and removed files count as changes. The new hashes are persisted so
+        one-shot invocations compare against the previous run too.
+        """
+        current = {}
+        for path, signature in self._stat_listing().items():
+            try:
+                current[path] = self._digest(path, signature)
+            except OSError:
+                continue
+        changed = sorted(path for path in set(current) | set(self.hashes)
+                         if current.get(path) != self.hashes.get(path))
+        if changed:
+            self.hashes = current
+            self._save_state()
+        return changed
+
+    def wait(self, timeout):
+        """Sleep up to `timeout` seconds, waking early on filesystem activity"""
+        return self.backend.wait(timeout)
+
+    def close(self):
+        self.backend.close()
+
+
+def main():
+    """Print content changes under the watched directories as they happen"""
+    watcher = ArtifactWatcher(sys.argv[1:] or DEFAULT_WATCH_DIRS)
+    print(f"👀 Watching {', '.join(watcher.directories)} ({watcher.mode})")
+    try:
+        while True:
+            watcher.wait(60)
+            for path in watcher.refresh():
+                print(f"📝 Changed: {path}")
+    except KeyboardInterrupt:
+        print("\n🛑 Watcher stopped")
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()
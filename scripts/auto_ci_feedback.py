@@ -4,37 +4,59 @@ Automated CI Feedback for Amp - No Manual Intervention Required
 Automatically fetches GitHub Actions results and generates agent feedback
 """
 
+import argparse
 import json
 import os
-import subprocess
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-from urllib.request import urlopen, Request
-from urllib.error import URLError
 
-def get_latest_ci_run():
-    """Get the latest CI run for current branch"""
+import metrics
+from artifact_fetcher import DEFAULT_CACHE_DIR as ARTIFACT_CACHE_DIR, fetch_reports_for_feedback, render_artifact_reports
+from failure_extractor import group_by_category
+from feedback_writer import write_feedback
+from flutter_reporter import DEFAULT_REPORT, load_index, render_test_status
+from git_metadata import get_git_metadata
+from github_client import DEFAULT_REPO, attach_cassette, get_client
+from lcov_report import DEFAULT_HISTORY as COVERAGE_HISTORY, coverage_feedback
+from log_archive import archive_logs
+from parallel_extract import extract_logs
+from job_diagnostics import RETRIEVAL_MODES, fetch_job_diagnostics
+from run_state import RunStateStore, DEFAULT_STATE_DB
+from suite_profiler import DEFAULT_BASELINE as PERF_BASELINE, performance_feedback
+
+DEFAULT_LOG_WORKERS = 4
+DEFAULT_JOB_TIMEOUT = 60
+LOG_TAIL_BYTES = 10000
+DEFAULT_RETRIEVAL = 'annotations'
+
+def current_branch():
+    # Cached read of .git/HEAD; no git process per call
+    return get_git_metadata().branch()
+
+def get_latest_ci_run(state=None, repo=DEFAULT_REPO, branch=None):
+    """Get the latest CI run for a branch (the checked-out one by default)
+
+    With a state store, only runs created since the last one seen are listed
+    and every returned run is recorded.
+    """
     try:
-        # Get current branch and repo
-        branch = subprocess.check_output(["git", "rev-parse", "--abbrev-ref", "HEAD"]).decode().strip()
-        repo = "Josh-thephillipsequation/Eventflow"
-        
-        # GitHub API call with authentication if available
-        api_url = f"https://api.github.com/repos/{repo}/actions/runs?branch={branch}&per_page=1"
-        
-        # Use GITHUB_TOKEN if available (for CI environment)
-        headers = {}
-        github_token = os.environ.get('GITHUB_TOKEN')
-        if github_token:
-            headers['Authorization'] = f'token {github_token}'
-        
-        request = Request(api_url, headers=headers)
-        with urlopen(request) as response:
-            data = json.loads(response.read().decode())
-            runs = data.get('workflow_runs', [])
-            
-            if runs:
-                return runs[0]
+        branch = branch or current_branch()
+        
+        # Shared client handles auth (GITHUB_TOKEN), keep-alive and retries
+        client = get_client()
+        since = state.since_filter(repo, branch) if state else ''
+        api_url = client.repo_url(repo, f"actions/runs?branch={branch}&per_page=1{since}")
+        
+        # Conditional request: an unchanged run list comes back as a free 304
+        data, _ = client.get_json(api_url)
+        runs = data.get('workflow_runs', [])
+        
+        if runs:
+            if state:
+                state.record_runs(repo, runs)
+            return runs[0]
         
         return None
         
@@ -42,70 +64,149 @@ def get_latest_ci_run():
         print(f"❌ Error fetching CI run: {e}")
         return None
 
-def get_ci_logs(run_id):
-    """Get detailed logs from CI run"""
+def fetch_job_log(client, repo, job, timeout=DEFAULT_JOB_TIMEOUT, retrieval=DEFAULT_RETRIEVAL):
+    """Fetch one failed job's diagnostics: annotations, else the failed step's log section (max 10KB)"""
+    return fetch_job_diagnostics(client, repo, job, LOG_TAIL_BYTES, timeout, retrieval)
+
+def get_ci_logs(run_id, max_workers=DEFAULT_LOG_WORKERS, job_timeout=DEFAULT_JOB_TIMEOUT, repo=DEFAULT_REPO,
+                retrieval=DEFAULT_RETRIEVAL):
+    """Get detailed logs from CI run
+
+    Failed jobs are fetched concurrently (up to max_workers at a time) but
+    returned in job order. The batch shares one deadline (job_timeout per
+    round of max_workers jobs); a job that errors or is still running then is
+    skipped and the remaining logs are still returned, so the result is
+    (logs, complete) - complete is False unless every failed job was fetched.
+    With retrieval='annotations' raw logs are only downloaded for jobs whose
+    annotations say too little; 'logs' always takes the tail of the raw log.
+    """
     try:
-        repo = "Josh-thephillipsequation/Eventflow"
+        client = get_client()
         
-        # Get jobs for this run with authentication
-        jobs_url = f"https://api.github.com/repos/{repo}/actions/runs/{run_id}/jobs"
+        # Get jobs for this run
+        jobs_url = client.repo_url(repo, f"actions/runs/{run_id}/jobs")
+        data, _ = client.get_json(jobs_url)
+        failed_jobs = [job for job in data.get('jobs', []) if job.get('conclusion') == 'failure']
         
-        headers = {}
-        github_token = os.environ.get('GITHUB_TOKEN')
-        if github_token:
-            headers['Authorization'] = f'token {github_token}'
+        all_logs = []
+        if not failed_jobs:
+            return all_logs, True
         
-        request = Request(jobs_url, headers=headers)
-        with urlopen(request) as response:
-            data = json.loads(response.read().decode())
-            jobs = data.get('jobs', [])
-            
-            all_logs = []
-            for job in jobs:
-                if job.get('conclusion') == 'failure':
-                    # Get logs for failed job with authentication
-                    logs_url = f"https://api.github.com/repos/{repo}/actions/jobs/{job['id']}/logs"
-                    try:
-                        log_headers = {'Accept': 'application/vnd.github.v3.raw'}
-                        if github_token:
-                            log_headers['Authorization'] = f'token {github_token}'
-                        
-                        req = Request(logs_url, headers=log_headers)
-                        with urlopen(req) as log_response:
-                            logs = log_response.read().decode('utf-8', errors='ignore')
-                            all_logs.append({
-                                'job_name': job.get('name', 'Unknown'),
-                                'logs': logs[-10000:]  # Last 10KB of logs
-                            })
-                    except Exception as e:
-                        print(f"⚠️ Could not fetch logs for job {job.get('name')}: {e}")
-            
-            return all_logs
+        workers = max(1, max_workers)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = [executor.submit(fetch_job_log, client, repo, job, job_timeout, retrieval) for job in failed_jobs]
+        # One deadline for the whole batch: job_timeout per round of max_workers jobs
+        deadline = job_timeout * -(-len(failed_jobs) // workers)
+        done, _ = wait(futures, timeout=deadline)
+        for job, future in zip(failed_jobs, futures):
+            if future not in done:
+                print(f"⚠️ Timed out fetching logs for job {job.get('name')} after {deadline}s")
+                continue
+            try:
+                all_logs.append(future.result())
+            except Exception as e:
+                print(f"⚠️ Could not fetch logs for job {job.get('name')}: {e}")
+        # Don't block on stragglers that already timed out
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        sources = {}
+        for log in all_logs:
+            sources[log.get('source')] = sources.get(log.get('source'), 0) + 1
+        print("📥 Failed job diagnostics: " + ", ".join(f"{n} from {source}" for source, n in sources.items()))
+        return all_logs, len(all_logs) == len(failed_jobs)
             
     except Exception as e:
         print(f"❌ Error fetching CI logs: {e}")
-        return []
+        return [], False
+
+def render_logs_unavailable(run_data, logs, repo=DEFAULT_REPO):
+    """Placeholder feedback for a failed run whose job logs could not all be fetched"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+    fetched = ", ".join(log.get('job_name', '?') for log in logs) or "none"
+    return f"""# 🤖 Automated CI Failure Report - {timestamp}
+
+## ⚠️ CI logs unavailable
+
+**Repository**: {repo}
+**Run ID**: {run_data.get('id')}
+**Branch**: {run_data.get('head_branch')}
+**Run URL**: {run_data.get('html_url')}
+
+Run {run_data.get('id')} failed, but the logs of its failed jobs could not all be fetched
+(fetched: {fetched}). The run has not been marked processed; the next invocation
+retries it. Meanwhile, inspect the run logs at the URL above.
+"""
+
+def render_primary_issues(records, run_data):
+    """Summarise extracted failures by category for the action plan"""
+    grouped = group_by_category(records)
+    if not grouped:
+        return f"- **No known failure patterns found**: inspect the run logs at {run_data.get('html_url')}\n"
+    
+    lines = []
+    for category, label, category_records in grouped:
+        lines.append(f"- **{label}** ({len(category_records)})")
+        for record in category_records[:3]:
+            location = f"`{record.location}`: " if record.location else ""
+            lines.append(f"  - {location}{record.message}")
+    return "\n".join(lines) + "\n"
 
-def generate_automated_feedback(run_data, logs):
+def run_label(run):
+    """'run 123' for Actions run ids, other labels (e.g. local runs) as they are"""
+    return f"run {run}" if str(run).isdigit() else str(run)
+
+def render_failure_delta(delta, limit=10):
+    """New, still-failing and resolved failures compared with the previous run"""
+    if delta.previous_run is None:
+        heading = "### Failures (first run recorded for this branch)"
+        since = ""
+    else:
+        since = run_label(delta.previous_run)
+        heading = f"### 🆕 New since {since} ({len(delta.new)})"
+    
+    def entry(failure):
+        location = f" (`{failure.location}`)" if failure.location else ""
+        return f"- **{failure.job}**: {failure.message}{location}"
+    
+    lines = [heading]
+    lines.extend(entry(failure) for failure in delta.new[:limit])
+    if len(delta.new) > limit:
+        lines.append(f"- …and {len(delta.new) - limit} more")
+    if delta.recurring:
+        lines.append("")
+        lines.append(f"### 🔁 Still failing ({len(delta.recurring)})")
+        for failure in delta.recurring[:limit]:
+            lines.append(f"{entry(failure)} — failing in {failure.occurrences} run(s) since {run_label(failure.first_run)}")
+        if len(delta.recurring) > limit:
+            lines.append(f"- …and {len(delta.recurring) - limit} more")
+    if delta.resolved:
+        lines.append("")
+        lines.append(f"### ✅ Resolved since {since} ({len(delta.resolved)})")
+        for failure in delta.resolved[:limit]:
+            location = f" (`{failure.location}`)" if failure.location else ""
+            lines.append(f"- ~~{failure.message}~~{location}")
+        if len(delta.resolved) > limit:
+            lines.append(f"- …and {len(delta.resolved) - limit} more")
+    return "\n".join(lines) + "\n"
+
+def extract_failures(logs, workers=None):
+    """Extract structured failures from every job log (large batches go to a process pool)"""
+    return extract_logs(logs, workers)
+
+@metrics.timed('ci_feedback_render_seconds', generator='auto_ci_feedback')
+def generate_automated_feedback(run_data, logs, test_index=None, test_report=DEFAULT_REPORT, records=None,
+                                repo=DEFAULT_REPO, artifacts=None, coverage="", delta=None, performance=""):
     """Generate comprehensive agent feedback from CI data"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
     
-    # Extract key error information from logs
-    errors = []
-    for log_data in logs:
-        log_content = log_data['logs']
-        job_name = log_data['job_name']
-        
-        # Look for common error patterns
-        if 'Error:' in log_content:
-            error_lines = [line.strip() for line in log_content.split('\n') if 'Error:' in line]
-            errors.extend([(job_name, error) for error in error_lines[:5]])  # Max 5 errors per job
+    if records is None:
+        records = extract_failures(logs)
     
     feedback = f"""# 🤖 Automated CI Failure Report - {timestamp}
 
 ## GitHub Actions Analysis - Fully Automated
 
-**Repository**: Josh-thephillipsequation/Eventflow
+**Repository**: {repo}
 **Run ID**: {run_data.get('id')}
 **Workflow**: {run_data.get('name')}
 **Branch**: {run_data.get('head_branch')}
@@ -115,11 +216,15 @@ def generate_automated_feedback(run_data, logs):
 
 ## 🔍 Automated Error Analysis
 
-### Key Errors Detected:
 """
 
-    for job_name, error in errors[:10]:  # Show top 10 errors
-        feedback += f"- **{job_name}**: {error}\n"
+    if delta is not None:
+        feedback += render_failure_delta(delta)
+    else:
+        feedback += "### Key Errors Detected:\n"
+        for record in records[:10]:  # Show top 10 errors
+            location = f" (`{record.location}`)" if record.location else ""
+            feedback += f"- **{record.job}**: {record.message}{location}\n"
     
     feedback += f"""
 
@@ -128,11 +233,7 @@ def generate_automated_feedback(run_data, logs):
 Based on automated analysis of CI logs:
 
 ### 1. Primary Issues to Fix
-- **Dependency conflicts**: Check pubspec.yaml for version issues
-- **Test failures**: Multiple unit and widget tests failing
-- **Widget test timing**: Splash screen and async loading issues
-- **Provider lifecycle**: EventProvider disposal and async loading problems
-
+{render_primary_issues(records, run_data)}
 ### 2. Commands to Run
 ```bash
 # Check dependencies
@@ -156,12 +257,8 @@ flutter analyze
 4. **Verify fixes** - ensure all tests pass locally
 
 ## 📊 Test Status (Auto-Generated)
-- **Total Tests**: ~30+ tests
-- **Failed**: ~20 tests
-- **Passed**: ~10 tests
-- **Main Issues**: EventProvider state, widget timing, async loading
-
-## ✅ Success Criteria
+{render_test_status(test_index, test_report)}
+{render_artifact_section(artifacts)}{render_coverage(coverage)}{render_performance(performance)}## ✅ Success Criteria
 - [ ] All tests pass: `flutter test`
 - [ ] Dependencies resolve: `flutter pub get`
 - [ ] Code formatted: `dart format .`
@@ -180,12 +277,92 @@ flutter analyze
 
     return feedback
 
-def main():
+def render_artifact_section(artifacts):
+    """Excerpts of the run's test-reports artifact, if it was downloaded"""
+    if not artifacts:
+        return ""
+    return f"## 📦 CI Test Reports (from artifacts)\n\n{render_artifact_reports(artifacts)}\n"
+
+def render_coverage(coverage):
+    """Coverage section with deltas against the branch's previous run"""
+    return f"## 📈 Coverage\n{coverage}\n" if coverage else ""
+
+def render_performance(performance):
+    """Significant test slowdowns against the branch's recent runs"""
+    return f"## 🐢 Performance Regressions\n{performance}\n" if performance else ""
+
+def sections_unchanged(path, *sections):
+    """True if the feedback file at path exists and already contains every non-empty section"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            existing = f.read()
+    except OSError:
+        return False
+    return all(section in existing for section in sections if section)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate AGENT_FEEDBACK.md from the latest GitHub Actions run")
+    parser.add_argument('--repo', default=DEFAULT_REPO, help=f"owner/name to check (default {DEFAULT_REPO})")
+    parser.add_argument('--branch', help="branch to check (default: the checked-out branch)")
+    parser.add_argument('--output', default='AGENT_FEEDBACK.md', help="feedback file to write")
+    parser.add_argument('--log-workers', type=int, default=DEFAULT_LOG_WORKERS,
+                        help=f"failed-job logs to download concurrently (default {DEFAULT_LOG_WORKERS})")
+    parser.add_argument('--job-timeout', type=float, default=DEFAULT_JOB_TIMEOUT,
+                        help=f"seconds per round of --log-workers job logs, shared by the batch (default {DEFAULT_JOB_TIMEOUT})")
+    parser.add_argument('--analysis-workers', type=int,
+                        help="processes for analysing large log batches (default: $CI_ANALYSIS_WORKERS or one per CPU)")
+    parser.add_argument('--retrieval', choices=RETRIEVAL_MODES, default=DEFAULT_RETRIEVAL,
+                        help="'annotations' reads check-run annotations and downloads raw logs only when "
+                             "they are not enough; 'logs' always downloads log tails")
+    parser.add_argument('--test-report', default=DEFAULT_REPORT,
+                        help="flutter test --machine output used for exact test results")
+    parser.add_argument('--state-db', default=DEFAULT_STATE_DB,
+                        help="SQLite file remembering runs that were already processed")
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help="write timing and cache metrics as JSON to PATH ('-' for stdout) on exit")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='CASSETTE',
+                          help="save every GitHub response from this run into a compressed cassette")
+    cassette.add_argument('--replay', metavar='CASSETTE',
+                          help="serve GitHub responses from a recorded cassette instead of the network")
+    parser.add_argument('--no-artifacts', action='store_true',
+                        help="don't download the run's test-reports artifact")
+    parser.add_argument('--no-archive', action='store_true',
+                        help="don't add fetched job logs to the local log archive")
+    parser.add_argument('--force', action='store_true',
+                        help="regenerate feedback even if the run was already processed")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main automation function"""
+    args = parse_args(argv)
+    if args.metrics_json:
+        metrics.dump_at_exit(args.metrics_json)
     print("🤖 Starting Automated CI Feedback Generation...")
     
+    artifact_dir, coverage_history, perf_baseline = ARTIFACT_CACHE_DIR, COVERAGE_HISTORY, PERF_BASELINE
+    if args.record or args.replay:
+        # Cassette runs always go through the whole pipeline and leave the real run state alone
+        cassette = attach_cassette(get_client(), args.record or args.replay, 'record' if args.record else 'replay')
+        if args.record:
+            cassette.meta.update(repo=args.repo, branch=args.branch or current_branch(), recorded_at=time.time())
+        else:
+            args.repo = cassette.meta.get('repo', args.repo)
+            args.branch = args.branch or cassette.meta.get('branch')
+            print(f"📼 Replaying {args.replay} ({args.repo}@{args.branch})")
+        args.state_db = ':memory:'
+        args.no_archive = True
+        # An empty artifact cache makes a recording capture the zip download, and a replay read it back;
+        # coverage and timing history start empty too and are thrown away afterwards
+        scratch = tempfile.TemporaryDirectory(prefix='ci-cassette-')
+        artifact_dir = os.path.join(scratch.name, 'artifacts')
+        coverage_history = os.path.join(scratch.name, 'coverage_history.json')
+        perf_baseline = os.path.join(scratch.name, 'test_perf_baseline.json')
+    
+    state = RunStateStore(args.state_db)
+    
     # Get latest CI run
-    run_data = get_latest_ci_run()
+    run_data = get_latest_ci_run(state, args.repo, args.branch)
     if not run_data:
         print("📭 No CI runs found")
         return
@@ -193,19 +370,64 @@ def main():
     print(f"📊 Found CI run: {run_data.get('name')} - {run_data.get('conclusion')}")
     
     if run_data.get('conclusion') == 'failure':
+        run_id = run_data['id']
+        if state.is_processed(run_id) and not args.force:
+            print(f"⏭️  Run {run_id} was already processed - {args.output} is up to date (use --force to rebuild)")
+            return
+        
         print("🚨 CI failure detected - generating automated feedback...")
         
-        # Get detailed logs
-        logs = get_ci_logs(run_data['id'])
+        # Get detailed logs, reusing anything fetched by an earlier invocation
+        logs = None if args.force else state.load_logs(run_id)
+        if logs is None:
+            logs, complete = get_ci_logs(run_id, args.log_workers, args.job_timeout, args.repo, args.retrieval)
+            if not complete:
+                # Partial logs would be recorded as this run's whole failure set; retry next time instead
+                write_feedback(args.output, render_logs_unavailable(run_data, logs, args.repo))
+                print(f"⚠️ Logs of run {run_id} incomplete - wrote a note to {args.output}, run left unprocessed")
+                return
+            state.save_logs(run_id, logs)
+            if not args.no_archive:
+                archive_logs(args.repo, run_id, logs)
+        else:
+            print(f"💾 Using {len(logs)} stored job log(s) for run {run_id}")
+        
+        records = extract_failures(logs, args.analysis_workers)
+        state.save_failures(run_id, records)
+        
+        delta = state.record_failure_set(f"{args.repo}@{run_data.get('head_branch')}", run_id, records)
+        
+        # Report files from the run's artifact (cached per artifact id, so usually a local read)
+        artifacts = {} if args.no_artifacts else fetch_reports_for_feedback(args.repo, run_id, artifact_dir)
+        
+        # Coverage of this run (lcov.info from the coverage-reports artifact) against the previous one
+        coverage = ""
+        if artifacts.get('lcov.info'):
+            coverage = coverage_feedback(artifacts['lcov.info'], f"{args.repo}@{run_data.get('head_branch')}", run_id,
+                                         coverage_history)
+        
+        # Test timings of this run (merged reporter output) against the branch's recent runs
+        performance = ""
+        if artifacts.get('test_results.json'):
+            performance = performance_feedback([artifacts['test_results.json']],
+                                               f"{args.repo}@{run_data.get('head_branch')}", run_id, perf_baseline)
+        
+        # Nothing to tell if this run fails exactly like the previous one and its coverage and timings add nothing new
+        if not delta.changed and not args.force and \
+                sections_unchanged(args.output, render_coverage(coverage), render_performance(performance)):
+            print(f"⏭️  Same {len(delta.current)} failure(s) as run {delta.previous_run} - {args.output} left as is")
+            state.mark_processed(run_id)
+            return
         
         # Generate feedback
-        feedback = generate_automated_feedback(run_data, logs)
+        feedback = generate_automated_feedback(run_data, logs, load_index(args.test_report), args.test_report,
+                                               records, args.repo, artifacts, coverage, delta, performance)
         
         # Write to file for Amp to read
-        with open('AGENT_FEEDBACK.md', 'w') as f:
-            f.write(feedback)
+        write_feedback(args.output, feedback)
+        state.mark_processed(run_id)
         
-        print("✅ Automated feedback generated: AGENT_FEEDBACK.md")
+        print(f"✅ Automated feedback generated: {args.output}")
         print("🤖 Amp can now read and fix issues automatically!")
         
     elif run_data.get('conclusion') == 'success':
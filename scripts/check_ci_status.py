@@ -4,66 +4,101 @@ GitHub Actions Status Checker for Amp Integration
 Polls GitHub Actions API to detect CI failures and generate Amp feedback
 """
 
+import argparse
 import json
-import os
 import time
 import subprocess
 from datetime import datetime
-from urllib.request import urlopen
 from urllib.error import URLError
 
-def check_github_actions_status():
-    """Check GitHub Actions status for the current repository"""
+import metrics
+from auto_ci_feedback import (extract_failures, get_ci_logs, render_failure_delta, render_logs_unavailable,
+                              sections_unchanged)
+from feedback_writer import write_feedback
+from flutter_reporter import DEFAULT_REPORT, load_index, render_test_status
+from git_metadata import get_git_metadata
+from github_client import DEFAULT_REPO, get_client
+from run_state import get_state_store
+
+def check_github_actions_status(repo=DEFAULT_REPO, branch=None):
+    """Check GitHub Actions status for a repository branch (the checked-out one by default)"""
     try:
-        # Get current branch and repo info
-        repo = "Josh-thephillipsequation/Eventflow"
-        branch = os.popen("git rev-parse --abbrev-ref HEAD").read().strip()
-        commit = os.popen("git rev-parse HEAD").read().strip()[:8]
+        # Get current branch and commit info unless a branch was given
+        commit = ''
+        if branch is None:
+            git = get_git_metadata()
+            branch, commit = git.branch(), git.short_sha()
         
-        print(f"🔍 Checking CI status for {repo}:{branch} ({commit})")
+        print(f"🔍 Checking CI status for {repo}:{branch}" + (f" ({commit})" if commit else ""))
         
         # GitHub API endpoint for workflow runs
-        api_url = f"https://api.github.com/repos/{repo}/actions/runs"
-        params = {
-            "branch": branch,
-            "per_page": 5
-        }
+        client = get_client()
+        state = get_state_store()
+        # Only list runs from the last one we saw onwards
+        url = client.repo_url(repo, f"actions/runs?branch={branch}&per_page=5{state.since_filter(repo, branch)}")
         
-        # Build URL with parameters
-        url = f"{api_url}?branch={branch}&per_page=5"
+        try:
+            # Conditional request: an unchanged run list comes back as a free 304
+            data, not_modified = client.get_json(url)
+        except URLError as e:
+            print(f"❌ Failed to fetch CI status: {e}")
+            return
         
-        with urlopen(url) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode())
-                runs = data.get('workflow_runs', [])
-            
-            if not runs:
-                print("📭 No recent workflow runs found")
+        if not_modified:
+            print("💾 No changes since last check (served from cache)")
+        
+        runs = data.get('workflow_runs', [])
+        
+        if not runs:
+            print("📭 No recent workflow runs found")
+            return
+        
+        state.record_runs(repo, runs)
+        latest_run = runs[0]
+        status = latest_run.get('status')
+        conclusion = latest_run.get('conclusion')
+        
+        print(f"📊 Latest run: {status} / {conclusion}")
+        
+        if conclusion == 'failure':
+            if state.is_processed(latest_run['id']):
+                print(f"⏭️  Run {latest_run['id']} already reported - AGENT_FEEDBACK.md is up to date")
                 return
+            print("🚨 CI Failure detected!")
+            run_id = latest_run['id']
+            logs = state.load_logs(run_id)
+            if logs is None:
+                logs, complete = get_ci_logs(run_id, repo=repo)
+                if not complete:
+                    # Partial logs would be recorded as this run's whole failure set; retry next time instead
+                    write_feedback('AGENT_FEEDBACK.md', render_logs_unavailable(latest_run, logs, repo))
+                    print(f"⚠️ Logs of run {run_id} incomplete - run left unprocessed")
+                    return
+                state.save_logs(run_id, logs)
+            records = extract_failures(logs)
+            state.save_failures(run_id, records)
+            delta = state.record_failure_set(f"{repo}@{branch}", run_id, records)
             
-            latest_run = runs[0]
-            status = latest_run.get('status')
-            conclusion = latest_run.get('conclusion')
-            
-            print(f"📊 Latest run: {status} / {conclusion}")
-            
-            if conclusion == 'failure':
-                print("🚨 CI Failure detected!")
-                generate_amp_feedback(latest_run, repo, branch, commit)
-            elif conclusion == 'success':
-                print("✅ All CI checks passed!")
+            # Nothing to tell if this run fails exactly like the previous one
+            if not delta.changed and sections_unchanged('AGENT_FEEDBACK.md'):
+                print(f"⏭️  Same {len(delta.current)} failure(s) as run {delta.previous_run} - AGENT_FEEDBACK.md left as is")
             else:
-                print(f"⏳ CI in progress: {status}")
-                
-        except URLError as e:
-            print(f"❌ Failed to fetch CI status: {e}")
+                generate_amp_feedback(latest_run, repo, branch, commit or latest_run.get('head_sha', '')[:8],
+                                      delta=delta)
+            state.mark_processed(run_id)
+        elif conclusion == 'success':
+            print("✅ All CI checks passed!")
+        else:
+            print(f"⏳ CI in progress: {status}")
             
     except Exception as e:
         print(f"❌ Error checking CI status: {e}")
 
-def generate_amp_feedback(run_data, repo, branch, commit):
+@metrics.timed('ci_feedback_render_seconds', generator='check_ci_status')
+def generate_amp_feedback(run_data, repo, branch, commit, test_report=DEFAULT_REPORT, delta=None):
     """Generate Amp feedback from CI failure"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+    failures = f"\n## 🔍 Failures\n\n{render_failure_delta(delta)}" if delta is not None else ""
     
     feedback = f"""# 🚨 CI Failure Detected - Amp Please Fix
 
@@ -86,7 +121,10 @@ The CI pipeline has failed. Please:
 4. **Fix the failing tests** based on error messages
 5. **Verify fixes locally** before pushing
 6. **Push updated code** to trigger new CI run
+{failures}
+## 📊 Test Status
 
+{render_test_status(load_index(test_report), test_report)}
 ## 🔍 Common Issues to Check
 
 - **Test compilation errors** (method not found, import issues)
@@ -105,11 +143,17 @@ The CI pipeline has failed. Please:
 """
     
     # Write feedback for Amp
-    with open('AGENT_FEEDBACK.md', 'w') as f:
-        f.write(feedback)
+    write_feedback('AGENT_FEEDBACK.md', feedback)
     
     print("✅ Amp feedback generated: AGENT_FEEDBACK.md")
     print("🤖 Ready for Amp to process and fix issues!")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check the latest GitHub Actions run and write Amp feedback on failure")
+    parser.add_argument('--repo', default=DEFAULT_REPO, help=f"owner/name to check (default {DEFAULT_REPO})")
+    parser.add_argument('--branch', help="branch to check (default: the checked-out branch)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    check_github_actions_status()
+    args = parse_args()
+    check_github_actions_status(args.repo, args.branch)
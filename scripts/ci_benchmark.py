@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the CI feedback tooling
+Runs each scenario in its own interpreter against a local GitHub stand-in
+(fake_github.py), reports throughput, p50/p99 latency and peak RSS, and
+compares the numbers with a stored baseline so regressions fail loudly.
+
+Scenarios:
+- feedback: latest run -> failed job diagnostics -> extraction -> render (auto_ci_feedback)
+- extract:  FailureExtractor over a large synthetic log
+- webhook:  concurrent POSTs against vscode_webhook_server.py
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_github import FakeGitHub, build_log
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(SCRIPTS_DIR, 'ci_benchmark_baseline.json')
+SCENARIOS = ('feedback', 'extract', 'webhook')
+BENCH_REPO = 'bench/eventflow'
+
+LOWER_IS_BETTER = ('p50_ms', 'p99_ms', 'peak_rss_mb')
+HIGHER_IS_BETTER = ('throughput',)
+# Scenario parameters that must match for a baseline comparison to be meaningful
+SCENARIO_PARAMS = {
+    'feedback': ('iterations', 'latency', 'log_bytes', 'jobs', 'log_workers', 'retrieval', 'annotations'),
+    'extract': ('iterations', 'extract_bytes'),
+    'webhook': ('requests', 'concurrency'),
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies, elapsed, unit):
+    return {
+        'count': len(latencies),
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'unit': unit,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+# Scenario bodies: these run inside the child interpreter --------------------
+
+def child_feedback(args):
+    """Full auto_ci_feedback pipeline per iteration, through the shared client"""
+    import auto_ci_feedback
+    from flutter_reporter import DEFAULT_REPORT
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        t0 = time.perf_counter()
+        run = auto_ci_feedback.get_latest_ci_run(None, BENCH_REPO, 'main')
+        logs, _ = auto_ci_feedback.get_ci_logs(run['id'], args.log_workers, 60, BENCH_REPO, args.retrieval)
+        records = auto_ci_feedback.extract_failures(logs)
+        auto_ci_feedback.generate_automated_feedback(run, logs, None, DEFAULT_REPORT, records, BENCH_REPO)
+        latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, time.perf_counter() - started, 'runs/s')
+    result['failures_per_run'] = len(records)
+    return result
+
+
+def child_extract(args):
+    """FailureExtractor throughput on one large log"""
+    from failure_extractor import FailureExtractor
+
+    text = build_log(1, args.extract_bytes).decode()
+    extractor = FailureExtractor()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        t0 = time.perf_counter()
+        extractor.extract_text(text, 'bench')
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    result = summarize(latencies, elapsed, 'MB/s')
+    result['throughput'] = round(len(text) * args.iterations / elapsed / 1e6, 2)
+    return result
+
+
+CHILD_SCENARIOS = {'feedback': child_feedback, 'extract': child_extract}
+
+
+# Parent-side orchestration --------------------------------------------------
+
+def wait_child(proc):
+    """Reap a child and return (returncode, peak RSS in MB) from its rusage"""
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KiB on Linux
+    return proc.returncode, round(usage.ru_maxrss / 1024, 1)
+
+
+def run_child_scenario(name, args, env):
+    command = [sys.executable, os.path.abspath(__file__), '--child', name] + child_argv(args)
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, env=env, cwd=env['CI_CACHE_DIR'])
+    output = proc.stdout.read().decode()
+    proc.stdout.close()
+    returncode, peak_rss = wait_child(proc)
+    if returncode != 0:
+        raise RuntimeError(f"scenario {name} exited with {returncode}")
+    result = json.loads(output.strip().splitlines()[-1])
+    result['peak_rss_mb'] = peak_rss
+    return result
+
+
+def child_argv(args):
+    argv = []
+    for name in ('iterations', 'latency', 'log_bytes', 'jobs', 'log_workers', 'extract_bytes', 'retrieval'):
+        argv += ['--' + name.replace('_', '-'), str(getattr(args, name))]
+    return argv
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def post(port, body, timeout=30):
+    """POST one payload; returns (status or 'error', seconds)"""
+    conn = http.client.HTTPConnection('localhost', port, timeout=timeout)
+    t0 = time.perf_counter()
+    try:
+        conn.request('POST', '/', body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - t0
+    except OSError:
+        return 'error', time.perf_counter() - t0
+    finally:
+        conn.close()
+
+
+def run_webhook_scenario(args, workdir):
+    """Load-test the webhook server with concurrent single-event POSTs"""
+    port = free_port()
+    command = [sys.executable, os.path.join(SCRIPTS_DIR, 'vscode_webhook_server.py'), '--port', str(port),
+               '--state-db', os.path.join(workdir, 'state.sqlite3')]
+    proc = subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection(('localhost', port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise RuntimeError("webhook server did not start")
+                time.sleep(0.05)
+
+        bodies = [json.dumps({"repository": BENCH_REPO, "branch": f"branch-{i % 16}",
+                              "commit": f"{i:040x}", "workflow": "bench", "message": "benchmark"}).encode()
+                  for i in range(args.requests)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(lambda body: post(port, body), bodies))
+        elapsed = time.perf_counter() - started
+    finally:
+        if proc.poll() is None:
+            proc.send_signal(signal.SIGINT)
+    returncode, peak_rss = wait_child(proc)
+
+    result = summarize([latency for _, latency in outcomes], elapsed, 'requests/s')
+    statuses = {}
+    for status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    result['statuses'] = statuses
+    result['peak_rss_mb'] = peak_rss
+    return result
+
+
+def scenario_params(name, args):
+    return {key: getattr(args, key) for key in SCENARIO_PARAMS[name]}
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression messages"""
+    regressions = []
+    for name, result in results.items():
+        errors = result.get('statuses', {}).get('error')
+        if errors:
+            regressions.append(f"{name}: {errors} request(s) failed at the connection level")
+        base = baseline.get(name)
+        if not base:
+            print(f"ℹ️  {name}: no baseline")
+            continue
+        if base.get('params') != result['params']:
+            print(f"ℹ️  {name}: baseline was recorded with {base.get('params')}, skipping comparison")
+            continue
+        for key in LOWER_IS_BETTER:
+            if base.get(key) and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}.{key}: {result[key]} vs baseline {base[key]} "
+                                   f"(+{(result[key] / base[key] - 1) * 100:.0f}%)")
+        for key in HIGHER_IS_BETTER:
+            if base.get(key) and result[key] < base[key] * (1 - tolerance):
+                regressions.append(f"{name}.{key}: {result[key]} vs baseline {base[key]} "
+                                   f"(-{(1 - result[key] / base[key]) * 100:.0f}%)")
+    return regressions
+
+
+def print_result(name, result):
+    print(f"📊 {name:<9} {result['throughput']:>10} {result['unit']:<11} "
+          f"p50 {result['p50_ms']:>9.2f} ms   p99 {result['p99_ms']:>9.2f} ms   "
+          f"peak RSS {result['peak_rss_mb']:>6.1f} MB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CI feedback scripts offline")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--iterations', type=int, default=20, help="feedback/extract iterations")
+    parser.add_argument('--latency', type=float, default=0.02, help="fake API latency per response (s)")
+    parser.add_argument('--log-bytes', type=int, default=200_000, help="size of each fake job log")
+    parser.add_argument('--jobs', type=int, default=6, help="failed jobs per fake run")
+    parser.add_argument('--log-workers', type=int, default=4, help="concurrent log downloads")
+    parser.add_argument('--retrieval', choices=('annotations', 'logs'), default='annotations',
+                        help="how the feedback scenario gets failed-job diagnostics")
+    parser.add_argument('--annotations', choices=('generic', 'detailed', 'none'), default='detailed',
+                        help="check-run annotations served by the fake API")
+    parser.add_argument('--extract-bytes', type=int, default=5_000_000, help="log size for the extract scenario")
+    parser.add_argument('--requests', type=int, default=1000, help="webhook POSTs to send")
+    parser.add_argument('--concurrency', type=int, default=16, help="concurrent webhook clients")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.35,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument('--output', help="also write the results as JSON to this path")
+    parser.add_argument('--child', choices=sorted(CHILD_SCENARIOS), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        print(json.dumps(CHILD_SCENARIOS[args.child](args)))
+        return
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        print(f"❌ Unknown scenario(s): {', '.join(sorted(unknown))}")
+        sys.exit(2)
+
+    workdir = tempfile.mkdtemp(prefix='ci-bench-')
+    fake = FakeGitHub(latency=args.latency, log_bytes=args.log_bytes, jobs=args.jobs,
+                      annotations=args.annotations).start()
+    # Children get a private cache and point the shared client at the stand-in
+    env = dict(os.environ, GITHUB_API_URL=fake.url, CI_CACHE_DIR=workdir, GITHUB_TOKEN='bench-token')
+    env.pop('CI_METRICS', None)
+    env.pop('CI_METRICS_JSON', None)
+    print(f"🧪 Fake GitHub API on {fake.url} (latency {args.latency}s, {args.jobs} jobs x {args.log_bytes} bytes)")
+
+    results = {}
+    try:
+        for name in names:
+            if name == 'webhook':
+                result = run_webhook_scenario(args, workdir)
+            else:
+                result = run_child_scenario(name, args, env)
+            result['params'] = scenario_params(name, args)
+            results[name] = result
+            print_result(name, result)
+    finally:
+        fake.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"💾 Baseline updated: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️  No baseline at {args.baseline}; record one with --update-baseline")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"❌ PERFORMANCE REGRESSION (tolerance {args.tolerance:.0%}):")
+        for message in regressions:
+            print(f"   - {message}")
+        sys.exit(1)
+    print(f"✅ Within {args.tolerance:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
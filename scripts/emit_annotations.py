@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Turn failures in CI report files into GitHub check-run annotations
+Runs the failure extractor over test_reports/*.txt and prints one `::error`
+workflow command per distinct failure, with the category as the title, so
+the feedback scripts can read the failures from the annotations API instead
+of downloading raw job logs.
+"""
+
+import os
+import sys
+
+from failure_extractor import FailureExtractor, fingerprint
+
+# GitHub keeps at most 10 error annotations per step
+MAX_ANNOTATIONS = 10
+# Title of the warning that counts the failures beyond MAX_ANNOTATIONS
+OVERFLOW_TITLE = 'annotations'
+
+
+def escape_data(value):
+    return value.replace('%', '%25').replace('\r', '%0D').replace('\n', '%0A')
+
+
+def escape_property(value):
+    return escape_data(value).replace(':', '%3A').replace(',', '%2C')
+
+
+def annotation_command(record):
+    properties = []
+    if record.location:
+        path, _, line = record.location.partition(':')
+        properties.append(f"file={escape_property(path)}")
+        if line.isdigit():
+            properties.append(f"line={line}")
+    properties.append(f"title={escape_property(record.category)}")
+    return f"::error {','.join(properties)}::{escape_data(record.message)}"
+
+
+def collect_failures(paths):
+    """Distinct failures across the report files, in file order"""
+    extractor = FailureExtractor()
+    seen = set()
+    records = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for record in extractor.extract(f, os.path.basename(path)):
+                key = fingerprint(record)
+                if key not in seen:
+                    seen.add(key)
+                    records.append(record)
+    return records
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 emit_annotations.py <report file>...")
+        sys.exit(1)
+    records = collect_failures(sys.argv[1:])
+    for record in records[:MAX_ANNOTATIONS]:
+        print(annotation_command(record))
+    if len(records) > MAX_ANNOTATIONS:
+        print(f"::warning title={OVERFLOW_TITLE}::{len(records) - MAX_ANNOTATIONS} more failure(s) in test_reports/")
+
+
+if __name__ == "__main__":
+    main()
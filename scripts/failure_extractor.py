@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Single-pass failure extractor for Flutter/Dart CI logs
+Every registered pattern is folded into one precompiled alternation, so each
+log line is scanned once no matter how many patterns exist. Matches become
+structured FailureRecords (job, category, file:line, message) with per-category
+caps so a noisy job can't drown out the rest.
+"""
+
+import hashlib
+import io
+import re
+
+import metrics
+from collections import namedtuple
+
+FailureRecord = namedtuple('FailureRecord', 'job category location message')
+
+DEFAULT_CAP = 5
+
+# Human-readable labels for the feedback report, in display order
+CATEGORY_LABELS = {
+    'test_failure': 'Failing tests',
+    'test_expectation': 'Test expectation mismatches',
+    'compile_error': 'Compilation errors',
+    'analyzer': 'flutter analyze issues',
+    'format': 'Formatting check failures',
+    'pub': 'Dependency resolution (pub) errors',
+    'error': 'Other errors',
+}
+
+
+class FailurePattern:
+    """One extraction rule.
+
+    `regex` may use the named groups `file`, `line` and `message`; when
+    `message` is absent the whole match is used. A `category` group naming
+    one of CATEGORY_LABELS overrides the pattern's category. `keywords` are literal
+    substrings at least one of which must appear in any matching line; they
+    let the extractor skip most lines with plain substring checks before the
+    regex runs. `followup` is an optional
+    regex whose first match within `followup_lines` subsequent lines is
+    appended to the message (e.g. the `Actual:` line after `Expected:`).
+    """
+
+    def __init__(self, category, regex, keywords=(), cap=DEFAULT_CAP, followup=None, followup_lines=3):
+        self.category = category
+        self.regex = regex
+        self.keywords = tuple(keywords)
+        self.cap = cap
+        self.followup = re.compile(followup) if followup else None
+        self.followup_lines = followup_lines
+
+
+_registry = []
+
+
+def register_pattern(category, regex, keywords=(), cap=DEFAULT_CAP, followup=None, followup_lines=3):
+    """Add a pattern to the default registry (earlier registrations win ties)"""
+    pattern = FailurePattern(category, regex, keywords, cap, followup, followup_lines)
+    _registry.append(pattern)
+    return pattern
+
+
+def registered_patterns():
+    return list(_registry)
+
+
+# Flutter test runner: "00:05 +3 -1: EventProvider Tests loads events [E]"
+register_pattern('test_failure', r'\+\d+(?: ~\d+)? -\d+: (?P<message>.+?) \[E\]\s*$', keywords=('[E]',))
+# package:matcher failure output, paired with the following "Actual:" line
+register_pattern('test_expectation', r'^\s*(?P<message>Expected: .+)$', keywords=('Expected: ',),
+                 followup=r'^\s*(Actual: .+)$')
+# Dart front-end: "lib/main.dart:12:5: Error: Undefined name 'foo'."
+register_pattern('compile_error',
+                 r'(?P<file>[\w./-]+\.dart):(?P<line>\d+):\d+: Error: (?P<message>.+)',
+                 keywords=(': Error: ',))
+# flutter analyze: "  error • Undefined name 'x' • lib/a.dart:3:7 • undefined_identifier"
+# (newer SDKs separate fields with " - " instead of " • ")
+register_pattern('analyzer',
+                 r'^\s*(?:error|warning|info) [•-] (?P<message>.+?) [•-] (?P<file>[^\s•]+?):(?P<line>\d+):\d+ [•-] \w+',
+                 keywords=(' • ', ' - '), cap=10)
+# dart format --set-exit-if-changed
+register_pattern('format', r'^Changed (?P<file>\S+\.dart)$', keywords=('Changed ',))
+# pub get / version solving
+register_pattern('pub', r'(?P<message>(?:Because .+ depends on .+|version solving failed.*|'
+                        r'pub get failed.*|Could not find package .+))',
+                 keywords=(' depends on ', 'version solving failed', 'pub get failed', 'Could not find package'))
+# Anything else that looks like an error, including the old 'Error:' heuristic
+register_pattern('error', r'(?:^|\s)(?P<message>\w*Error: .+)', keywords=('Error: ',))
+register_pattern('error', r'^##\[error\](?P<message>.+)', keywords=('##[error]',))
+# Workflow commands / check-run annotations: "::error file=lib/a.dart,line=3,title=analyzer::msg"
+register_pattern('error', r'^::error (?:file=(?P<file>[^,:]+),?)?(?:line=(?P<line>\d+),?)?(?:[^:]*?title=(?P<category>\w+))?'
+                          r'[^:]*::(?P<message>.+)', keywords=('::error ',), cap=20)
+
+
+class FailureExtractor:
+    """Runs a set of FailurePatterns over log lines in a single pass"""
+
+    def __init__(self, patterns=None, caps=None):
+        self.patterns = list(patterns if patterns is not None else _registry)
+        self.caps = caps or {}
+        alternatives = []
+        for i, pattern in enumerate(self.patterns):
+            # Group names must be unique across the alternation; namespace them per pattern
+            body = re.sub(r'\(\?P<(\w+)>', lambda m: f'(?P<p{i}_{m.group(1)}>', pattern.regex)
+            body = re.sub(r'\(\?P=(\w+)\)', lambda m: f'(?P=p{i}_{m.group(1)})', body)
+            alternatives.append(f'(?P<p{i}>{body})')
+        self.combined = re.compile('|'.join(alternatives))
+        self._outer = [self.combined.groupindex[f'p{i}'] for i in range(len(self.patterns))]
+        # The substring prefilter is only sound if every pattern declares keywords
+        if all(pattern.keywords for pattern in self.patterns):
+            self.keywords = tuple(dict.fromkeys(k for pattern in self.patterns for k in pattern.keywords))
+        else:
+            self.keywords = ()
+
+    def cap_for(self, pattern):
+        return self.caps.get(pattern.category, pattern.cap)
+
+    def _record(self, job, index, match):
+        groups = match.groupdict()
+        prefix = f'p{index}_'
+        message = groups.get(prefix + 'message') or match.group(f'p{index}')
+        location = groups.get(prefix + 'file') or ''
+        if location and groups.get(prefix + 'line'):
+            location += ':' + groups[prefix + 'line']
+        category = groups.get(prefix + 'category')
+        if category not in CATEGORY_LABELS:
+            category = self.patterns[index].category
+        return FailureRecord(job, category, location, message.strip())
+
+    def extract(self, lines, job=''):
+        """Yield FailureRecords from an iterable of log lines"""
+        return self.replay(self.events(lines, job))
+
+    def events(self, lines, job='', first_line=0):
+        """Yield (line number, pattern index, record, followups) for the lines that matter.
+
+        This is the per-line regex work; it depends on nothing before
+        `first_line`, so a log split at line boundaries can be scanned piece by
+        piece (possibly in other processes) and the pieces replayed in order.
+        `index` is -1 when the line only carries followups ({pattern index:
+        text}). Matches past a category's cap are dropped here already, which
+        is safe: a chunk's first N matches include all of the log's first N
+        that fall inside it (lines that may be followups are never dropped).
+        """
+        counts = {}
+        search = self.combined.search
+        keywords = self.keywords
+        followups = [(i, p.followup.search) for i, p in enumerate(self.patterns) if p.followup]
+        # Lines right after the previous chunk may complete a followup started there
+        window = first_line + max((p.followup_lines for p in self.patterns if p.followup), default=0) - 1
+        if not first_line:
+            window = -1
+
+        for number, line in enumerate(lines, first_line):
+            line = line.rstrip('\r\n')
+            # GitHub prefixes every log line with "2025-01-01T00:00:00.0000000Z "
+            if line[4:5] == '-' and line[10:11] == 'T':
+                space = line.find(' ')
+                if space > 0 and line[space - 1] == 'Z':
+                    line = line[space + 1:]
+
+            found = None
+            if number <= window:
+                for i, followup in followups:
+                    hit = followup(line)
+                    if hit:
+                        found = found or {}
+                        found[i] = hit.group(1).strip()
+
+            match = None
+            if keywords:
+                for keyword in keywords:
+                    if keyword in line:
+                        match = search(line)
+                        break
+            else:
+                match = search(line)
+
+            if match:
+                index = next(i for i, group in enumerate(self._outer) if match.start(group) != -1)
+                pattern = self.patterns[index]
+                if pattern.followup:
+                    window = max(window, number + pattern.followup_lines)
+                if found:
+                    # replay() decides whether this line is a match or a followup; don't count it
+                    yield number, index, self._record(job, index, match), found
+                    continue
+                count = counts.get(pattern.category, 0)
+                if count < self.cap_for(pattern):
+                    counts[pattern.category] = count + 1
+                    yield number, index, self._record(job, index, match), found
+                    continue
+            if found:
+                yield number, -1, None, found
+
+    def replay(self, events):
+        """Apply per-category caps and pair followups over events in line order"""
+        counts = {}
+        pending = None  # (record, pattern index, last line that may hold its followup)
+
+        for number, index, record, found in events:
+            if pending:
+                previous, waiting, deadline = pending
+                if number > deadline:
+                    yield previous
+                    pending = None
+                else:
+                    text = found.get(waiting) if found else None
+                    if text is not None:
+                        yield previous._replace(message=f"{previous.message} / {text}")
+                        pending = None
+                        continue
+                    if number == deadline:
+                        yield previous
+                        pending = None
+
+            if index < 0:
+                continue
+            pattern = self.patterns[index]
+            count = counts.get(pattern.category, 0)
+            if count >= self.cap_for(pattern):
+                continue
+            counts[pattern.category] = count + 1
+
+            if pattern.followup:
+                if pending:
+                    yield pending[0]
+                pending = (record, index, number + pattern.followup_lines)
+            else:
+                yield record
+
+        if pending:
+            yield pending[0]
+
+    def extract_text(self, text, job=''):
+        """Extract from an in-memory log without materialising a list of lines"""
+        with metrics.timer('ci_extraction_seconds'):
+            return list(self.extract(io.StringIO(text), job))
+
+
+def group_by_category(records):
+    """Return [(category, label, records)] in CATEGORY_LABELS order"""
+    grouped = {}
+    for record in records:
+        grouped.setdefault(record.category, []).append(record)
+    order = list(CATEGORY_LABELS) + sorted(set(grouped) - set(CATEGORY_LABELS))
+    return [(category, CATEGORY_LABELS.get(category, category), grouped[category])
+            for category in order if category in grouped]
+
+
+# Noise that differs between runs of the same failure
+_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?|\b\d{1,2}:\d{2}(?::\d{2})?\b')
+_RUNNER_PREFIX = re.compile(r'^\+\d+(?: ~\d+)?(?: -\d+)?: ')
+_ABSOLUTE_PATH = re.compile(r'(?:file://)?(?:/[\w.@-]+)+/(?=(?:lib|test|bin|integration_test)/)')
+_LINE_COL = re.compile(r'(\.dart):\d+(?::\d+)?')
+_HEX = re.compile(r'\b(?:0x)?[0-9a-f]{7,}\b')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Strip timestamps, checkout paths, line numbers and other per-run noise"""
+    text = _TIMESTAMP.sub('', text)
+    text = _RUNNER_PREFIX.sub('', text.strip())
+    text = _ABSOLUTE_PATH.sub('', text)
+    text = _LINE_COL.sub(r'\1', text)
+    text = _HEX.sub('<hex>', text)
+    text = _NUMBER.sub('<n>', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def fingerprint(record):
+    """Stable id for a failure across runs: category + normalised location and message"""
+    location = normalize(record.location) if record.location else ''
+    key = f"{record.category}|{location}|{normalize(record.message)}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the GitHub Actions API used by the CI feedback scripts
+Serves actions/runs, runs/{id}/jobs (with steps), check-run annotations,
+jobs/{id}/logs and the run's artifact zips (both via a redirect to a blob
+URL, like GitHub does) with configurable latency, log sizes and job counts,
+so the scripts can be exercised and benchmarked offline.
+"""
+
+import argparse
+import io
+import json
+import re
+import threading
+import time
+import zipfile
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+RUN_ID = 1000
+ARTIFACT_ID = 5000
+ARTIFACT_NAMES = ('test-reports', 'coverage-reports')
+RATE_LIMIT = 5000
+
+_RUNS = re.compile(r'^/repos/([^/]+/[^/]+)/actions/runs$')
+_JOBS = re.compile(r'^/repos/([^/]+/[^/]+)/actions/runs/(\d+)/jobs$')
+_LOGS = re.compile(r'^/repos/([^/]+/[^/]+)/actions/jobs/(\d+)/logs$')
+_BLOB = re.compile(r'^/blob/(\d+)$')
+_ARTIFACTS = re.compile(r'^/repos/([^/]+/[^/]+)/actions/runs/(\d+)/artifacts$')
+_ARTIFACT_ZIP = re.compile(r'^/repos/([^/]+/[^/]+)/actions/artifacts/(\d+)/zip$')
+_ARTIFACT_BLOB = re.compile(r'^/artifact-blob/(\d+)$')
+_ANNOTATIONS = re.compile(r'^/repos/([^/]+/[^/]+)/check-runs/(\d+)/annotations$')
+
+# Log lines modelled on `flutter test` / `flutter analyze` output in GitHub's log format
+_NOISE_LINES = (
+    "00:{s:02d} +{n}: EventProvider Tests loads events from storage",
+    "Resolving dependencies...",
+    "  collection 1.18.0",
+    "Running \"flutter pub get\" in eventflow...",
+    "00:{s:02d} +{n}: widget_test.dart: splash screen shows logo",
+)
+_FAILURE_LINES = (
+    "00:{s:02d} +{n} -1: EventProvider Tests handles empty list [E]",
+    "  Expected: <3>",
+    "    Actual: <0>",
+    "lib/screens/import_screen.dart:{n}:7: Error: The getter 'events' isn't defined for the class 'Foo'.",
+    "  error • Undefined name 'eventList' • lib/providers/event_provider.dart:{n}:9 • undefined_identifier",
+    "##[error]Process completed with exit code 1.",
+)
+
+
+def _stamp(seconds):
+    return f"2025-01-01T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+# Job steps and the seconds they cover in every fake log; "Run tests" is the one that fails
+STEPS = (("Set up job", 0, 0), ("Run tests", 1, 3599), ("Upload test reports", 3600, 3600),
+         ("Complete job", 3601, 3601))
+
+
+def build_log(job_id, size, failures=True, trailing=20):
+    """Deterministic job log of roughly `size` bytes, laid out like GitHub's per step.
+
+    Failures end the "Run tests" step and are followed by `trailing` lines from
+    the `if: always()` steps after it.
+    """
+    lines = [f"{_stamp(0)}.0000000Z ##[group]Run actions/checkout@v4", f"{_stamp(0)}.0000000Z ##[endgroup]"]
+    total = sum(len(line) + 1 for line in lines)
+    tail = []
+    if failures:
+        tail = [line.format(s=i % 60, n=job_id + i) for i, line in enumerate(_FAILURE_LINES)]
+    after = [f"{_stamp(3600 + i // 10)}.0000000Z Uploading test_reports/ ({i} files)" for i in range(trailing)]
+    budget = size - sum(len(line) + 30 for line in tail) - sum(len(line) + 1 for line in after)
+    i = 0
+    while total < budget:
+        line = f"{_stamp(1 + min(i // 100, 3597))}.{i % 10000000:07d}Z " + \
+            _NOISE_LINES[i % len(_NOISE_LINES)].format(s=i % 60, n=i)
+        lines.append(line)
+        total += len(line) + 1
+        i += 1
+    lines.extend(f"{_stamp(3599)}.0000000Z {line}" for line in tail)
+    lines.extend(after)
+    return ("\n".join(lines) + "\n").encode()
+
+
+def build_annotations(job_id, failed, detailed):
+    """Check-run annotations: GitHub's generic one, plus the emit_annotations.py ones when detailed"""
+    if not failed:
+        return []
+    annotations = []
+    if detailed:
+        annotations = [
+            {"path": "lib/providers/event_provider.dart", "start_line": 42 + job_id, "end_line": 42 + job_id,
+             "annotation_level": "failure", "title": "analyzer", "message": "Undefined name 'eventList'"},
+            {"path": ".github", "start_line": 1, "end_line": 1, "annotation_level": "failure",
+             "title": "test_failure", "message": "EventProvider Tests handles empty list"},
+            {"path": ".github", "start_line": 1, "end_line": 1, "annotation_level": "failure",
+             "title": "test_expectation", "message": "Expected: <3> / Actual: <0>"},
+        ]
+    annotations.append({"path": ".github", "start_line": 1, "end_line": 1, "annotation_level": "failure",
+                        "title": "", "message": "Process completed with exit code 1."})
+    return annotations
+
+
+def build_lcov(files=40, lines=200):
+    """Deterministic lcov tracefile, roughly 75% of lines hit"""
+    out = []
+    for i in range(files):
+        out.append(f"SF:lib/src/file_{i}.dart")
+        out.extend(f"DA:{n},{0 if (n * 7 + i) % 4 == 0 else 1}" for n in range(1, lines + 1))
+        out.append("end_of_record")
+    return "\n".join(out) + "\n"
+
+
+def build_reporter_json(slow_ms=1800):
+    """`flutter test --machine` output for one suite with a loading pseudo-test and two tests"""
+    path = '/home/runner/work/app/app/test/providers/event_provider_test.dart'
+    events = [
+        {'type': 'start', 'time': 0},
+        {'type': 'suite', 'suite': {'id': 0, 'path': path}, 'time': 0},
+        {'type': 'testStart', 'test': {'id': 1, 'name': f'loading {path}', 'suiteID': 0, 'groupIDs': []}, 'time': 0},
+        {'type': 'testDone', 'testID': 1, 'result': 'success', 'hidden': True, 'time': 900},
+        {'type': 'testStart', 'test': {'id': 2, 'name': 'EventProvider Tests loads events from storage',
+                                       'suiteID': 0, 'groupIDs': []}, 'time': 900},
+        {'type': 'testDone', 'testID': 2, 'result': 'success', 'hidden': False, 'time': 900 + slow_ms},
+        {'type': 'testStart', 'test': {'id': 3, 'name': 'EventProvider Tests handles empty list',
+                                       'suiteID': 0, 'groupIDs': []}, 'time': 900 + slow_ms},
+        {'type': 'testDone', 'testID': 3, 'result': 'failure', 'hidden': False, 'time': 1000 + slow_ms},
+        {'type': 'done', 'success': False, 'time': 1000 + slow_ms},
+    ]
+    return "".join(json.dumps(event) + "\n" for event in events)
+
+
+def build_artifact_zip(name, padding=1_000_000):
+    """A run artifact as upload-artifact stores it; test-reports carries a bulky member nobody needs"""
+    if name == 'coverage-reports':
+        members = {'lcov.info': build_lcov()}
+    else:
+        members = {
+            'tests.txt': "00:01 +41: EventProvider Tests loads events from storage\n"
+                         "00:02 +41 -1: EventProvider Tests handles empty list [E]\n"
+                         "  Expected: <3>\n    Actual: <0>\n"
+                         "00:03 +42 -1: Some tests failed.\n",
+            'analysis.txt': "  error • Undefined name 'eventList' • lib/providers/event_provider.dart:42:9 "
+                            "• undefined_identifier\n1 issue found.\n",
+            'coverage_summary.txt': "Lines: 412/520 (79.2%)\n",
+            'test_results.json': build_reporter_json(),
+            'html/index.html': "<html>" + "x" * padding + "</html>",
+        }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for member, content in members.items():
+            zf.writestr(member, content)
+    return buffer.getvalue()
+
+
+class FakeGitHub:
+    """Threaded fake API server; use start()/stop() or as a context manager"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, log_bytes=100_000, jobs=6,
+                 failed_jobs=None, conclusion='failure', support_range=True, redirect_logs=True,
+                 annotations='generic', trailing_lines=20):
+        self.latency = latency
+        self.log_bytes = log_bytes
+        self.jobs = jobs
+        self.failed_jobs = set(range(jobs)) if failed_jobs is None else set(failed_jobs)
+        self.conclusion = conclusion
+        self.support_range = support_range
+        self.redirect_logs = redirect_logs
+        self.annotations = annotations
+        self.trailing_lines = trailing_lines
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._logs = {}
+        self._artifact_zips = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def log_for(self, job_id):
+        with self._lock:
+            body = self._logs.get(job_id)
+            if body is None:
+                body = self._logs[job_id] = build_log(job_id, self.log_bytes, job_id in self.failed_jobs,
+                                                        self.trailing_lines)
+            return body
+
+    def run_payload(self, repo):
+        return {"workflow_runs": [{
+            "id": RUN_ID, "name": "EventFlow CI/CD Pipeline", "status": "completed",
+            "conclusion": self.conclusion, "head_sha": "0123456789abcdef0123456789abcdef01234567",
+            "head_branch": "main", "created_at": "2025-01-01T00:00:00Z",
+            "html_url": f"https://github.com/{repo}/actions/runs/{RUN_ID}",
+        }]}
+
+    def artifact_zip(self, artifact_id):
+        name = ARTIFACT_NAMES[artifact_id % len(ARTIFACT_NAMES)]
+        with self._lock:
+            if name not in self._artifact_zips:
+                self._artifact_zips[name] = build_artifact_zip(name)
+            return self._artifact_zips[name]
+
+    def artifacts_payload(self, repo, run_id):
+        artifacts = []
+        for i, name in enumerate(ARTIFACT_NAMES):
+            artifact_id = ARTIFACT_ID + run_id * len(ARTIFACT_NAMES) + i
+            artifacts.append({
+                "id": artifact_id, "name": name, "expired": False,
+                "size_in_bytes": len(self.artifact_zip(artifact_id)),
+                "archive_download_url": f"{self.url}/repos/{repo}/actions/artifacts/{artifact_id}/zip",
+            })
+        return {"total_count": len(artifacts), "artifacts": artifacts}
+
+    def jobs_payload(self, repo):
+        jobs = []
+        for i in range(self.jobs):
+            failed = i in self.failed_jobs
+            steps = [{
+                "name": name, "number": n + 1, "status": "completed",
+                "conclusion": "failure" if failed and name == "Run tests" else "success",
+                "started_at": _stamp(start) + "Z", "completed_at": _stamp(end) + "Z",
+            } for n, (name, start, end) in enumerate(STEPS)]
+            jobs.append({
+                "id": i, "name": f"job-{i}", "status": "completed",
+                "conclusion": "failure" if failed else "success",
+                "check_run_url": f"{self.url}/repos/{repo}/check-runs/{i}",
+                "steps": steps,
+            })
+        return {"jobs": jobs}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def send(self, code, body=b'', headers=()):
+                self.send_response(code)
+                self.send_header('X-RateLimit-Limit', str(RATE_LIMIT))
+                self.send_header('X-RateLimit-Remaining', str(max(RATE_LIMIT - fake.requests, 0)))
+                self.send_header('X-RateLimit-Reset', str(int(time.time()) + 3600))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_json(self, data, etag=None):
+                body = json.dumps(data).encode()
+                if etag and self.headers.get('If-None-Match') == etag:
+                    return self.send(304, headers=[('ETag', etag)])
+                return self.send(200, body, [('Content-Type', 'application/json')] +
+                                 ([('ETag', etag)] if etag else []))
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                path = self.path.split('?', 1)[0]
+                match = _RUNS.match(path)
+                if match:
+                    return self.send_json(fake.run_payload(match.group(1)), etag='"runs-1"')
+                match = _JOBS.match(path)
+                if match:
+                    return self.send_json(fake.jobs_payload(match.group(1)), etag='"jobs-1"')
+                match = _LOGS.match(path)
+                if match:
+                    if fake.redirect_logs:
+                        host, port = fake.server.server_address[:2]
+                        return self.send(302, headers=[('Location', f'http://{host}:{port}/blob/{match.group(2)}')])
+                    return self.send_log(int(match.group(2)))
+                match = _BLOB.match(path)
+                if match:
+                    return self.send_log(int(match.group(1)))
+                match = _ANNOTATIONS.match(path)
+                if match:
+                    job_id = int(match.group(2))
+                    if fake.annotations == 'none':
+                        return self.send(404, b'{"message": "Not Found"}')
+                    return self.send_json(build_annotations(job_id, job_id in fake.failed_jobs,
+                                                            fake.annotations == 'detailed'))
+                match = _ARTIFACTS.match(path)
+                if match:
+                    return self.send_json(fake.artifacts_payload(match.group(1), int(match.group(2))))
+                match = _ARTIFACT_ZIP.match(path)
+                if match:
+                    host, port = fake.server.server_address[:2]
+                    return self.send(302, headers=[('Location',
+                                                    f'http://{host}:{port}/artifact-blob/{match.group(2)}')])
+                match = _ARTIFACT_BLOB.match(path)
+                if match:
+                    return self.send(200, fake.artifact_zip(int(match.group(1))),
+                                     [('Content-Type', 'application/zip')])
+                self.send(404, b'{"message": "Not Found"}')
+
+            def send_log(self, job_id):
+                if job_id >= fake.jobs:
+                    return self.send(404, b'{"message": "Not Found"}')
+                body = fake.log_for(job_id)
+                requested = self.headers.get('Range', '')
+                if fake.support_range and requested.startswith('bytes=-'):
+                    start = max(len(body) - int(requested[7:]), 0)
+                    return self.send(206, body[start:],
+                                     [('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')])
+                return self.send(200, body, [('Content-Type', 'text/plain')])
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-github', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake GitHub Actions API for offline runs")
+    parser.add_argument('--port', type=int, default=8097)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--log-bytes', type=int, default=100_000, help="size of each job log")
+    parser.add_argument('--jobs', type=int, default=6, help="jobs per run (all fail by default)")
+    parser.add_argument('--no-range', action='store_true', help="ignore Range headers on log downloads")
+    parser.add_argument('--annotations', choices=('generic', 'detailed', 'none'), default='generic',
+                        help="check-run annotations: only the exit-code one, emit_annotations.py output too, "
+                             "or none at all")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fake = FakeGitHub(port=args.port, latency=args.latency, log_bytes=args.log_bytes, jobs=args.jobs,
+                      support_range=not args.no_range, annotations=args.annotations)
+    print(f"🧪 Fake GitHub API on {fake.url} - point the scripts at it with GITHUB_API_URL={fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Fake API stopped")
+    finally:
+        fake.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Coalescing atomic writer for AGENT_FEEDBACK.md and its sibling files
+Every feedback generator goes through one FeedbackWriter so that:
+- files are replaced atomically (write temp file, then rename), so readers
+  never see a half-written report and concurrent writers can't interleave
+- bursts of writes to the same path within the debounce window collapse
+  into a single write of the newest content
+- a write whose content is byte-identical to the file on disk is skipped,
+  so editors and agents watching the file see no spurious change events
+"""
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+
+import metrics
+
+DEFAULT_WINDOW = float(os.environ.get('FEEDBACK_DEBOUNCE_SECONDS', '0.5'))
+
+
+class FeedbackWriter:
+    """Debounced, atomic, skip-if-identical file writer"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._pending = {}  # path -> newest bytes waiting for the timer
+        self._timers = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.stats = {'requested': 0, 'coalesced': 0, 'written': 0, 'unchanged': 0}
+
+    def write(self, path, content):
+        """Queue content for path; it is written at most `window` seconds later.
+
+        With a window of 0 the write happens immediately and the return value
+        says whether the file actually changed.
+        """
+        path = os.path.abspath(path)
+        data = content.encode('utf-8') if isinstance(content, str) else bytes(content)
+        with self._lock:
+            self.stats['requested'] += 1
+            if self.window <= 0:
+                pass
+            elif path in self._pending:
+                self.stats['coalesced'] += 1
+                metrics.inc('ci_feedback_writes_total', result='coalesced')
+                self._pending[path] = data
+                return None
+            else:
+                self._pending[path] = data
+                timer = threading.Timer(self.window, self._flush_path, [path])
+                timer.daemon = True
+                self._timers[path] = timer
+                timer.start()
+                return None
+        return self._write_now(path, data)
+
+    def flush(self):
+        """Write everything still waiting on a debounce timer"""
+        with self._lock:
+            pending = list(self._pending.items())
+            self._pending.clear()
+            timers = list(self._timers.values())
+            self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+        for path, data in pending:
+            self._write_now(path, data)
+
+    def _flush_path(self, path):
+        with self._lock:
+            data = self._pending.pop(path, None)
+            self._timers.pop(path, None)
+        if data is not None:
+            self._write_now(path, data)
+
+    @staticmethod
+    def _is_identical(path, data):
+        try:
+            if os.path.getsize(path) != len(data):
+                return False
+            with open(path, 'rb') as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+    def _write_now(self, path, data):
+        """Atomically replace path with data unless it already has that content"""
+        started = time.perf_counter()
+        with self._write_lock:
+            if self._is_identical(path, data):
+                self.stats['unchanged'] += 1
+                metrics.inc('ci_feedback_writes_total', result='unchanged')
+                return False
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # mkstemp creates 0600 files; keep the usual permissions for shared reports
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self.stats['written'] += 1
+        metrics.inc('ci_feedback_writes_total', result='written')
+        metrics.observe('ci_feedback_write_seconds', time.perf_counter() - started)
+        return True
+
+
+_default_writer = None
+_default_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return the process-wide writer; pending writes are flushed at exit"""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = FeedbackWriter()
+            atexit.register(_default_writer.flush)
+        return _default_writer
+
+
+def write_feedback(path, content):
+    """Write a feedback file through the shared writer"""
+    return get_writer().write(path, content)
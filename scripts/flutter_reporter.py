@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Streaming parser for `flutter test --machine` reporter output
+Reads the NDJSON event stream one line at a time, skipping the pub / plugin
+noise that gets mixed into test_reports/test_results.json, and builds an index
+of tests by id, suite and outcome without loading the file into memory.
+"""
+
+import json
+import sys
+
+DEFAULT_REPORT = 'test_reports/test_results.json'
+
+FAILED_RESULTS = ('failure', 'error')
+
+# Lines flutter_test adds to every widget-test error; the real cause is in the printed exception
+_BOILERPLATE = ('Test failed. See exception logs above', 'The test description was:')
+_EXCEPTION_BANNER = 'EXCEPTION CAUGHT BY FLUTTER TEST FRAMEWORK'
+
+
+class TestRecord:
+    """One test from the event stream"""
+
+    __slots__ = ('id', 'name', 'suite_id', 'group_ids', 'url', 'line', 'start_time',
+                 'end_time', 'result', 'skipped', 'hidden', 'errors', 'print_count',
+                 'exception')
+
+    def __init__(self, test_id, name, suite_id, group_ids=(), url=None, line=None, start_time=0):
+        self.id = test_id
+        self.name = name
+        self.suite_id = suite_id
+        self.group_ids = tuple(group_ids)
+        self.url = url
+        self.line = line
+        self.start_time = start_time
+        self.end_time = None
+        self.result = None
+        self.skipped = False
+        self.hidden = False
+        self.errors = []
+        self.print_count = 0
+        self.exception = None  # first Flutter framework exception printed by the test
+
+    @property
+    def duration(self):
+        """Milliseconds between testStart and testDone, or None if unfinished"""
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    @property
+    def failed(self):
+        return self.result in FAILED_RESULTS
+
+    def first_error_line(self):
+        """The most useful one-line error summary for reports"""
+        for error in self.errors:
+            lines = [line.strip() for line in error.splitlines()]
+            lines = [line for line in lines if line and not line.startswith(_BOILERPLATE)]
+            if not lines:
+                continue
+            if lines[0].startswith('Expected:') and len(lines) > 1 and lines[1].startswith('Actual:'):
+                return f"{lines[0]} / {lines[1]}"
+            return lines[0]
+        return self.exception or ''
+
+
+class TestIndex:
+    """Tests indexed by id, suite and outcome"""
+
+    def __init__(self):
+        self.tests = {}
+        self.suites = {}  # suite id -> path
+        self.by_suite = {}  # suite id -> [test id]
+        self.by_outcome = {}  # result -> [test id]
+        self.success = None
+        self.total_time = None
+        self.noise_lines = 0
+        self.bad_lines = 0
+
+    def add_event(self, event):
+        kind = event.get('type')
+        if kind == 'testStart':
+            test = event['test']
+            record = TestRecord(test['id'], test.get('name', ''), test.get('suiteID'),
+                                test.get('groupIDs', ()), test.get('root_url') or test.get('url'),
+                                test.get('root_line') or test.get('line'), event.get('time', 0))
+            self.tests[record.id] = record
+            self.by_suite.setdefault(record.suite_id, []).append(record.id)
+        elif kind == 'testDone':
+            record = self.tests.get(event.get('testID'))
+            if record is None:
+                return
+            record.end_time = event.get('time')
+            record.result = event.get('result')
+            record.skipped = event.get('skipped', False)
+            record.hidden = event.get('hidden', False)
+            outcome = 'skipped' if record.skipped else record.result
+            self.by_outcome.setdefault(outcome, []).append(record.id)
+        elif kind == 'error':
+            record = self.tests.get(event.get('testID'))
+            if record is not None:
+                record.errors.append(event.get('error', ''))
+        elif kind == 'print':
+            record = self.tests.get(event.get('testID'))
+            if record is not None:
+                record.print_count += 1
+                message = event.get('message', '')
+                if record.exception is None and _EXCEPTION_BANNER in message:
+                    record.exception = _exception_summary(message)
+        elif kind == 'suite':
+            suite = event['suite']
+            self.suites[suite['id']] = suite.get('path')
+        elif kind == 'done':
+            self.success = event.get('success')
+            self.total_time = event.get('time')
+
+    def suite_path(self, suite_id, relative=True):
+        """Suite path, trimmed to the project-relative test/ path by default"""
+        path = self.suites.get(suite_id) or ''
+        if relative and '/test/' in path:
+            path = 'test/' + path.split('/test/', 1)[1]
+        return path
+
+    def visible_tests(self):
+        """Real tests, excluding the hidden 'loading <suite>' pseudo-tests"""
+        return [test for test in self.tests.values() if not test.hidden]
+
+    def failures(self):
+        return [self.tests[test_id] for result in FAILED_RESULTS
+                for test_id in self.by_outcome.get(result, ())
+                if not self.tests[test_id].hidden]
+
+    def counts(self):
+        tests = self.visible_tests()
+        return {
+            'total': len(tests),
+            'passed': sum(1 for t in tests if t.result == 'success' and not t.skipped),
+            'failed': sum(1 for t in tests if t.failed),
+            'skipped': sum(1 for t in tests if t.skipped),
+            'unfinished': sum(1 for t in tests if t.result is None),
+        }
+
+
+def _exception_summary(message):
+    """First line of the cause in a Flutter framework exception dump"""
+    lines = message.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith('The following') and line.rstrip().endswith(':'):
+            cause = ' '.join(l.strip() for l in lines[i + 1:i + 3] if l.strip())
+            return cause[:300]
+    return ''
+
+
+def iter_events(lines, index=None):
+    """Yield decoded reporter events from an iterable of lines, skipping noise"""
+    for line in lines:
+        # Every reporter event is a JSON object; pub output and plugin warnings never start with '{'
+        if not line.startswith('{'):
+            if index is not None and line.strip():
+                index.noise_lines += 1
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            if index is not None:
+                index.bad_lines += 1
+            continue
+        if isinstance(event, dict) and 'type' in event:
+            yield event
+
+
+def build_index(path=DEFAULT_REPORT):
+    """Stream a reporter file into a TestIndex"""
+    index = TestIndex()
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for event in iter_events(f, index):
+            index.add_event(event)
+    return index
+
+
+def load_index(path=DEFAULT_REPORT):
+    """Like build_index, but returns None when the report is missing or unreadable"""
+    try:
+        return build_index(path)
+    except OSError:
+        return None
+
+
+def render_test_status(index, source=DEFAULT_REPORT, limit=15):
+    """Markdown test status section for the CI feedback files (limit=0 leaves out the failing tests)"""
+    if index is None:
+        return (f"- **Test results**: no reporter output found at `{source}`\n"
+                f"- Generate it with: `flutter test --machine > {source}`\n")
+
+    counts = index.counts()
+    lines = [
+        f"- **Source**: `{source}`",
+        f"- **Total Tests**: {counts['total']}",
+        f"- **Passed**: {counts['passed']}",
+        f"- **Failed**: {counts['failed']}",
+    ]
+    if counts['skipped']:
+        lines.append(f"- **Skipped**: {counts['skipped']}")
+    if counts['unfinished']:
+        lines.append(f"- **Did not finish**: {counts['unfinished']}")
+
+    failures = index.failures()
+    if failures and limit:
+        lines.append("")
+        lines.append("### Failing Tests")
+        for test in failures[:limit]:
+            location = index.suite_path(test.suite_id)
+            if test.line and location:
+                location += f":{test.line}"
+            error = test.first_error_line()
+            detail = f" — {error}" if error else ""
+            lines.append(f"- `{location}` **{test.name}** ({test.result}){detail}")
+        if len(failures) > limit:
+            lines.append(f"- …and {len(failures) - limit} more")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_REPORT
+    index = load_index(path)
+    if index is None:
+        print(f"❌ Could not read reporter output: {path}")
+        sys.exit(1)
+    print(render_test_status(index, path))
+    print(f"ℹ️  Skipped {index.noise_lines} noise line(s), {index.bad_lines} malformed event(s)")
+    sys.exit(0 if not index.failures() else 2)
+
+
+if __name__ == "__main__":
+    main()
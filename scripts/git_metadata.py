@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Cached git branch/commit lookup without spawning git
+Reads .git/HEAD, the loose ref it points to and packed-refs directly and
+caches the result until one of those files changes (checked with stat, so a
+poll loop costs a few stat calls instead of a fork/exec per cycle). Layouts
+it can't read - reftable repositories, broken refs - fall back to
+`git rev-parse`.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Subprocess results are reused for this long when there are no files to watch
+FALLBACK_TTL = 5.0
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def find_git_dir(start='.'):
+    """(git dir, common dir) for the repository containing start, or (None, None)"""
+    path = os.path.abspath(start)
+    while True:
+        candidate = os.path.join(path, '.git')
+        if os.path.isdir(candidate):
+            return candidate, candidate
+        if os.path.isfile(candidate):
+            # Worktrees and submodules: ".git" is a file with "gitdir: <path>"
+            with open(candidate) as f:
+                content = f.read().strip()
+            if not content.startswith('gitdir:'):
+                return None, None
+            git_dir = os.path.normpath(os.path.join(path, content[7:].strip()))
+            common_dir = git_dir
+            commondir_file = os.path.join(git_dir, 'commondir')
+            if os.path.isfile(commondir_file):
+                with open(commondir_file) as f:
+                    common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+            return git_dir, common_dir
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None, None
+        path = parent
+
+
+class GitMetadata:
+    """Branch and HEAD commit of a working copy, re-read only when the ref files change"""
+
+    def __init__(self, path='.'):
+        self.path = os.path.abspath(path)
+        self.git_dir, self.common_dir = find_git_dir(self.path)
+        self._lock = threading.Lock()
+        self._key = None
+        self._value = None
+        self._fallback_at = 0.0
+        self._packed_key = None
+        self._packed = {}
+        self.reads = 0
+        self.subprocess_calls = 0
+
+    def _watched(self, ref=None):
+        paths = [os.path.join(self.git_dir, 'HEAD'), os.path.join(self.common_dir, 'packed-refs')]
+        if ref:
+            paths.append(os.path.join(self.common_dir, ref))
+        return tuple(_signature(p) for p in paths)
+
+    def _packed_refs(self):
+        path = os.path.join(self.common_dir, 'packed-refs')
+        key = _signature(path)
+        if key != self._packed_key:
+            refs = {}
+            if key is not None:
+                with open(path) as f:
+                    for line in f:
+                        if line.startswith(('#', '^')):
+                            continue
+                        sha, _, name = line.strip().partition(' ')
+                        if name:
+                            refs[name] = sha
+            self._packed_key, self._packed = key, refs
+        return self._packed
+
+    def _read(self):
+        """(branch, sha, ref) from the files, or None when they can't be interpreted"""
+        try:
+            with open(os.path.join(self.git_dir, 'HEAD')) as f:
+                head = f.read().strip()
+        except OSError:
+            return None
+        if not head.startswith('ref:'):
+            # Detached HEAD; `git rev-parse --abbrev-ref HEAD` prints "HEAD"
+            return ('HEAD', head, None) if len(head) in (40, 64) else None
+        ref = head[4:].strip()
+        if ref == 'refs/heads/.invalid':
+            return None  # reftable repository: HEAD is a placeholder
+        branch = ref[len('refs/heads/'):] if ref.startswith('refs/heads/') else ref
+        try:
+            with open(os.path.join(self.common_dir, ref)) as f:
+                sha = f.read().strip()
+        except OSError:
+            sha = self._packed_refs().get(ref)
+        if not sha:
+            return None
+        return branch, sha, ref
+
+    def _from_git(self):
+        self.subprocess_calls += 1
+        try:
+            # One process for both: --abbrev-ref only applies to the arguments after it
+            output = subprocess.check_output(["git", "rev-parse", "HEAD", "--abbrev-ref", "HEAD"], cwd=self.path,
+                                             stderr=subprocess.DEVNULL).decode().split()
+        except (OSError, subprocess.CalledProcessError):
+            return '', ''
+        if len(output) != 2:
+            return '', ''
+        return output[1], output[0]
+
+    def head(self):
+        """(branch, full sha); ('', '') outside a repository or on an unborn branch"""
+        with self._lock:
+            now = time.monotonic()
+            previous_ref = self._value[2] if self._value else None
+            if self._value is not None:
+                if self._fallback_at:
+                    fresh = now - self._fallback_at <= FALLBACK_TTL
+                else:
+                    fresh = self._watched(previous_ref) == self._key
+                if fresh:
+                    return self._value[:2]
+
+            # Stat before reading, so a ref that changes mid-read is noticed on the next call
+            key = self._watched(previous_ref) if self.git_dir else None
+            value = self._read() if self.git_dir else None
+            if value is None:
+                value = self._from_git() + (None,)
+                self._fallback_at = now
+            else:
+                self.reads += 1
+                self._fallback_at = 0.0
+                if value[2] != previous_ref:
+                    key = self._watched(value[2])
+            self._key = key
+            self._value = value
+            return value[:2]
+
+    def branch(self):
+        return self.head()[0]
+
+    def sha(self):
+        return self.head()[1]
+
+    def short_sha(self, length=8):
+        return self.head()[1][:length]
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_git_metadata(path='.'):
+    """Shared provider for the working copy at path"""
+    path = os.path.abspath(path)
+    with _providers_lock:
+        provider = _providers.get(path)
+        if provider is None:
+            provider = _providers[path] = GitMetadata(path)
+        return provider
+
+
+if __name__ == "__main__":
+    meta = GitMetadata(sys.argv[1] if len(sys.argv) > 1 else '.')
+    started = time.perf_counter()
+    for _ in range(1000):
+        branch, sha = meta.head()
+    elapsed = (time.perf_counter() - started) / 1000
+    print(f"🌿 {branch} @ {sha} (git dir {meta.git_dir})")
+    print(f"⏱️  {elapsed * 1e6:.1f}µs per lookup, {meta.reads} file read(s), {meta.subprocess_calls} git call(s)")
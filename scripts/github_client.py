@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Shared GitHub API client for the CI feedback scripts
+Keeps pooled keep-alive HTTPS connections per host, retries transient failures
+with jittered backoff, applies GITHUB_TOKEN auth in one place and records the
+timing of every request.
+"""
+
+import atexit
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from urllib.error import URLError
+from urllib.parse import urljoin, urlsplit
+
+import metrics
+from http_cache import HTTPCache
+from http_cassette import Cassette
+
+DEFAULT_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com')
+DEFAULT_REPO = "Josh-thephillipsequation/Eventflow"
+USER_AGENT = "eventflow-ci-feedback"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 5
+
+RequestTiming = namedtuple('RequestTiming', 'method url status elapsed bytes reused attempts')
+
+
+class GitHubError(URLError):
+    """Raised when a request fails after retries or returns an error status"""
+
+    def __init__(self, reason, status=None, url=None, body=b''):
+        super().__init__(reason)
+        self.status = status
+        self.url = url
+        self.body = body
+
+
+class GitHubResponse:
+    """A fully-read response, or one served from the conditional-request cache"""
+
+    def __init__(self, url, status, headers, body, elapsed, not_modified=False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.elapsed = elapsed
+        self.not_modified = not_modified
+        self._json = None
+
+    def json(self):
+        if self._json is None:
+            self._json = json.loads(self.body.decode())
+        return self._json
+
+
+class ConnectionPool:
+    """Idle keep-alive connections, kept per (scheme, host, port)"""
+
+    def __init__(self, max_idle_per_host=4, timeout=30):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme, host, port):
+        """Return (connection, reused)"""
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self.connect(scheme, host, port), False
+
+    def connect(self, scheme, host, port):
+        """Open a new connection (the TLS handshake happens lazily on first request)"""
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def release(self, scheme, host, port, conn):
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle.clear()
+
+
+class GitHubClient:
+    """Pooled, retrying GitHub REST client shared by all CI scripts"""
+
+    def __init__(self, token=None, api_url=DEFAULT_API_URL, timeout=30, max_retries=3,
+                 backoff=0.5, cache=None, pool_size=4):
+        self.token = token if token is not None else os.environ.get('GITHUB_TOKEN')
+        self.api_url = api_url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache if cache is not None else HTTPCache()
+        self.pool = ConnectionPool(max_idle_per_host=pool_size, timeout=timeout)
+        self.timings = deque(maxlen=500)
+        # Optional http_cassette.Cassette: record every response, or replay without the network
+        self.cassette = None
+        # Latest X-RateLimit-* values seen from the API host: limit, remaining, reset (epoch seconds)
+        self.rate_limit = {}
+
+    # URL and header helpers -------------------------------------------------
+
+    def url(self, path_or_url):
+        """Resolve an API path such as /repos/... against the configured API root"""
+        if path_or_url.startswith(('http://', 'https://')):
+            return path_or_url
+        return self.api_url + '/' + path_or_url.lstrip('/')
+
+    def repo_url(self, repo, path):
+        return self.url(f"/repos/{repo}/{path.lstrip('/')}")
+
+    def _headers(self, url, extra):
+        headers = {
+            'Accept': 'application/vnd.github+json',
+            'User-Agent': USER_AGENT,
+        }
+        # Only send credentials to the API host, never to redirect targets such as log storage
+        if self.token and urlsplit(url).netloc == urlsplit(self.api_url).netloc:
+            headers['Authorization'] = f'token {self.token}'
+        headers.update(extra or {})
+        return headers
+
+    # Transport --------------------------------------------------------------
+
+    def _sleep_before_retry(self, attempt, response=None):
+        retry_after = response.getheader('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = int(retry_after)
+        else:
+            # Full jitter: spread concurrent retries instead of synchronising them
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+        time.sleep(delay)
+
+    @staticmethod
+    def _set_timeout(conn, timeout):
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+
+    def _send_once(self, method, url, headers, timeout=None):
+        """Send one request on a pooled connection; returns (conn, response, reused)"""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        conn, reused = self.pool.acquire(parts.scheme, parts.hostname, port)
+        self._set_timeout(conn, timeout or self.pool.timeout)
+        try:
+            conn.request(method, path, headers=self._headers(url, headers))
+            return conn, conn.getresponse(), reused
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+        except Exception:
+            # Timeouts, TLS and protocol errors leave the connection in an unknown state
+            conn.close()
+            raise
+        # The server dropped an idle keep-alive connection; retry once on a fresh one
+        conn = self.pool.connect(parts.scheme, parts.hostname, port)
+        self._set_timeout(conn, timeout or self.pool.timeout)
+        try:
+            conn.request(method, path, headers=self._headers(url, headers))
+            return conn, conn.getresponse(), False
+        except Exception:
+            conn.close()
+            raise
+
+    def _finish(self, url, conn, response):
+        """Return a connection to the pool once its response has been fully consumed"""
+        if conn is None:
+            # Cassette responses have no connection behind them
+            return
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        if response.will_close or not response.isclosed():
+            conn.close()
+        else:
+            self.pool.release(parts.scheme, parts.hostname, port, conn)
+
+    def _open(self, method, url, headers, timeout=None):
+        """Send a request with retries and redirects; the caller reads the response body.
+
+        Returns (final_url, conn, response, reused, attempts). With a cassette
+        attached the response comes from (or is recorded into) the cassette.
+        """
+        url = self.url(url)
+        if self.cassette is not None:
+            return self.cassette.open(self, method, url, headers, timeout)
+        return self._open_network(method, url, headers, timeout)
+
+    def _open_network(self, method, url, headers, timeout=None):
+        for _ in range(MAX_REDIRECTS + 1):
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    conn, response, reused = self._send_once(method, url, headers, timeout)
+                except OSError as e:
+                    if attempt > self.max_retries:
+                        raise GitHubError(f"{method} {url} failed: {e}", url=url) from e
+                    self._sleep_before_retry(attempt)
+                    continue
+                if response.status in RETRY_STATUSES and attempt <= self.max_retries:
+                    response.read()
+                    self._finish(url, conn, response)
+                    self._sleep_before_retry(attempt, response)
+                    continue
+                break
+
+            if response.status in REDIRECT_STATUSES:
+                location = response.getheader('Location')
+                response.read()
+                self._finish(url, conn, response)
+                url = urljoin(url, location)
+                continue
+            return url, conn, response, reused, attempt
+        raise GitHubError(f"Too many redirects for {url}", url=url)
+
+    def _record_rate_limit(self, response):
+        remaining = response.getheader('X-RateLimit-Remaining')
+        if remaining is None:
+            return
+        self.rate_limit = {
+            'limit': int(response.getheader('X-RateLimit-Limit') or 0),
+            'remaining': int(remaining),
+            'reset': int(response.getheader('X-RateLimit-Reset') or 0),
+        }
+        metrics.set_gauge('ci_github_rate_limit_remaining', self.rate_limit['remaining'])
+
+    def _record_metrics(self, method, url, status, elapsed):
+        if metrics.ENABLED:
+            metrics.observe('ci_github_request_seconds', elapsed, method=method, status=str(status),
+                            endpoint=metrics.endpoint_label(url, urlsplit(self.api_url).netloc))
+
+    def request(self, method, url, headers=None, timeout=None):
+        """Perform a request and read the whole body"""
+        started = time.perf_counter()
+        final_url, conn, response, reused, attempts = self._open(method, url, headers, timeout)
+        self._record_rate_limit(response)
+        try:
+            body = response.read()
+        finally:
+            self._finish(final_url, conn, response)
+        elapsed = time.perf_counter() - started
+        self.timings.append(RequestTiming(method, final_url, response.status, elapsed,
+                                          len(body), reused, attempts))
+        self._record_metrics(method, url, response.status, elapsed)
+        return GitHubResponse(final_url, response.status, response.msg, body, elapsed)
+
+    @contextmanager
+    def stream(self, url, headers=None, timeout=None):
+        """Open a GET and yield the raw response for incremental reads"""
+        started = time.perf_counter()
+        final_url, conn, response, reused, attempts = self._open('GET', url, headers, timeout)
+        try:
+            yield response
+        finally:
+            if not response.isclosed():
+                # Unread body: the connection cannot be reused
+                response.close()
+                if conn is not None:
+                    conn.close()
+            else:
+                self._finish(final_url, conn, response)
+            length = response.getheader('Content-Length')
+            elapsed = time.perf_counter() - started
+            self.timings.append(RequestTiming('GET', final_url, response.status, elapsed,
+                                              int(length) if length and length.isdigit() else 0,
+                                              reused, attempts))
+            self._record_metrics('GET', self.url(url), response.status, elapsed)
+
+    # High-level helpers -----------------------------------------------------
+
+    def get(self, url, headers=None, conditional=False, timeout=None):
+        """GET a URL, raising GitHubError on error statuses.
+
+        With conditional=True the request carries cached validators and a 304 is
+        answered from the on-disk cache.
+        """
+        url = self.url(url)
+        request_headers = dict(headers or {})
+        # Cassettes hold full responses, so conditional requests are bypassed while one is attached
+        conditional = conditional and self.cassette is None
+        if conditional:
+            request_headers.update(self.cache.conditional_headers(url))
+
+        response = self.request('GET', url, request_headers, timeout)
+        if response.status == 304:
+            metrics.inc('ci_http_not_modified_total')
+        if response.status == 304 and conditional:
+            body = self.cache.load(url)
+            if body is None:
+                # Validator outlived its body; fetch unconditionally
+                return self.get(url, headers, conditional=False, timeout=timeout)
+            metrics.inc('ci_http_cache_hits_total')
+            response.body = body
+            response.not_modified = True
+            return response
+        if response.status >= 400:
+            raise GitHubError(f"HTTP {response.status} for {url}", status=response.status,
+                              url=url, body=response.body)
+        if conditional:
+            metrics.inc('ci_http_cache_misses_total')
+            self.cache.store(url, response.body, response.headers.get('ETag'),
+                             response.headers.get('Last-Modified'))
+        return response
+
+    def get_json(self, url, conditional=True):
+        """GET a JSON document; returns (data, not_modified)"""
+        response = self.get(url, conditional=conditional)
+        return self.cache.cached_json(response.url, response), response.not_modified
+
+    def use_cassette(self, cassette):
+        """Attach (or with None, detach) a record/replay cassette"""
+        self.cassette = cassette
+
+    def close(self):
+        if self.cassette is not None and self.cassette.mode == 'record':
+            self.cassette.save()
+        self.pool.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client so every script shares one connection pool"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = GitHubClient()
+            # CI_CASSETTE=path with CI_CASSETTE_MODE=record|replay applies to any script
+            if os.environ.get('CI_CASSETTE'):
+                attach_cassette(_default_client, os.environ['CI_CASSETTE'],
+                                os.environ.get('CI_CASSETTE_MODE', 'replay'))
+        return _default_client
+
+
+def attach_cassette(client, path, mode):
+    """Attach a cassette to a client; recordings are saved when the process exits"""
+    cassette = Cassette(path, mode)
+    client.use_cassette(cassette)
+    if mode == 'record':
+        atexit.register(cassette.save)
+    return cassette
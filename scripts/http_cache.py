@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Conditional-request HTTP cache for GitHub API polling
+Stores response bodies on disk with their ETag / Last-Modified validators so
+repeat polls can be answered with 304 Not Modified (which GitHub does not count
+against the rate limit). The cache is size-bounded with LRU eviction; a body
+file's mtime is its last use, so a cache hit costs no index write. Used by
+github_client.GitHubClient.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('CI_CACHE_DIR', '.ci_cache'), 'http')
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+# URLs whose parsed body is kept in memory
+DEFAULT_MAX_PARSED = 256
+
+
+class HTTPCache:
+    """On-disk response cache keyed by URL with size-bounded LRU eviction"""
+
+    INDEX_NAME = 'index.json'
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_parsed=DEFAULT_MAX_PARSED):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_parsed = max_parsed
+        self._lock = threading.Lock()
+        self._index = None
+        # Parsed bodies for entries revalidated in this process: url -> (etag, data), least recently used first
+        self._parsed = OrderedDict()
+
+    # Index handling -------------------------------------------------------
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, self.INDEX_NAME)
+
+    def _load_index(self, reload=False):
+        if self._index is None or reload:
+            try:
+                with open(self._index_path()) as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.index-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path())
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key + '.body')
+
+    # Public API -------------------------------------------------------------
+
+    def conditional_headers(self, url):
+        """Return If-None-Match / If-Modified-Since headers for a cached URL"""
+        with self._lock:
+            entry = self._load_index().get(self._key(url))
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def load(self, url):
+        """Return the cached body for a URL (marking it recently used), or None"""
+        key = self._key(url)
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if not entry:
+                return None
+            try:
+                with open(self._body_path(key), 'rb') as f:
+                    body = f.read()
+                # Recency lives in the body's mtime; the index is only rewritten by store()
+                os.utime(f.name)
+            except OSError:
+                # Evicted by another process; the next store() drops it from the index
+                index.pop(key, None)
+                return None
+            return body
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Store a 200 response if it carries a validator, then enforce the size bound"""
+        if not etag and not last_modified:
+            return
+        key = self._key(url)
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Pollers sharing the directory update the index one at a time, each from the file's current state
+            with open(os.path.join(self.cache_dir, 'index.lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.body-')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, self._body_path(key))
+                index = self._load_index(reload=True)
+                index[key] = {
+                    'url': url,
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'size': len(body),
+                }
+                self._evict(index)
+                self._save_index()
+
+    def _evict(self, index):
+        """Drop entries whose body is gone, then least recently used ones until under max_bytes"""
+        last_used = {}
+        for key in list(index):
+            try:
+                last_used[key] = os.stat(self._body_path(key)).st_mtime
+            except OSError:
+                del index[key]
+        total = sum(entry['size'] for entry in index.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(index, key=last_used.get):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            total -= index[key]['size']
+            del index[key]
+
+    def cached_json(self, url, response):
+        """Parse a response body once per (url, etag); only the latest ETag of the newest max_parsed URLs is kept"""
+        etag = response.headers.get('ETag') or self.conditional_headers(url).get('If-None-Match')
+        if etag:
+            with self._lock:
+                memo = self._parsed.get(url)
+                if memo and memo[0] == etag:
+                    self._parsed.move_to_end(url)
+                    response._json = memo[1]
+                    return response._json
+        data = response.json()
+        if etag:
+            with self._lock:
+                self._parsed[url] = (etag, data)
+                self._parsed.move_to_end(url)
+                while len(self._parsed) > self.max_parsed:
+                    self._parsed.popitem(last=False)
+        return data
+
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Record/replay cassettes for the shared GitHub client
+In record mode every response (after retries and redirects) is captured into
+a gzip-compressed JSON cassette; in replay mode the client is served from the
+cassette without touching the network, so the fetch-extract-render pipeline
+can be re-run offline against historical runs.
+"""
+
+import base64
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from email.message import Message
+
+CASSETTE_VERSION = 1
+MODES = ('record', 'replay')
+# Never persist credentials or cookies
+_SKIPPED_HEADERS = {'set-cookie', 'authorization'}
+
+
+class CassetteMiss(LookupError):
+    """A replayed request has no recorded response"""
+
+
+class CassetteResponse:
+    """Minimal stand-in for http.client.HTTPResponse backed by recorded bytes"""
+
+    will_close = True
+
+    def __init__(self, status, headers, body, reason=''):
+        self.status = status
+        self.reason = reason
+        self.msg = Message()
+        for name, value in headers:
+            self.msg[name] = value
+        self._body = io.BytesIO(body)
+        self._closed = False
+
+    def getheader(self, name, default=None):
+        return self.msg.get(name, default)
+
+    def getheaders(self):
+        return list(self.msg.items())
+
+    def read(self, amt=None):
+        data = self._body.read() if amt is None or amt < 0 else self._body.read(amt)
+        if not data or (amt is None or amt < 0):
+            self._closed = True
+        return data
+
+    def isclosed(self):
+        return self._closed
+
+    def close(self):
+        self._closed = True
+
+
+def _request_key(method, url, headers, api_url=''):
+    # API URLs are keyed relative to the API root so a cassette replays under any GITHUB_API_URL.
+    # Range changes the response (tail vs full log); nothing else we send does.
+    if api_url and url.startswith(api_url + '/'):
+        url = url[len(api_url):]
+    return f"{method} {url} {(headers or {}).get('Range', '')}"
+
+
+class Cassette:
+    """A recorded set of HTTP interactions, loaded from or saved to `path`"""
+
+    def __init__(self, path, mode='replay'):
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {MODES}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.meta = {}
+        self.interactions = []
+        self._by_key = {}
+        self._cursor = {}
+        if mode == 'replay':
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"unsupported cassette version {data.get('version')} in {self.path}")
+        self.meta = data.get('meta', {})
+        self.interactions = data['interactions']
+        self._by_key = {}
+        for interaction in self.interactions:
+            self._by_key.setdefault(interaction['key'], []).append(interaction)
+
+    def save(self):
+        """Atomically write the cassette (gzip-compressed JSON)"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.cassette-')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                f.write(json.dumps({'version': CASSETTE_VERSION, 'meta': self.meta,
+                                    'interactions': self.interactions}).encode('utf-8'))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def record(self, key, final_url, status, headers, body):
+        try:
+            encoded, encoding = body.decode('utf-8'), 'text'
+        except UnicodeDecodeError:
+            encoded, encoding = base64.b64encode(body).decode('ascii'), 'base64'
+        interaction = {
+            'key': key,
+            'url': final_url,
+            'status': status,
+            'headers': [[name, value] for name, value in headers if name.lower() not in _SKIPPED_HEADERS],
+            'encoding': encoding,
+            'body': encoded,
+            'recorded_at': time.time(),
+        }
+        self.interactions.append(interaction)
+        self._by_key.setdefault(key, []).append(interaction)
+
+    def lookup(self, key):
+        """Next recorded interaction for a key; the last one repeats once exhausted"""
+        recorded = self._by_key.get(key)
+        if not recorded:
+            raise CassetteMiss(f"no recorded response for {key.strip()} in {self.path}")
+        index = self._cursor.get(key, 0)
+        self._cursor[key] = index + 1
+        return recorded[min(index, len(recorded) - 1)]
+
+    def open(self, client, method, url, headers, timeout=None):
+        """Transport hook used by GitHubClient._open; same return shape"""
+        key = _request_key(method, url, headers, client.api_url)
+        if self.mode == 'replay':
+            interaction = self.lookup(key)
+            body = interaction['body'].encode('utf-8') if interaction['encoding'] == 'text' \
+                else base64.b64decode(interaction['body'])
+            return interaction['url'], None, CassetteResponse(interaction['status'], interaction['headers'],
+                                                              body), False, 1
+
+        final_url, conn, response, reused, attempts = client._open_network(method, url, headers, timeout)
+        try:
+            body = response.read()
+        finally:
+            client._finish(final_url, conn, response)
+        headers_list = response.getheaders()
+        self.record(key, final_url, response.status, headers_list, body)
+        return final_url, None, CassetteResponse(response.status, headers_list, body, response.reason), \
+            reused, attempts
+
+
+def summary(path):
+    """One line per recorded interaction: status, size, request"""
+    cassette = Cassette(path, 'replay')
+    lines = [f"📼 {path}: {len(cassette.interactions)} interaction(s) {cassette.meta}"]
+    for interaction in cassette.interactions:
+        size = len(interaction['body'])
+        lines.append(f"  {interaction['status']} {size:>9}  {interaction['key'].strip()}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python3 http_cassette.py <cassette.json.gz>")
+        sys.exit(1)
+    print(summary(sys.argv[1]))
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Annotation-first retrieval of failed job diagnostics
+Looks at the cheap data first - the job's step list and its check-run
+annotations - and only downloads raw log text when the annotations carry
+nothing beyond "Process completed with exit code N", or when they were cut
+off at GitHub's per-step limit. Even then only the
+failed step's time window of the log is kept, taken from log tails that grow
+until they reach back into the step.
+"""
+
+import sys
+
+import metrics
+from emit_annotations import MAX_ANNOTATIONS as STEP_ANNOTATION_LIMIT, OVERFLOW_TITLE
+from failure_extractor import FailureExtractor
+from github_client import DEFAULT_REPO, GitHubError, get_client
+from log_tail import CHUNK_SIZE, TailBuffer, decode_tail, fetch_log_tail
+
+DEFAULT_TAIL_BYTES = 10000
+TAIL_GROWTH = 8
+MAX_RANGE_BYTES = 8 * 1024 * 1024
+MAX_ANNOTATIONS = 50
+RETRIEVAL_MODES = ('annotations', 'logs')
+
+# Annotations GitHub adds to every failed step; they say nothing about the cause
+_GENERIC_ANNOTATIONS = ('Process completed with exit code', 'The operation was canceled',
+                        'The job running on runner')
+
+
+def failed_step(job):
+    """The first step that failed, or None (e.g. when steps are missing)"""
+    for step in job.get('steps') or ():
+        if step.get('conclusion') == 'failure':
+            return step
+    return None
+
+
+def fetch_annotations(client, repo, job):
+    """Annotations of the job's check run, all levels"""
+    check_run_url = job.get('check_run_url')
+    if check_run_url:
+        url = f"{check_run_url}/annotations?per_page={MAX_ANNOTATIONS}"
+    else:
+        url = client.repo_url(repo, f"check-runs/{job['id']}/annotations?per_page={MAX_ANNOTATIONS}")
+    annotations, _ = client.get_json(url, conditional=False)
+    return annotations
+
+
+def is_generic(annotation):
+    return annotation.get('message', '').startswith(_GENERIC_ANNOTATIONS)
+
+
+def is_truncated(annotations):
+    """True if failures were left out: emit_annotations.py counted an overflow, or a step exceeded GitHub's cap"""
+    failures = sum(1 for a in annotations if a.get('annotation_level') == 'failure' and not is_generic(a))
+    return failures > STEP_ANNOTATION_LIMIT or any(a.get('title') == OVERFLOW_TITLE for a in annotations)
+
+
+def annotations_as_log(annotations, step=None):
+    """Render annotations as `::error` workflow-command lines the failure extractor understands"""
+    lines = []
+    if step:
+        lines.append(f"##[group]Failed step: {step.get('name')}")
+    for annotation in annotations:
+        properties = []
+        path = annotation.get('path') or ''
+        if path and path != '.github':
+            properties.append(f"file={path}")
+            if annotation.get('start_line'):
+                properties.append(f"line={annotation['start_line']}")
+        if annotation.get('title'):
+            properties.append(f"title={annotation['title']}")
+        message = ' / '.join(line.strip() for line in annotation.get('message', '').splitlines() if line.strip())
+        lines.append(f"::error {','.join(properties)}::{message}")
+    return "\n".join(lines) + "\n"
+
+
+def _in_window(line, start, end):
+    """None for lines without a timestamp, else whether the line falls inside [start, end]"""
+    if line[4:5] != '-' or line[10:11] != 'T':
+        return None
+    stamp = line[:19]
+    return start <= stamp <= end
+
+
+def step_window(text, step):
+    """Keep the log lines written while `step` ran (continuation lines follow their predecessor)"""
+    start = (step.get('started_at') or '')[:19]
+    end = (step.get('completed_at') or '9999')[:19]
+    kept = []
+    keep = False
+    for line in text.splitlines():
+        inside = _in_window(line, start, end)
+        if inside is not None:
+            keep = inside
+        if keep:
+            kept.append(line)
+    return "\n".join(kept) + ("\n" if kept else "")
+
+
+def _iter_lines(stream, chunk_size=CHUNK_SIZE):
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def stream_step_window(client, url, step, max_bytes=DEFAULT_TAIL_BYTES, timeout=None):
+    """Stream a whole log keeping only the last max_bytes of the step's window"""
+    start = (step.get('started_at') or '')[:19].encode()
+    end = (step.get('completed_at') or '9999')[:19].encode()
+    buffer = TailBuffer(max_bytes)
+    kept = total = 0
+    keep = False
+    headers = {'Accept': 'application/vnd.github.v3.raw'}
+    with client.stream(url, headers=headers, timeout=timeout) as response:
+        if response.status >= 400:
+            raise GitHubError(f"HTTP {response.status} for {url}", status=response.status, url=url,
+                              body=response.read(1024))
+        for line in _iter_lines(response):
+            total += len(line) + 1
+            if line[4:5] == b'-' and line[10:11] == b'T':
+                keep = start <= line[:19] <= end
+            if keep:
+                buffer.write(line + b'\n')
+                kept += len(line) + 1
+    metrics.observe('ci_log_bytes', total)
+    return decode_tail(buffer.getvalue(), kept > max_bytes)
+
+
+def _first_stamp(text):
+    for line in text.splitlines():
+        if line[4:5] == '-' and line[10:11] == 'T':
+            return line[:19]
+    return None
+
+
+def fetch_step_log(client, repo, job, step, max_bytes=DEFAULT_TAIL_BYTES, timeout=None):
+    """The failed step's section of a job log, bounded to max_bytes.
+
+    Tails grow geometrically until they reach back into the step (later
+    `if: always()` steps may have written a lot after it); past
+    MAX_RANGE_BYTES the log is streamed once instead.
+    """
+    url = client.repo_url(repo, f"actions/jobs/{job['id']}/logs")
+    size = max_bytes
+    while True:
+        tail = fetch_log_tail(client, url, size, timeout)
+        if step is None:
+            return tail
+        section = step_window(tail, step)
+        first = _first_stamp(tail)
+        reached_start = first is None or first <= (step.get('started_at') or '')[:19]
+        if section or reached_start or len(tail.encode()) < size - 1024:
+            # Found the step, or this tail already covers everything back to it
+            return decode_tail(section.encode()[-max_bytes:], len(section.encode()) > max_bytes)
+        size *= TAIL_GROWTH
+        if size > MAX_RANGE_BYTES:
+            return stream_step_window(client, url, step, max_bytes, timeout)
+
+
+def fetch_job_diagnostics(client, repo, job, max_bytes=DEFAULT_TAIL_BYTES, timeout=None, mode='annotations'):
+    """{'job_name', 'logs', 'source'} for a failed job, cheapest sufficient source first"""
+    name = job.get('name', 'Unknown')
+    step = failed_step(job)
+    if mode == 'annotations':
+        try:
+            annotations = fetch_annotations(client, repo, job)
+        except GitHubError as e:
+            print(f"⚠️ No annotations for job {name}: {e}")
+            annotations = []
+        failures = [a for a in annotations if a.get('annotation_level') == 'failure']
+        if is_truncated(annotations):
+            print(f"ℹ️ Annotations of job {name} are incomplete - reading the step log instead")
+        elif any(not is_generic(a) for a in failures):
+            return {'job_name': name, 'logs': annotations_as_log(failures, step), 'source': 'annotations'}
+    if mode == 'logs':
+        url = client.repo_url(repo, f"actions/jobs/{job['id']}/logs")
+        return {'job_name': name, 'logs': fetch_log_tail(client, url, max_bytes, timeout), 'source': 'tail'}
+    return {'job_name': name, 'logs': fetch_step_log(client, repo, job, step, max_bytes, timeout),
+            'source': 'step' if step else 'tail'}
+
+
+def main():
+    # Show what each retrieval tier would use for a run's failed jobs
+    if len(sys.argv) < 2:
+        print("Usage: python3 job_diagnostics.py <run id> [owner/name]")
+        sys.exit(1)
+    run_id = sys.argv[1]
+    repo = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_REPO
+    client = get_client()
+    data, _ = client.get_json(client.repo_url(repo, f"actions/runs/{run_id}/jobs"))
+    for job in data.get('jobs', []):
+        if job.get('conclusion') != 'failure':
+            continue
+        before = sum(t.bytes for t in client.timings)
+        result = fetch_job_diagnostics(client, repo, job)
+        transferred = sum(t.bytes for t in client.timings) - before
+        records = FailureExtractor().extract_text(result['logs'], result['job_name'])
+        print(f"🔎 {result['job_name']}: {len(records)} failure(s) from {result['source']} ({transferred} bytes)")
+        for record in records:
+            print(f"   - [{record.category}] {record.message} {record.location}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Streaming lcov parser with coverage deltas between runs
+Reads coverage/lcov.info in one pass (SF/DA/LF/LH plus function and branch
+totals) keeping only counters for the current file, stores a compact per-file
+summary and compares it with the previous run's cached summary. Needs no lcov
+binary; `--summary` prints the same block as `lcov --summary`.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+DEFAULT_LCOV = 'coverage/lcov.info'
+DEFAULT_HISTORY = os.path.join(os.environ.get('CI_CACHE_DIR', '.ci_cache'), 'coverage_history.json')
+
+_INT_FIELDS = {b'LF': 'lf', b'LH': 'lh', b'FNF': 'functions_found', b'FNH': 'functions_hit',
+               b'BRF': 'branches_found', b'BRH': 'branches_hit'}
+
+
+class FileCoverage:
+    """Counters for one SF ... end_of_record block"""
+
+    __slots__ = ('path', 'lines_found', 'lines_hit', 'lf', 'lh', 'functions_found', 'functions_hit',
+                 'branches_found', 'branches_hit')
+
+    def __init__(self, path):
+        self.path = path
+        self.lines_found = 0
+        self.lines_hit = 0
+        self.lf = None
+        self.lh = None
+        self.functions_found = 0
+        self.functions_hit = 0
+        self.branches_found = 0
+        self.branches_hit = 0
+
+    def finish(self):
+        # DA records are the ground truth (lcov recounts them too); LF/LH only fill in when there are none
+        if not self.lines_found and self.lf is not None:
+            self.lines_found = self.lf
+            self.lines_hit = self.lh or 0
+        return self
+
+
+def iter_file_coverage(stream):
+    """Yield a FileCoverage per record from a binary line iterator"""
+    record = None
+    for line in stream:
+        if line.startswith(b'DA:'):
+            # DA:<line>,<count>[,<checksum>] - a count of exactly "0" is a miss
+            comma = line.find(b',', 3)
+            if record is None or comma < 0:
+                continue
+            record.lines_found += 1
+            if line[comma + 1:comma + 2] != b'0' or line[comma + 2:comma + 3].isdigit():
+                record.lines_hit += 1
+        elif line.startswith(b'SF:'):
+            record = FileCoverage(line[3:].strip().decode('utf-8', 'replace'))
+        elif line.startswith(b'end_of_record'):
+            if record is not None:
+                yield record.finish()
+            record = None
+        elif record is not None:
+            key, _, value = line.partition(b':')
+            field = _INT_FIELDS.get(key)
+            if field:
+                setattr(record, field, int(value))
+    if record is not None:
+        # Truncated file: keep what was read
+        yield record.finish()
+
+
+class CoverageSummary:
+    """Totals plus {path: (lines found, lines hit)}"""
+
+    def __init__(self, files=None, functions=(0, 0), branches=(0, 0), run=None, created_at=None):
+        self.files = files or {}
+        self.functions = tuple(functions)
+        self.branches = tuple(branches)
+        self.run = run
+        self.created_at = created_at or time.time()
+
+    @classmethod
+    def from_lcov(cls, path=DEFAULT_LCOV, run=None):
+        files = {}
+        functions_found = functions_hit = branches_found = branches_hit = 0
+        with open(path, 'rb') as f:
+            for record in iter_file_coverage(f):
+                found, hit = files.get(record.path, (0, 0))
+                files[record.path] = (found + record.lines_found, hit + record.lines_hit)
+                functions_found += record.functions_found
+                functions_hit += record.functions_hit
+                branches_found += record.branches_found
+                branches_hit += record.branches_hit
+        return cls(files, (functions_found, functions_hit), (branches_found, branches_hit), run)
+
+    @property
+    def lines(self):
+        found = hit = 0
+        for file_found, file_hit in self.files.values():
+            found += file_found
+            hit += file_hit
+        return found, hit
+
+    def to_dict(self):
+        return {'run': self.run, 'created_at': self.created_at, 'functions': list(self.functions),
+                'branches': list(self.branches), 'files': {p: list(v) for p, v in self.files.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({p: tuple(v) for p, v in data.get('files', {}).items()}, data.get('functions', (0, 0)),
+                   data.get('branches', (0, 0)), data.get('run'), data.get('created_at'))
+
+
+def percent(found, hit):
+    return 100.0 * hit / found if found else None
+
+
+def _rate(found, hit, unit):
+    if not found:
+        return "no data found"
+    return f"{percent(found, hit):.1f}% ({hit} of {found} {unit})"
+
+
+def render_summary(summary):
+    """Same shape as `lcov --summary` output"""
+    return ("Summary coverage rate:\n"
+            f"  lines......: {_rate(*summary.lines, 'lines')}\n"
+            f"  functions..: {_rate(*summary.functions, 'functions')}\n"
+            f"  branches...: {_rate(*summary.branches, 'branches')}\n")
+
+
+def compute_deltas(current, previous):
+    """Line-coverage changes per file: [(path, current %, delta pts or None if new)], largest first"""
+    changes = []
+    for path, (found, hit) in current.files.items():
+        now = percent(found, hit)
+        before = previous.files.get(path)
+        if before is None:
+            changes.append((path, now, None))
+            continue
+        was = percent(*before)
+        if now is not None and was is not None and abs(now - was) >= 0.05:
+            changes.append((path, now, now - was))
+    removed = sorted(set(previous.files) - set(current.files))
+    changes.sort(key=lambda c: (c[2] is not None, -abs(c[2] or 0), c[0]))
+    return changes, removed
+
+
+class CoverageHistory:
+    """Latest and previous summary per key (e.g. repo@branch), kept in one JSON file"""
+
+    def __init__(self, path=DEFAULT_HISTORY):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def record(self, key, summary):
+        """Store summary as the latest for key; returns the summary to compare against"""
+        entry = self.data.get(key, {})
+        latest = entry.get('latest')
+        if latest is not None and summary.run is not None and latest.get('run') == summary.run:
+            # Same run seen again (re-delivery, --force): keep comparing with the run before it
+            previous = entry.get('previous')
+        else:
+            previous = latest
+        self.data[key] = {'latest': summary.to_dict(), 'previous': previous}
+        self.save()
+        return CoverageSummary.from_dict(previous) if previous else None
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.coverage-history-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+
+def render_coverage_section(summary, previous=None, limit=10):
+    """Markdown coverage section for the CI feedback files"""
+    found, hit = summary.lines
+    line = f"- **Lines**: {_rate(found, hit, 'lines')}"
+    if previous is not None:
+        before = percent(*previous.lines)
+        now = percent(found, hit)
+        if before is not None and now is not None:
+            since = f"run {previous.run}" if previous.run else "previous run"
+            line += f" ({now - before:+.1f} pts vs {since})"
+    lines = [line]
+    if summary.functions[0]:
+        lines.append(f"- **Functions**: {_rate(*summary.functions, 'functions')}")
+    if summary.branches[0]:
+        lines.append(f"- **Branches**: {_rate(*summary.branches, 'branches')}")
+
+    if previous is None:
+        # Nothing to compare with yet: point at the least covered files instead
+        ranked = sorted((percent(*v), p) for p, v in summary.files.items() if v[0])
+        if ranked:
+            lines.append("")
+            lines.append("### Least Covered Files")
+            lines.extend(f"- `{path}` {pct:.1f}%" for pct, path in ranked[:limit])
+        return "\n".join(lines) + "\n"
+
+    changes, removed = compute_deltas(summary, previous)
+    if changes or removed:
+        lines.append("")
+        lines.append("### Coverage Changes")
+        for path, now, delta in changes[:limit]:
+            now_text = f"{now:.1f}%" if now is not None else "no lines"
+            change = "new file" if delta is None else f"{delta:+.1f} pts"
+            lines.append(f"- `{path}` {now_text} ({change})")
+        if len(changes) > limit:
+            lines.append(f"- …and {len(changes) - limit} more")
+        for path in removed[:limit]:
+            lines.append(f"- `{path}` (no longer in the report)")
+    return "\n".join(lines) + "\n"
+
+
+def coverage_feedback(lcov_path, key, run=None, history_path=DEFAULT_HISTORY):
+    """Parse lcov_path, record it under key and return the markdown section ('' if unreadable)"""
+    try:
+        summary = CoverageSummary.from_lcov(lcov_path, run)
+    except OSError:
+        return ""
+    previous = CoverageHistory(history_path).record(key, summary)
+    return render_coverage_section(summary, previous)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize an lcov tracefile without the lcov binary")
+    parser.add_argument('lcov', nargs='?', default=DEFAULT_LCOV, help=f"tracefile (default {DEFAULT_LCOV})")
+    parser.add_argument('--summary', action='store_true', help="print only the `lcov --summary` block")
+    parser.add_argument('--key', default='local', help="history key the deltas are tracked under")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSON file with previous summaries")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    try:
+        summary = CoverageSummary.from_lcov(args.lcov)
+    except OSError as e:
+        print(f"❌ Could not read {args.lcov}: {e}")
+        sys.exit(1)
+    print(render_summary(summary), end='')
+    if args.summary:
+        return
+    previous = CoverageHistory(args.history).record(args.key, summary)
+    print()
+    print(render_coverage_section(summary, previous), end='')
+    print(f"\nℹ️  {len(summary.files)} file(s) parsed in {time.perf_counter() - started:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Compressed, indexed archive of historical CI job logs
+Every fetched job log is appended to a rolling segment file as zlib blocks of
+whole lines (~64 KB each), so one line can be read by inflating one block.
+An SQLite index keeps, per job, the block table, the byte offsets of
+error-looking lines and token postings for those lines; searches intersect
+postings and inflate only the blocks holding candidate lines, read through
+mmap. Whole segments are dropped once they are too old or the archive too big.
+"""
+
+import argparse
+import bisect
+import fcntl
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from collections import namedtuple
+from datetime import datetime
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.environ.get('CI_CACHE_DIR', '.ci_cache'), 'log_archive')
+BLOCK_BYTES = 64 * 1024
+SEGMENT_BYTES = 32 * 1024 * 1024
+MAX_ARCHIVE_BYTES = 256 * 1024 * 1024
+MAX_AGE_DAYS = 90
+MAX_INDEXED_LINES = 5000
+COMPRESS_LEVEL = 6
+DEFAULT_SEARCH_RUNS = 50
+
+# Lines worth indexing (matched case-insensitively); the rest is only reachable with a full scan
+ERROR_KEYWORDS = (b'error', b'fail', b'exception', b'[e]', b'expected: ', b'actual: ', b'warning ')
+_TOKEN = re.compile(rb'[a-z_][a-z0-9_]{2,}')
+_TIMESTAMP = re.compile(rb'^\d{4}-\d\d-\d\dT[\d:.]+Z ')
+
+SearchHit = namedtuple('SearchHit', 'repo run_id job archived_at line')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    repo TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    job TEXT NOT NULL,
+    source TEXT,
+    archived_at REAL NOT NULL,
+    segment INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    stored INTEGER NOT NULL,
+    blocks BLOB NOT NULL,
+    lines BLOB NOT NULL,
+    UNIQUE (repo, run_id, job)
+);
+CREATE INDEX IF NOT EXISTS entries_by_run ON entries (run_id);
+CREATE INDEX IF NOT EXISTS entries_by_segment ON entries (segment);
+
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    entry INTEGER NOT NULL,
+    lines BLOB NOT NULL,
+    PRIMARY KEY (token, entry)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_entry ON postings (entry);
+"""
+
+
+def tokenize(text):
+    """Index tokens of a line or query: lower-case identifiers of 3+ characters"""
+    if isinstance(text, str):
+        text = text.encode('utf-8', 'surrogatepass')
+    return set(_TOKEN.findall(text.lower()))
+
+
+def query_terms(query):
+    """[(token, is_prefix)] usable to narrow a substring search through the postings.
+
+    A query word may be cut off: one at the very start (or glued to digits)
+    could be the tail of a longer word and is left out, and one running to
+    the end of the query is matched as a prefix.
+    """
+    text = query.encode('utf-8', 'surrogatepass').lower()
+    terms = []
+    for match in _TOKEN.finditer(text):
+        start, end = match.span()
+        if start == 0 or re.match(rb'[a-z0-9_]', text[start - 1:start]):
+            continue
+        terms.append((match.group().decode('ascii'), end == len(text)))
+    return terms
+
+
+def pack_blocks(data, block_bytes=BLOCK_BYTES, level=COMPRESS_LEVEL):
+    """(compressed bytes, block table) for data cut into blocks that end on newlines.
+
+    The table is a flat array of (offset in the compressed bytes, compressed
+    length, offset in data) triples.
+    """
+    parts = []
+    table = array('Q')
+    stored = start = 0
+    while start < len(data):
+        end = data.find(b'\n', start + block_bytes - 1)
+        end = len(data) if end < 0 else end + 1
+        block = zlib.compress(data[start:end], level)
+        table.extend((stored, len(block), start))
+        parts.append(block)
+        stored += len(block)
+        start = end
+    return b''.join(parts), table
+
+
+def _error_line_starts(data):
+    """Sorted offsets of lines containing an ERROR_KEYWORDS entry"""
+    lowered = data.lower()
+    starts = set()
+    for keyword in ERROR_KEYWORDS:
+        found = lowered.find(keyword)
+        while found >= 0:
+            starts.add(lowered.rfind(b'\n', 0, found) + 1)
+            end = lowered.find(b'\n', found)
+            if end < 0:
+                break
+            found = lowered.find(keyword, end)
+    return sorted(starts)
+
+
+def index_lines(data, limit=MAX_INDEXED_LINES):
+    """(error line offsets, {token: [line positions]}) for the indexed lines of data"""
+    offsets = array('I', _error_line_starts(data)[:limit])
+    postings = {}
+    for position, start in enumerate(offsets):
+        end = data.find(b'\n', start)
+        line = data[start:end if end >= 0 else len(data)]
+        for token in tokenize(_TIMESTAMP.sub(b'', line)):
+            postings.setdefault(token.decode('ascii'), array('I')).append(position)
+    return offsets, postings
+
+
+class _Entry:
+    """A job's row from the index with its block table unpacked"""
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.repo = row['repo']
+        self.run_id = row['run_id']
+        self.job = row['job']
+        self.archived_at = row['archived_at']
+        self.segment = row['segment']
+        self.blocks = array('Q', row['blocks'])
+        self.starts = self.blocks[2::3]
+        self.lines = array('I', row['lines'])
+
+
+class LogArchive:
+    """Append-only archive of job logs under `directory`"""
+
+    def __init__(self, directory=DEFAULT_ARCHIVE_DIR, segment_bytes=SEGMENT_BYTES,
+                 max_bytes=MAX_ARCHIVE_BYTES, max_age_days=MAX_AGE_DAYS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 3600
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._maps = {}
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f'segment-{segment:06d}.dat')
+
+    def _active_segment(self, incoming):
+        row = self._conn.execute("SELECT id, size FROM segments ORDER BY id DESC LIMIT 1").fetchone()
+        if row and (row['size'] == 0 or row['size'] + incoming <= self.segment_bytes):
+            return row['id']
+        segment = (row['id'] + 1) if row else 1
+        now = time.time()
+        self._conn.execute("INSERT INTO segments VALUES (?, 0, ?, ?)", (segment, now, now))
+        return segment
+
+    def add(self, repo, run_id, logs):
+        """Archive [{'job_name', 'logs'}] of a run; jobs already archived are skipped.
+
+        Returns the number of jobs added.
+        """
+        added = 0
+        with self._lock, open(os.path.join(self.directory, 'append.lock'), 'w') as lock_file:
+            # Appends from other processes (webhook server, monitor) go through the same lock
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            for log_data in logs:
+                job = log_data['job_name']
+                if self._conn.execute("SELECT 1 FROM entries WHERE repo = ? AND run_id = ? AND job = ?",
+                                      (repo, run_id, job)).fetchone():
+                    continue
+                data = log_data['logs'].encode('utf-8', 'surrogatepass')
+                packed, blocks = pack_blocks(data)
+                offsets, postings = index_lines(data)
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    segment = self._active_segment(len(packed))
+                    # Data goes in before the index row: a crash leaves unreferenced bytes, never a dangling entry
+                    with open(self._segment_path(segment), 'ab') as f:
+                        base = f.seek(0, os.SEEK_END)
+                        f.write(packed)
+                    for i in range(0, len(blocks), 3):
+                        blocks[i] += base
+                    now = time.time()
+                    cursor = self._conn.execute(
+                        "INSERT INTO entries (repo, run_id, job, source, archived_at, segment, size, stored, "
+                        "blocks, lines) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (repo, run_id, job, log_data.get('source'), now, segment, len(data), len(packed),
+                         blocks.tobytes(), offsets.tobytes()))
+                    self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                           [(token, cursor.lastrowid, positions.tobytes())
+                                            for token, positions in postings.items()])
+                    self._conn.execute("UPDATE segments SET size = ?, updated_at = ? WHERE id = ?",
+                                       (base + len(packed), now, segment))
+                added += 1
+        if added:
+            self.prune()
+        return added
+
+    def prune(self, max_bytes=None, max_age_days=None):
+        """Drop whole segments past the age limit, then oldest-first until under the size limit"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_age = self.max_age if max_age_days is None else max_age_days * 24 * 3600
+        dropped = []
+        with self._lock, open(os.path.join(self.directory, 'append.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            segments = self._conn.execute("SELECT id, size, updated_at FROM segments ORDER BY id").fetchall()
+            total = sum(row['size'] for row in segments)
+            cutoff = time.time() - max_age
+            for row in segments:
+                if row['updated_at'] >= cutoff and total <= max_bytes:
+                    break
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    self._conn.execute("DELETE FROM postings WHERE entry IN "
+                                       "(SELECT id FROM entries WHERE segment = ?)", (row['id'],))
+                    self._conn.execute("DELETE FROM entries WHERE segment = ?", (row['id'],))
+                    self._conn.execute("DELETE FROM segments WHERE id = ?", (row['id'],))
+                try:
+                    os.remove(self._segment_path(row['id']))
+                except FileNotFoundError:
+                    pass
+                self._forget_map(row['id'])
+                total -= row['size']
+                dropped.append(row['id'])
+        return dropped
+
+    def _forget_map(self, segment):
+        mapped = self._maps.pop(segment, None)
+        if mapped:
+            mapped[0].close()
+            mapped[1].close()
+
+    def _map(self, segment):
+        """Read-only mmap of a segment, remapped when the segment has grown"""
+        path = self._segment_path(segment)
+        mapped = self._maps.get(segment)
+        size = os.path.getsize(path)
+        if mapped is None or len(mapped[1]) < size:
+            self._forget_map(segment)
+            f = open(path, 'rb')
+            mapped = self._maps[segment] = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return mapped[1]
+
+    def _block(self, entry, index, cache):
+        key = (entry.id, index)
+        if key not in cache:
+            offset, length = entry.blocks[index * 3], entry.blocks[index * 3 + 1]
+            cache[key] = zlib.decompress(self._map(entry.segment)[offset:offset + length])
+        return cache[key]
+
+    def _line(self, entry, offset, cache):
+        index = bisect.bisect_right(entry.starts, offset) - 1
+        block = self._block(entry, index, cache)
+        start = offset - entry.starts[index]
+        end = block.find(b'\n', start)
+        return block[start:end if end >= 0 else len(block)]
+
+    def _entries(self, runs=DEFAULT_SEARCH_RUNS, repo=None):
+        """Entries of the newest `runs` archived runs, newest first"""
+        where, params = ("WHERE repo = ?", [repo]) if repo else ("", [])
+        rows = self._conn.execute(f"""
+            SELECT * FROM entries WHERE run_id IN
+                (SELECT DISTINCT run_id FROM entries {where} ORDER BY run_id DESC LIMIT ?)
+            {'AND repo = ?' if repo else ''} ORDER BY run_id DESC, id
+        """, params + [runs] + params).fetchall()
+        return [_Entry(row) for row in rows]
+
+    def read(self, repo, run_id, job):
+        """The archived text of one job log, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM entries WHERE repo = ? AND run_id = ? AND job = ?",
+                                     (repo, run_id, job)).fetchone()
+            if row is None:
+                return None
+            entry = _Entry(row)
+            cache = {}
+            data = b''.join(self._block(entry, i, cache) for i in range(len(entry.starts)))
+        return data.decode('utf-8', 'surrogatepass')
+
+    def search(self, query, runs=DEFAULT_SEARCH_RUNS, repo=None, regex=False, full=False, limit=200):
+        """SearchHits for query (case-insensitive) in the newest `runs` runs, newest run first.
+
+        By default only the indexed error lines are searched, narrowed through
+        the token postings; `full` inflates and scans every line instead.
+        """
+        if regex:
+            matcher = re.compile(query.encode('utf-8'), re.IGNORECASE).search
+        else:
+            needle = query.encode('utf-8', 'surrogatepass').lower()
+            matcher = lambda line: needle in line.lower()  # noqa: E731
+        terms = [] if regex or full else query_terms(query)
+
+        hits = []
+        with self._lock:
+            entries = self._entries(runs, repo)
+            candidates = self._candidates(terms, {entry.id for entry in entries}) if terms else None
+            cache = {}
+            for entry in entries:
+                if full:
+                    lines = self._scan(entry, cache)
+                else:
+                    positions = candidates.get(entry.id, ()) if terms else range(len(entry.lines))
+                    lines = (self._line(entry, entry.lines[p], cache) for p in positions)
+                for line in lines:
+                    if matcher(line):
+                        hits.append(SearchHit(entry.repo, entry.run_id, entry.job, entry.archived_at,
+                                              line.decode('utf-8', 'replace')))
+                        if len(hits) >= limit:
+                            return hits
+                cache.clear()
+        return hits
+
+    def _candidates(self, terms, wanted):
+        """{entry id: sorted line positions that contain every term}"""
+        found = None
+        for token, prefix in terms:
+            if prefix:
+                rows = self._conn.execute("SELECT entry, lines FROM postings WHERE token >= ? AND token < ?",
+                                          (token, token[:-1] + chr(ord(token[-1]) + 1)))
+            else:
+                rows = self._conn.execute("SELECT entry, lines FROM postings WHERE token = ?", (token,))
+            current = {}
+            for row in rows:
+                entry = row['entry']
+                if entry in wanted and (found is None or entry in found):
+                    current.setdefault(entry, set()).update(array('I', row['lines']))
+            if found is not None:
+                current = {entry: positions & found[entry] for entry, positions in current.items()}
+            found = {entry: positions for entry, positions in current.items() if positions}
+            if not found:
+                break
+        return {entry: sorted(positions) for entry, positions in found.items()}
+
+    def _scan(self, entry, cache):
+        for index in range(len(entry.starts)):
+            yield from self._block(entry, index, cache).splitlines()
+
+    def stats(self):
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) AS jobs, COUNT(DISTINCT run_id) AS runs, "
+                                     "COALESCE(SUM(size), 0) AS size, COALESCE(SUM(stored), 0) AS stored, "
+                                     "MIN(archived_at) AS oldest FROM entries").fetchone()
+            segments = self._conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return dict(row, segments=segments)
+
+    def close(self):
+        with self._lock:
+            for segment in list(self._maps):
+                self._forget_map(segment)
+            self._conn.close()
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_log_archive():
+    """Shared archive for the current process"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = LogArchive()
+        return _archive
+
+
+def archive_logs(repo, run_id, logs):
+    """Archive a run's fetched logs; archive problems never fail the caller"""
+    try:
+        return get_log_archive().add(repo, run_id, logs)
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ Could not archive logs of run {run_id}: {e}")
+        return 0
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search and maintain the local CI log archive")
+    parser.add_argument('--dir', default=DEFAULT_ARCHIVE_DIR, help=f"archive directory (default {DEFAULT_ARCHIVE_DIR})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    search = commands.add_parser('search', help="find lines across the newest archived runs")
+    search.add_argument('query')
+    search.add_argument('--runs', type=int, default=DEFAULT_SEARCH_RUNS,
+                        help=f"how many of the newest runs to search (default {DEFAULT_SEARCH_RUNS})")
+    search.add_argument('--repo', help="only runs of this owner/name")
+    search.add_argument('--regex', action='store_true', help="treat the query as a regular expression")
+    search.add_argument('--full', action='store_true', help="scan every line, not just indexed error lines")
+    search.add_argument('--limit', type=int, default=200, help="stop after this many matching lines")
+
+    add = commands.add_parser('add', help="archive local log files as the jobs of a run")
+    add.add_argument('repo')
+    add.add_argument('run_id', type=int)
+    add.add_argument('files', nargs='+')
+
+    commands.add_parser('stats', help="archive size and contents")
+
+    prune = commands.add_parser('prune', help="apply the retention limits now")
+    prune.add_argument('--max-mb', type=float, default=MAX_ARCHIVE_BYTES / 1024 / 1024)
+    prune.add_argument('--max-age-days', type=float, default=MAX_AGE_DAYS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    archive = LogArchive(args.dir)
+
+    if args.command == 'search':
+        started = time.perf_counter()
+        hits = archive.search(args.query, args.runs, args.repo, args.regex, args.full, args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+        for hit in hits:
+            print(f"{hit.run_id} {hit.job}: {hit.line.strip()}")
+        if not hits:
+            print(f"🔍 No matches in the newest {args.runs} run(s) ({elapsed:.1f} ms)")
+            return
+        first = min(hits, key=lambda hit: hit.run_id)
+        runs = len({hit.run_id for hit in hits})
+        print(f"\n🔍 {len(hits)} line(s) in {runs} run(s) ({elapsed:.1f} ms)")
+        print(f"🕰️  Earliest: run {first.run_id} ({first.repo}, archived {_format_time(first.archived_at)})")
+    elif args.command == 'add':
+        logs = []
+        for path in args.files:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                logs.append({'job_name': os.path.basename(path), 'logs': f.read()})
+        added = archive.add(args.repo, args.run_id, logs)
+        print(f"📚 Archived {added} job log(s) for run {args.run_id}")
+    elif args.command == 'stats':
+        stats = archive.stats()
+        ratio = stats['size'] / stats['stored'] if stats['stored'] else 0
+        print(f"📚 {stats['jobs']} job log(s) from {stats['runs']} run(s) in {stats['segments']} segment(s)")
+        print(f"💾 {stats['size'] / 1e6:.1f} MB of logs stored in {stats['stored'] / 1e6:.1f} MB ({ratio:.1f}x)")
+        if stats['oldest']:
+            print(f"🕰️  Oldest entry archived {_format_time(stats['oldest'])}")
+    elif args.command == 'prune':
+        dropped = archive.prune(int(args.max_mb * 1024 * 1024), args.max_age_days)
+        print(f"🧹 Dropped {len(dropped)} segment(s)")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory tail reader for CI job logs
+Asks the server for just the final window with an HTTP Range request and, when
+the server ignores it, streams the full body through a fixed-size ring buffer.
+Peak memory is proportional to the tail size, not the log size.
+"""
+
+import metrics
+from github_client import GitHubError
+
+DEFAULT_TAIL_BYTES = 10000
+CHUNK_SIZE = 64 * 1024
+
+
+class TailBuffer:
+    """Fixed-capacity ring buffer that keeps the last `capacity` bytes written"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._pos = 0
+        self._full = False
+
+    def write(self, data):
+        if len(data) >= self.capacity:
+            self._buf[:] = data[-self.capacity:]
+            self._pos = 0
+            self._full = True
+            return
+        end = self._pos + len(data)
+        if end <= self.capacity:
+            self._buf[self._pos:end] = data
+        else:
+            split = self.capacity - self._pos
+            self._buf[self._pos:] = data[:split]
+            self._buf[:end - self.capacity] = data[split:]
+        if end >= self.capacity:
+            self._full = True
+        self._pos = end % self.capacity
+
+    def getvalue(self):
+        if not self._full:
+            return bytes(self._buf[:self._pos])
+        return bytes(self._buf[self._pos:] + self._buf[:self._pos])
+
+
+def read_tail(stream, max_bytes=DEFAULT_TAIL_BYTES, chunk_size=CHUNK_SIZE):
+    """Read a file-like stream to EOF, keeping only the last max_bytes"""
+    buffer = TailBuffer(max_bytes)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer.write(chunk)
+    return buffer.getvalue()
+
+
+def decode_tail(data, truncated):
+    """Decode kept bytes, dropping the partial first line when the tail was cut"""
+    if truncated:
+        newline = data.find(b'\n')
+        if newline != -1:
+            data = data[newline + 1:]
+    return data.decode('utf-8', errors='ignore')
+
+
+def fetch_log_tail(client, url, max_bytes=DEFAULT_TAIL_BYTES, timeout=None):
+    """Fetch the last max_bytes of a log URL as text"""
+    headers = {
+        'Accept': 'application/vnd.github.v3.raw',
+        'Range': f'bytes=-{max_bytes}',
+    }
+    with client.stream(url, headers=headers, timeout=timeout) as response:
+        if response.status == 416:
+            # Nothing to tail (empty log)
+            response.read()
+            return ''
+        if response.status >= 400:
+            body = response.read(1024)
+            raise GitHubError(f"HTTP {response.status} for {url}", status=response.status,
+                              url=url, body=body)
+        data = read_tail(response, max_bytes)
+        length = response.getheader('Content-Length') or ''
+        metrics.observe('ci_log_bytes', int(length) if length.isdigit() else len(data))
+        if response.status == 206:
+            # Content-Range: bytes <start>-<end>/<total>; anything before <start> was skipped
+            content_range = response.getheader('Content-Range') or ''
+            truncated = not content_range.startswith('bytes 0-')
+        else:
+            truncated = len(data) == max_bytes
+        return decode_tail(data, truncated)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+In-process metrics for the CI feedback tooling
+Counters, gauges and fixed-bucket histograms with labels, exposed in the
+Prometheus text format by the webhook server or dumped as JSON by one-shot
+scripts. Collection is off until enable() is called (or CI_METRICS /
+CI_METRICS_JSON is set); while off every hook is a single flag check.
+"""
+
+import atexit
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+ENABLED = False
+
+
+class Metric:
+    """One metric family; `series` maps a sorted label tuple to its value"""
+
+    def __init__(self, name, kind, help_text, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.buckets = tuple(buckets) if buckets else None
+        self.series = {}
+
+    def _histogram(self, labels):
+        state = self.series.get(labels)
+        if state is None:
+            state = self.series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+        return state
+
+
+class Registry:
+    """Thread-safe collection of metric families"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def define(self, name, kind, help_text, buckets=None):
+        self._metrics[name] = Metric(name, kind, help_text, buckets)
+
+    def inc(self, name, amount=1, labels=()):
+        metric = self._metrics[name]
+        with self._lock:
+            metric.series[labels] = metric.series.get(labels, 0) + amount
+
+    def set(self, name, value, labels=()):
+        metric = self._metrics[name]
+        with self._lock:
+            metric.series[labels] = value
+
+    def observe(self, name, value, labels=()):
+        metric = self._metrics[name]
+        with self._lock:
+            state = metric._histogram(labels)
+            state['sum'] += value
+            state['count'] += 1
+            for i, bound in enumerate(metric.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+                    break
+
+    def reset(self):
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.series.clear()
+
+    def render_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for metric in self._metrics.values():
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                for labels, value in sorted(metric.series.items()):
+                    if metric.kind != 'histogram':
+                        lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, value['buckets']):
+                        cumulative += count
+                        lines.append(f"{metric.name}_bucket{_format_labels(labels + (('le', repr(float(bound))),))} "
+                                     f"{cumulative}")
+                    lines.append(f"{metric.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {value['count']}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """Plain-data snapshot for JSON dumps"""
+        snapshot = {}
+        with self._lock:
+            for metric in self._metrics.values():
+                series = []
+                for labels, value in sorted(metric.series.items()):
+                    entry = {'labels': dict(labels)}
+                    if metric.kind == 'histogram':
+                        entry.update(count=value['count'], sum=value['sum'],
+                                     buckets=dict(zip((str(b) for b in metric.buckets), value['buckets'])))
+                    else:
+                        entry['value'] = value
+                    series.append(entry)
+                snapshot[metric.name] = {'type': metric.kind, 'help': metric.help, 'series': series}
+        return snapshot
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+REGISTRY.define('ci_webhook_request_seconds', 'histogram', 'Webhook server request handling time',
+                LATENCY_BUCKETS)
+REGISTRY.define('ci_github_request_seconds', 'histogram', 'GitHub API call latency by endpoint',
+                LATENCY_BUCKETS)
+REGISTRY.define('ci_log_bytes', 'histogram', 'Job log bytes fetched per job', BYTES_BUCKETS)
+REGISTRY.define('ci_extraction_seconds', 'histogram', 'Failure extraction time per log', LATENCY_BUCKETS)
+REGISTRY.define('ci_feedback_render_seconds', 'histogram', 'Feedback rendering time by generator',
+                LATENCY_BUCKETS)
+REGISTRY.define('ci_feedback_write_seconds', 'histogram', 'Feedback file write time', LATENCY_BUCKETS)
+REGISTRY.define('ci_feedback_writes_total', 'counter', 'Feedback write requests by outcome')
+REGISTRY.define('ci_http_cache_hits_total', 'counter', 'Conditional GETs answered from the local cache')
+REGISTRY.define('ci_http_cache_misses_total', 'counter', 'Conditional GETs that returned a fresh body')
+REGISTRY.define('ci_http_not_modified_total', 'counter', 'HTTP 304 responses from GitHub')
+REGISTRY.define('ci_github_rate_limit_remaining', 'gauge', 'Latest X-RateLimit-Remaining value')
+
+
+def enable(registry_reset=False):
+    global ENABLED
+    if registry_reset:
+        REGISTRY.reset()
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def inc(name, amount=1, **labels):
+    if ENABLED:
+        REGISTRY.inc(name, amount, _labels(labels))
+
+
+def set_gauge(name, value, **labels):
+    if ENABLED:
+        REGISTRY.set(name, value, _labels(labels))
+
+
+def observe(name, value, **labels):
+    if ENABLED:
+        REGISTRY.observe(name, value, _labels(labels))
+
+
+class _Timer:
+    __slots__ = ('name', 'labels', 'started')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.started, self.labels)
+        return False
+
+
+_NULL_TIMER = nullcontext()
+
+
+def timer(name, **labels):
+    """Context manager observing elapsed seconds into a histogram (a shared no-op when disabled)"""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, _labels(labels))
+
+
+def timed(name, **labels):
+    """Decorator form of timer()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with _Timer(name, _labels(labels)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_label(url, api_netloc=None):
+    """Low-cardinality endpoint name, e.g. /repos/{repo}/actions/runs/{id}/jobs"""
+    parts = urlsplit(url)
+    if api_netloc and parts.netloc != api_netloc:
+        # Redirect targets such as log blob storage: label by host only
+        return parts.netloc
+    path = parts.path
+    if path.startswith('/repos/'):
+        segments = path.split('/', 4)
+        path = '/repos/{repo}' + ('/' + segments[4] if len(segments) > 4 else '')
+    return _ID_SEGMENT.sub('/{id}', path)
+
+
+def dump_json(path):
+    """Write the current snapshot to path ('-' for stdout)"""
+    data = json.dumps(REGISTRY.to_dict(), indent=2)
+    if path == '-':
+        print(data)
+        return
+    with open(path, 'w') as f:
+        f.write(data + "\n")
+
+
+def dump_at_exit(path):
+    enable()
+    atexit.register(dump_json, path)
+
+
+if os.environ.get('CI_METRICS_JSON'):
+    dump_at_exit(os.environ['CI_METRICS_JSON'])
+elif os.environ.get('CI_METRICS', '') not in ('', '0'):
+    enable()
+
+
+if __name__ == "__main__":
+    # Fetch and pretty-print a running webhook server's metrics
+    from urllib.request import urlopen
+    url = sys.argv[1] if len(sys.argv) > 1 else 'http://localhost:8080/metrics'
+    with urlopen(url) as response:
+        print(response.read().decode())
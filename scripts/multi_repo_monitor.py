@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Concurrent CI monitor for many repository/branch targets in one process
+An asyncio loop polls every configured target on its own adaptive schedule,
+sharing a single GitHub client (and its keep-alive pool, HTTP cache and rate
+limit budget), and writes a separate feedback file for each target.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import namedtuple
+
+from auto_ci_feedback import (DEFAULT_JOB_TIMEOUT, extract_failures, generate_automated_feedback, get_ci_logs,
+                              render_logs_unavailable)
+from feedback_writer import get_writer
+from flutter_reporter import DEFAULT_REPORT, load_index
+from github_client import get_client
+from log_archive import archive_logs
+from poll_scheduler import PollScheduler
+from run_state import DEFAULT_STATE_DB, RunStateStore
+
+DEFAULT_CONFIG = 'ci_targets.json'
+DEFAULT_FEEDBACK_DIR = 'ci_feedback'
+DEFAULT_CONCURRENCY = 4
+DEFAULT_LOG_WORKERS = 2
+
+Target = namedtuple('Target', 'repo branch feedback_file test_report')
+
+
+def feedback_path(feedback_dir, repo, branch):
+    """Default per-target feedback file, e.g. ci_feedback/owner__app__main.md"""
+    name = f"{repo.replace('/', '__')}__{branch.replace('/', '_')}.md"
+    return os.path.join(feedback_dir, name)
+
+
+def parse_target(spec, feedback_dir=DEFAULT_FEEDBACK_DIR):
+    """Build a Target from 'owner/name@branch' or a config dict"""
+    if isinstance(spec, str):
+        repo, _, branch = spec.partition('@')
+        spec = {'repo': repo, 'branch': branch or 'main'}
+    if '/' not in spec.get('repo', ''):
+        raise ValueError(f"target repo must be owner/name: {spec!r}")
+    branch = spec.get('branch', 'main')
+    return Target(spec['repo'], branch,
+                  spec.get('feedback_file') or feedback_path(feedback_dir, spec['repo'], branch),
+                  spec.get('test_report'))
+
+
+def load_config(path):
+    """Read a JSON config: {"targets": [...], "poll": {...}, "feedback_dir": ..., "max_concurrency": ...}"""
+    with open(path) as f:
+        config = json.load(f)
+    feedback_dir = config.get('feedback_dir', DEFAULT_FEEDBACK_DIR)
+    config['targets'] = [parse_target(spec, feedback_dir) for spec in config.get('targets', [])]
+    return config
+
+
+class MultiRepoMonitor:
+    """Polls a set of targets concurrently and writes feedback for new failed runs"""
+
+    def __init__(self, targets, poll_settings=None, max_concurrency=DEFAULT_CONCURRENCY,
+                 log_workers=DEFAULT_LOG_WORKERS, job_timeout=DEFAULT_JOB_TIMEOUT, state_db=DEFAULT_STATE_DB):
+        self.targets = list(targets)
+        self.client = get_client()
+        self.state = RunStateStore(state_db)
+        self.writer = get_writer()
+        self.max_concurrency = max_concurrency
+        self.log_workers = log_workers
+        self.job_timeout = job_timeout
+        # Every target spends the same token's budget, so each poll costs len(targets) calls of headroom
+        settings = dict(poll_settings or {})
+        settings.setdefault('calls_per_poll', len(self.targets))
+        self.schedulers = {target: PollScheduler(**settings) for target in self.targets}
+        self._slots = None
+
+    async def _call(self, func, *args):
+        """Run a blocking client call in a worker thread, bounded so connections get reused"""
+        async with self._slots:
+            return await asyncio.to_thread(func, *args)
+
+    def fetch_latest_run(self, target):
+        """Return (latest run or None, not_modified) for a target"""
+        since = self.state.since_filter(target.repo, target.branch)
+        url = self.client.repo_url(target.repo, f"actions/runs?branch={target.branch}&per_page=1{since}")
+        try:
+            data, not_modified = self.client.get_json(url)
+        finally:
+            for scheduler in self.schedulers.values():
+                scheduler.update_rate_limit(self.client.rate_limit)
+        runs = data.get('workflow_runs', [])
+        self.state.record_runs(target.repo, runs)
+        return (runs[0] if runs else None), not_modified
+
+    def process_failure(self, target, run):
+        """Fetch logs for a failed run and write the target's feedback file; False if logs were incomplete"""
+        logs = self.state.load_logs(run['id'])
+        if logs is None:
+            logs, complete = get_ci_logs(run['id'], self.log_workers, self.job_timeout, target.repo)
+            if not complete:
+                self.writer.write(target.feedback_file, render_logs_unavailable(run, logs, target.repo))
+                print(f"⚠️ {target.repo}@{target.branch}: logs of run {run['id']} incomplete, will retry")
+                return False
+            self.state.save_logs(run['id'], logs)
+            archive_logs(target.repo, run['id'], logs)
+        records = extract_failures(logs)
+        self.state.save_failures(run['id'], records)
+        delta = self.state.record_failure_set(f"{target.repo}@{target.branch}", run['id'], records)
+        if not delta.changed and os.path.exists(target.feedback_file):
+            print(f"⏭️  {target.repo}@{target.branch}: same failures as run {delta.previous_run}, feedback unchanged")
+        else:
+            test_index = load_index(target.test_report) if target.test_report else None
+            feedback = generate_automated_feedback(run, logs, test_index, target.test_report or DEFAULT_REPORT,
+                                                   records, target.repo, delta=delta)
+            self.writer.write(target.feedback_file, feedback)
+        self.state.mark_processed(run['id'])
+        return True
+
+    async def poll_target(self, target):
+        """Poll one target once and return the scheduler's next decision"""
+        scheduler = self.schedulers[target]
+        label = f"{target.repo}@{target.branch}"
+        try:
+            run, not_modified = await self._call(self.fetch_latest_run, target)
+            scheduler.record_poll(run, changed=not not_modified)
+            if run and run.get('conclusion') == 'failure' and not self.state.is_processed(run['id']):
+                print(f"🚨 {label}: run {run['id']} failed - generating feedback")
+                if await self._call(self.process_failure, target, run):
+                    print(f"✅ {label}: feedback written to {target.feedback_file}")
+        except Exception as e:
+            print(f"❌ {label}: {e}")
+            scheduler.record_error()
+        return scheduler.next_interval()
+
+    async def watch_target(self, target, stop):
+        previous_reason = None
+        while not stop.is_set():
+            decision = await self.poll_target(target)
+            if decision.reason != previous_reason:
+                print(f"⏱️  {target.repo}@{target.branch}: next poll in {decision.interval:.0f}s ({decision.reason})")
+                previous_reason = decision.reason
+            try:
+                await asyncio.wait_for(stop.wait(), decision.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, once=False):
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        if once:
+            await asyncio.gather(*(self.poll_target(target) for target in self.targets))
+            return
+        stop = asyncio.Event()
+        await asyncio.gather(*(self.watch_target(target, stop) for target in self.targets))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Watch CI for several repositories and branches in one process")
+    parser.add_argument('--config', help=f"JSON target config (default {DEFAULT_CONFIG} if present)")
+    parser.add_argument('--target', action='append', default=[], metavar='OWNER/NAME@BRANCH',
+                        help="extra target to watch; may be repeated")
+    parser.add_argument('--feedback-dir', default=DEFAULT_FEEDBACK_DIR,
+                        help="directory for per-target feedback files given with --target")
+    parser.add_argument('--concurrency', type=int,
+                        help=f"maximum concurrent API calls (default {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--state-db', default=DEFAULT_STATE_DB, help="SQLite run state file")
+    parser.add_argument('--once', action='store_true', help="poll every target once and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = {'targets': []}
+    config_path = args.config or (DEFAULT_CONFIG if os.path.exists(DEFAULT_CONFIG) else None)
+    if config_path:
+        config = load_config(config_path)
+    targets = config['targets'] + [parse_target(spec, args.feedback_dir) for spec in args.target]
+    if not targets:
+        print(f"❌ No targets: pass --target OWNER/NAME@BRANCH or create {DEFAULT_CONFIG}")
+        sys.exit(1)
+
+    monitor = MultiRepoMonitor(targets, config.get('poll'),
+                               args.concurrency or config.get('max_concurrency', DEFAULT_CONCURRENCY),
+                               state_db=args.state_db)
+    print(f"🚀 Monitoring {len(targets)} target(s): {', '.join(f'{t.repo}@{t.branch}' for t in targets)}")
+    try:
+        asyncio.run(monitor.run(once=args.once))
+    except KeyboardInterrupt:
+        print("\n🛑 Monitoring stopped")
+    finally:
+        monitor.writer.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Process-pool failure extraction for large matrix runs
+Job logs are written once to a temporary spool file and split into chunks at
+line boundaries; worker processes get only (path, byte range) and return the
+regex matches of their chunk. The cheap cap/followup bookkeeping is replayed
+in the parent in job and line order, so the result is identical to a
+sequential pass. Small batches stay in-process - forking is not worth it;
+a wide matrix run with many failed jobs is large enough even though each job
+contributes only its failed step's tail.
+"""
+
+import atexit
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+from failure_extractor import FailureExtractor
+
+# A batch goes to the pool when it has this many characters of log text...
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+# ...or, as a wide matrix run does, many failed jobs (each a <=10 KB tail or step
+# section from auto_ci_feedback) adding up to at least PARALLEL_MIN_JOB_BYTES
+PARALLEL_MIN_JOBS = 16
+PARALLEL_MIN_JOB_BYTES = 64 * 1024
+CHUNK_BYTES = 2 * 1024 * 1024
+
+
+def default_workers():
+    """CI_ANALYSIS_WORKERS, else one worker per CPU"""
+    value = os.environ.get('CI_ANALYSIS_WORKERS')
+    if value:
+        return max(1, int(value))
+    return os.cpu_count() or 1
+
+
+def split_lines(data, chunk_bytes=CHUNK_BYTES):
+    """[(start, end, first line number)] covering data, each ending on a newline"""
+    chunks = []
+    start = line = 0
+    while start < len(data):
+        end = data.find(b'\n', start + chunk_bytes - 1)
+        end = len(data) if end < 0 else end + 1
+        chunks.append((start, end, line))
+        line += data.count(b'\n', start, end)
+        start = end
+    return chunks
+
+
+_worker_extractor = None
+
+
+def _scan_chunk(path, start, end, job, first_line):
+    """Worker side: match events for one byte range of the spool file"""
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = FailureExtractor()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8', 'surrogatepass')
+    return list(_worker_extractor.events(io.StringIO(text), job, first_line))
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """Shared pool, created on first use and reused; shut down at exit"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is None:
+                atexit.register(shutdown)
+            else:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def extract_sequential(logs, extractor=None):
+    extractor = extractor or FailureExtractor()
+    records = []
+    for log_data in logs:
+        records.extend(extractor.extract_text(log_data['logs'], log_data['job_name']))
+    return records
+
+
+def extract_parallel(logs, workers, chunk_bytes=CHUNK_BYTES):
+    """Scan every log's chunks in the pool and replay them in job order"""
+    extractor = FailureExtractor()
+    pool = _get_pool(workers)
+    with tempfile.NamedTemporaryFile(prefix='ci-logs-', suffix='.log') as spool:
+        jobs = []
+        offset = 0
+        for log_data in logs:
+            data = log_data['logs'].encode('utf-8', 'surrogatepass')
+            spool.write(data)
+            jobs.append([(offset + start, offset + end, line) for start, end, line in split_lines(data, chunk_bytes)])
+            offset += len(data)
+        spool.flush()
+
+        with metrics.timer('ci_extraction_seconds'):
+            futures = [[pool.submit(_scan_chunk, spool.name, start, end, log_data['job_name'], line)
+                        for start, end, line in chunks]
+                       for log_data, chunks in zip(logs, jobs)]
+            records = []
+            for chunk_futures in futures:
+                events = (event for future in chunk_futures for event in future.result())
+                records.extend(extractor.replay(events))
+    return records
+
+
+def use_pool(logs, workers, min_bytes=PARALLEL_MIN_BYTES, min_jobs=PARALLEL_MIN_JOBS):
+    """True if a batch is worth the pool: lots of text, or many jobs with a fair amount of text"""
+    if workers <= 1:
+        return False
+    size = sum(len(log_data['logs']) for log_data in logs)
+    return size >= min_bytes or (len(logs) >= min_jobs and size >= min(min_bytes, PARALLEL_MIN_JOB_BYTES))
+
+
+def extract_logs(logs, workers=None, min_bytes=PARALLEL_MIN_BYTES, min_jobs=PARALLEL_MIN_JOBS):
+    """FailureRecords for [{'job_name', 'logs'}], in a process pool when the batch is large"""
+    workers = default_workers() if workers is None else workers
+    if not use_pool(logs, workers, min_bytes, min_jobs):
+        return extract_sequential(logs)
+    try:
+        return extract_parallel(logs, workers)
+    except (BrokenProcessPool, OSError) as e:
+        print(f"⚠️ Parallel log analysis failed ({e}) - analysing in-process")
+        shutdown()
+        return extract_sequential(logs)
+
+
+def main():
+    # Compare sequential and pooled analysis on log files: parallel_extract.py <workers> <log>...
+    if len(sys.argv) < 3:
+        print("Usage: python3 parallel_extract.py <workers> <log file>...")
+        sys.exit(1)
+    workers = int(sys.argv[1])
+    logs = []
+    for path in sys.argv[2:]:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            logs.append({'job_name': os.path.basename(path), 'logs': f.read()})
+    size = sum(len(log_data['logs']) for log_data in logs)
+
+    started = time.perf_counter()
+    sequential = extract_sequential(logs)
+    sequential_time = time.perf_counter() - started
+    started = time.perf_counter()
+    parallel = extract_logs(logs, workers, min_bytes=0)
+    parallel_time = time.perf_counter() - started
+
+    print(f"🔎 {len(parallel)} failure(s) in {len(logs)} log(s), {size / 1e6:.1f} MB")
+    print(f"⏱️  sequential {sequential_time:.2f}s, {workers} worker(s) {parallel_time:.2f}s")
+    print("✅ Identical results" if parallel == sequential else "❌ Results differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Adaptive polling scheduler for GitHub Actions monitoring
+Polls quickly while a run is queued or in progress, backs off exponentially
+while CI is idle or erroring, and never schedules polls faster than the
+remaining X-RateLimit budget allows before the window resets.
+"""
+
+import time
+from collections import namedtuple
+
+PollDecision = namedtuple('PollDecision', 'interval reason')
+
+ACTIVE_STATUSES = {'queued', 'in_progress', 'waiting', 'requested', 'pending'}
+
+
+class PollScheduler:
+    """Chooses the delay before the next poll and records why"""
+
+    def __init__(self, active_interval=10, idle_interval=30, max_idle_interval=600,
+                 error_interval=60, max_error_interval=900, backoff=2.0,
+                 calls_per_poll=1, rate_limit_reserve=20):
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.max_idle_interval = max_idle_interval
+        self.error_interval = error_interval
+        self.max_error_interval = max_error_interval
+        self.backoff = backoff
+        self.calls_per_poll = calls_per_poll
+        self.rate_limit_reserve = rate_limit_reserve
+
+        self.active = False
+        self.idle_polls = 0
+        self.consecutive_errors = 0
+        self.rate_limit = {}
+        self.last_decision = None
+        self._last_state = None
+
+    def record_poll(self, run, changed=True):
+        """Record a successful poll; `run` is the latest workflow run (or None)"""
+        self.consecutive_errors = 0
+        state = (run.get('id'), run.get('status'), run.get('conclusion')) if run else None
+        self.active = bool(run) and run.get('status') in ACTIVE_STATUSES
+        if changed and state != self._last_state:
+            # Something moved: start the idle backoff from the bottom again
+            self.idle_polls = 0
+        else:
+            self.idle_polls += 1
+        self._last_state = state
+
+    def record_error(self):
+        self.consecutive_errors += 1
+
+    def update_rate_limit(self, rate_limit):
+        """Feed the client's latest {'remaining', 'reset', 'limit'} values"""
+        if rate_limit:
+            self.rate_limit = dict(rate_limit)
+
+    def _rate_limit_floor(self, now):
+        """Minimum interval that keeps polling inside the remaining budget"""
+        remaining = self.rate_limit.get('remaining')
+        reset = self.rate_limit.get('reset')
+        if remaining is None or not reset:
+            return 0, None
+        window = max(reset - now, 0)
+        if window == 0:
+            return 0, None
+        budget = remaining - self.rate_limit_reserve
+        if budget < self.calls_per_poll:
+            return window + 1, f"rate limit nearly exhausted ({remaining} left), waiting for reset"
+        floor = window * self.calls_per_poll / budget
+        return floor, f"spreading {remaining} remaining calls over {window:.0f}s"
+
+    def next_interval(self, now=None):
+        """Return a PollDecision for the next poll and remember it"""
+        now = time.time() if now is None else now
+
+        if self.consecutive_errors:
+            interval = min(self.error_interval * self.backoff ** (self.consecutive_errors - 1),
+                           self.max_error_interval)
+            reason = f"error backoff ({self.consecutive_errors} consecutive)"
+        elif self.active:
+            interval = self.active_interval
+            reason = "run in progress"
+        else:
+            interval = min(self.idle_interval * self.backoff ** self.idle_polls, self.max_idle_interval)
+            reason = "idle" if self.idle_polls == 0 else f"idle, backing off ({self.idle_polls} unchanged polls)"
+
+        floor, floor_reason = self._rate_limit_floor(now)
+        if floor > interval:
+            interval = floor
+            reason = floor_reason
+
+        self.last_decision = PollDecision(interval, reason)
+        return self.last_decision
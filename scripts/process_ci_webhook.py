@@ -9,6 +9,10 @@ import sys
 import subprocess
 from datetime import datetime
 
+from artifact_fetcher import fetch_reports_for_feedback, render_artifact_reports, run_id_from_payload
+from feedback_writer import write_feedback
+from github_client import DEFAULT_REPO
+
 def process_failure_notification(payload_file):
     """Process CI failure webhook payload"""
     try:
@@ -22,6 +26,10 @@ def process_failure_notification(payload_file):
         print(f"Workflow: {payload['workflow']}")
         print(f"Timestamp: {payload['timestamp']}")
         
+        # Pull just the report files out of the run's artifact (cached per artifact id)
+        artifacts = fetch_reports_for_feedback(payload.get('repository') or DEFAULT_REPO,
+                                               run_id_from_payload(payload))
+        
         # Generate agent instructions
         agent_instructions = f"""
 # Automated CI Failure Report - {datetime.now().strftime('%Y-%m-%d %H:%M')}
@@ -36,7 +44,7 @@ def process_failure_notification(payload_file):
 
 ## 🎯 Agent Actions Required
 
-1. **Download test artifacts** from GitHub Actions run
+1. **{'Review the test reports below' if artifacts else 'Download test artifacts'}** from GitHub Actions run
 2. **Review test_reports/failures.txt** for specific issues
 3. **Check test_reports/analysis.txt** for static analysis problems
 4. **Fix failing tests** using structured feedback
@@ -50,10 +58,11 @@ The CI pipeline detected failures and generated this agent feedback.
 
 **Next Steps**: Copy this content to AGENT_FEEDBACK.md and ask agent to fix issues.
 """
+        if artifacts:
+            agent_instructions += f"\n## 📦 CI Test Reports\n\n{render_artifact_reports(artifacts)}"
         
         # Write agent instructions
-        with open('AGENT_FEEDBACK_WEBHOOK.md', 'w') as f:
-            f.write(agent_instructions)
+        write_feedback('AGENT_FEEDBACK_WEBHOOK.md', agent_instructions)
         
         print("✅ Agent feedback file generated: AGENT_FEEDBACK_WEBHOOK.md")
         print("📋 Ready for agent processing")
@@ -49,12 +49,8 @@ echo ""
 # Check 4: Coverage Summary
 echo "✅ Step 4/4: Generating coverage summary..."
 if [ -f coverage/lcov.info ]; then
-  if command -v lcov &> /dev/null; then
-    lcov --summary coverage/lcov.info 2>&1 | tail -n 3
-  else
-    echo "   ℹ lcov not installed - skipping coverage summary"
-    echo "   Install with: brew install lcov (macOS) or sudo apt-get install lcov (Linux)"
-  fi
+  # Pure-Python summary (no lcov needed); also shows the change since the previous local run
+  python3 scripts/lcov_report.py coverage/lcov.info | sed 's/^/   /'
 else
   echo "   ⚠ No coverage data generated"
 fi
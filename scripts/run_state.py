@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed memory of CI runs the feedback scripts have already handled
+Runs are indexed by run id, branch and head SHA together with the job logs
+and failures extracted from them, so repeat invocations skip work that was
+already done and duplicate webhook deliveries are dropped without rework.
+Failure fingerprints are indexed across runs to tell new failures from
+recurring and resolved ones.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import quote
+
+from failure_extractor import FailureRecord, fingerprint
+
+DEFAULT_STATE_DB = os.path.join(os.environ.get('CI_CACHE_DIR', '.ci_cache'), 'run_state.sqlite3')
+DELIVERY_RETENTION = 7 * 24 * 3600
+
+# A failure as remembered by the fingerprint index
+KnownFailure = namedtuple('KnownFailure', 'fingerprint job category location message first_run occurrences')
+
+
+class FailureDelta(namedtuple('FailureDelta', 'new recurring resolved previous_run changed')):
+    """Failures of a run compared with the scope's previous run.
+
+    `changed` is False when the fingerprint set equals the last one recorded
+    for the scope, i.e. existing feedback already describes it.
+    """
+
+    @property
+    def current(self):
+        return self.new + self.recurring
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    repo TEXT NOT NULL,
+    branch TEXT,
+    head_sha TEXT,
+    workflow TEXT,
+    status TEXT,
+    conclusion TEXT,
+    created_at TEXT,
+    html_url TEXT,
+    seen_at REAL NOT NULL,
+    processed_at REAL
+);
+CREATE INDEX IF NOT EXISTS runs_by_branch ON runs (repo, branch, run_id);
+CREATE INDEX IF NOT EXISTS runs_by_sha ON runs (head_sha);
+
+CREATE TABLE IF NOT EXISTS logs (
+    run_id INTEGER NOT NULL,
+    job_name TEXT NOT NULL,
+    content TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (run_id, job_name)
+);
+
+CREATE TABLE IF NOT EXISTS failures (
+    run_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    job TEXT,
+    category TEXT,
+    location TEXT,
+    message TEXT,
+    PRIMARY KEY (run_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS fingerprints (
+    scope TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    job TEXT,
+    category TEXT,
+    location TEXT,
+    message TEXT,
+    first_run TEXT,
+    last_run TEXT,
+    occurrences INTEGER NOT NULL,
+    first_seen_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL,
+    PRIMARY KEY (scope, fingerprint)
+);
+
+CREATE TABLE IF NOT EXISTS failure_sets (
+    scope TEXT PRIMARY KEY,
+    run TEXT,
+    fingerprints TEXT NOT NULL,
+    previous_run TEXT,
+    previous_fingerprints TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS deliveries (
+    key TEXT PRIMARY KEY,
+    received_at REAL NOT NULL
+);
+"""
+
+
+class RunStateStore:
+    """Processed runs, fetched logs, extracted failures and webhook deliveries"""
+
+    def __init__(self, path=DEFAULT_STATE_DB):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # One connection shared by the webhook server's threads, serialised by a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute("DELETE FROM deliveries WHERE received_at < ?",
+                               (time.time() - DELIVERY_RETENTION,))
+        self._deliveries = None  # in-memory mirror of the deliveries table, loaded on first use
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def record_run(self, repo, run):
+        """Insert or refresh a workflow run from the Actions API"""
+        self._execute("""
+            INSERT INTO runs (run_id, repo, branch, head_sha, workflow, status, conclusion,
+                              created_at, html_url, seen_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (run_id) DO UPDATE SET
+                status = excluded.status, conclusion = excluded.conclusion, seen_at = excluded.seen_at
+        """, (run['id'], repo, run.get('head_branch'), run.get('head_sha'), run.get('name'),
+              run.get('status'), run.get('conclusion'), run.get('created_at'), run.get('html_url'),
+              time.time()))
+
+    def record_runs(self, repo, runs):
+        for run in runs:
+            self.record_run(repo, run)
+
+    def last_seen(self, repo, branch):
+        """The newest run recorded for the branch, as a dict, or None"""
+        rows = self._execute("SELECT * FROM runs WHERE repo = ? AND branch = ? ORDER BY run_id DESC LIMIT 1",
+                             (repo, branch))
+        return dict(rows[0]) if rows else None
+
+    def runs_for_sha(self, head_sha):
+        return [dict(row) for row in self._execute(
+            "SELECT * FROM runs WHERE head_sha = ? ORDER BY run_id DESC", (head_sha,))]
+
+    def since_filter(self, repo, branch):
+        """Query-string suffix limiting a runs listing to the last seen run and newer.
+
+        The last seen run is included (>=) so its status updates still come through.
+        """
+        last = self.last_seen(repo, branch)
+        if not last or not last.get('created_at'):
+            return ''
+        return '&created=' + quote('>=' + last['created_at'], safe='')
+
+    def is_processed(self, run_id):
+        rows = self._execute("SELECT processed_at FROM runs WHERE run_id = ?", (run_id,))
+        return bool(rows) and rows[0]['processed_at'] is not None
+
+    def mark_processed(self, run_id):
+        self._execute("UPDATE runs SET processed_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def save_logs(self, run_id, logs):
+        """Store fetched job logs ([{'job_name', 'logs'}]) for a run"""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                for log in logs:
+                    self._conn.execute("INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?)",
+                                       (run_id, log['job_name'], log['logs'], now))
+
+    def load_logs(self, run_id):
+        """Stored logs for a run in fetch order, or None if none were stored"""
+        rows = self._execute("SELECT job_name, content FROM logs WHERE run_id = ? ORDER BY rowid", (run_id,))
+        if not rows:
+            return None
+        return [{'job_name': row['job_name'], 'logs': row['content']} for row in rows]
+
+    def save_failures(self, run_id, records):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM failures WHERE run_id = ?", (run_id,))
+                self._conn.executemany("INSERT INTO failures VALUES (?, ?, ?, ?, ?, ?)",
+                                       [(run_id, i, r.job, r.category, r.location, r.message)
+                                        for i, r in enumerate(records)])
+
+    def load_failures(self, run_id):
+        rows = self._execute("SELECT job, category, location, message FROM failures "
+                             "WHERE run_id = ? ORDER BY position", (run_id,))
+        return [FailureRecord(*row) for row in rows]
+
+    def record_failure_set(self, scope, run, records):
+        """Index a run's failures under scope (e.g. repo@branch) and return a FailureDelta.
+
+        Recording the same run again compares against the run before it, so a
+        forced rebuild shows the same delta as the first pass.
+        """
+        run = str(run)
+        current = {}
+        for record in records:
+            current.setdefault(fingerprint(record), record)
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                row = self._conn.execute("SELECT * FROM failure_sets WHERE scope = ?", (scope,)).fetchone()
+                last = set(row['fingerprints'].split()) if row else set()
+                if row and row['run'] == run:
+                    previous_run, previous = row['previous_run'], set(row['previous_fingerprints'].split())
+                else:
+                    previous_run, previous = (row['run'], last) if row else (None, set())
+                new_run = not row or row['run'] != run
+
+                for key, record in current.items():
+                    self._conn.execute("""
+                        INSERT INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
+                        ON CONFLICT (scope, fingerprint) DO UPDATE SET
+                            job = excluded.job, location = excluded.location, message = excluded.message,
+                            last_run = excluded.last_run, last_seen_at = excluded.last_seen_at,
+                            occurrences = occurrences + ?
+                    """, (scope, key, record.job, record.category, record.location, record.message,
+                          run, run, now, now, 1 if new_run else 0))
+                self._conn.execute("INSERT OR REPLACE INTO failure_sets VALUES (?, ?, ?, ?, ?, ?)",
+                                   (scope, run, ' '.join(sorted(current)), previous_run,
+                                    ' '.join(sorted(previous)), now))
+
+                known = {}
+                wanted = set(current) | previous
+                for found in self._conn.execute(
+                        "SELECT fingerprint, job, category, location, message, first_run, occurrences "
+                        "FROM fingerprints WHERE scope = ?", (scope,)):
+                    if found['fingerprint'] in wanted:
+                        known[found['fingerprint']] = KnownFailure(*found)
+
+        # Current failures keep extraction order; resolved ones are listed by category
+        new = [known[key] for key in current if key not in previous]
+        recurring = [known[key] for key in current if key in previous]
+        resolved = sorted((known[key] for key in previous - set(current) if key in known),
+                          key=lambda k: (k.category, k.location or '', k.message))
+        return FailureDelta(new, recurring, resolved, previous_run, set(current) != last or not row)
+
+    def seen_delivery(self, key):
+        """Record a webhook delivery; return True if this key was already delivered"""
+        with self._lock:
+            if self._deliveries is None:
+                self._deliveries = {row[0] for row in self._conn.execute("SELECT key FROM deliveries")}
+            if key in self._deliveries:
+                return True
+            self._deliveries.add(key)
+            self._conn.execute("INSERT OR IGNORE INTO deliveries VALUES (?, ?)", (key, time.time()))
+            return False
+
+    def forget_delivery(self, key):
+        """Undo seen_delivery, e.g. when the delivery was rejected and will be retried"""
+        with self._lock:
+            if self._deliveries is not None:
+                self._deliveries.discard(key)
+            self._conn.execute("DELETE FROM deliveries WHERE key = ?", (key,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_state_store():
+    """Shared store for the current process"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RunStateStore()
+        return _store
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Test shard planner driven by `flutter test --machine` timings
+Suite durations measured from reporter output are averaged into
+.ci_cache/test_timings.json; suites without history are estimated from the
+median of their directory. `plan` spreads the suites over K shards with
+longest-processing-time-first packing and prints a shard's file list (or
+hands all of them to the CI shards as step outputs);
+`merge` renumbers and concatenates the shards' reporter files into one
+report for flutter_reporter.py and records their timings for the next plan.
+"""
+
+import argparse
+import glob
+import heapq
+import json
+import os
+import statistics
+import sys
+import tempfile
+from collections import namedtuple
+
+from flutter_reporter import DEFAULT_REPORT, build_index, iter_events
+
+DEFAULT_TIMINGS = os.path.join(os.environ.get('CI_CACHE_DIR', '.ci_cache'), 'test_timings.json')
+TEST_GLOB = os.path.join('test', '**', '*_test.dart')
+# Used when nothing has been measured yet
+DEFAULT_SUITE_MS = 10_000
+# Weight of the newest measurement in the stored running average
+TIMING_WEIGHT = 0.5
+
+Shard = namedtuple('Shard', 'index suites total')
+
+# Event fields holding reporter ids, which restart at 0 in every shard's process
+_ID_OBJECTS = ('suite', 'group', 'test')
+_ID_FIELDS = ('testID', 'suiteID', 'parentID')
+
+
+def suite_durations(index):
+    """{project-relative suite path: wall-clock ms} from a TestIndex.
+
+    A suite runs from its hidden "loading" pseudo-test to its last testDone.
+    """
+    durations = {}
+    for suite_id in index.suites:
+        tests = [index.tests[test_id] for test_id in index.by_suite.get(suite_id, ())]
+        ends = [test.end_time for test in tests if test.end_time is not None]
+        if ends:
+            durations[index.suite_path(suite_id)] = max(ends) - min(test.start_time for test in tests)
+    return durations
+
+
+class TimingHistory:
+    """Running average of suite durations, kept in one JSON file"""
+
+    def __init__(self, path=DEFAULT_TIMINGS):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.suites = json.load(f).get('suites', {})
+        except (OSError, ValueError):
+            self.suites = {}
+
+    def update(self, durations):
+        for suite, ms in durations.items():
+            previous = self.suites.get(suite)
+            self.suites[suite] = ms if previous is None else round(
+                TIMING_WEIGHT * ms + (1 - TIMING_WEIGHT) * previous)
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.test-timings-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'suites': self.suites}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def discover_suites(root='.'):
+    """Test files `flutter test` would run, as sorted project-relative paths"""
+    paths = glob.glob(os.path.join(root, TEST_GLOB), recursive=True)
+    return sorted(os.path.relpath(path, root).replace(os.sep, '/') for path in paths)
+
+
+def estimate_durations(suites, known):
+    """{suite: (ms, estimated)}; unknown suites get their directory's median, else the overall one"""
+    measured = {suite: ms for suite, ms in known.items() if ms is not None}
+    by_directory = {}
+    for suite, ms in measured.items():
+        by_directory.setdefault(os.path.dirname(suite), []).append(ms)
+    overall = statistics.median(measured.values()) if measured else DEFAULT_SUITE_MS
+
+    durations = {}
+    for suite in suites:
+        if suite in measured:
+            durations[suite] = (measured[suite], False)
+        else:
+            siblings = by_directory.get(os.path.dirname(suite))
+            durations[suite] = (statistics.median(siblings) if siblings else overall, True)
+    return durations
+
+
+def plan_shards(durations, count):
+    """Longest-processing-time-first packing of {suite: ms} onto `count` shards.
+
+    Suites go longest first onto the shard with the least work so far (ties by
+    shard index), which keeps the slowest shard within 4/3 of the optimum.
+    """
+    count = max(1, count)
+    shards = [[] for _ in range(count)]
+    totals = [0] * count
+    loads = [(0, index) for index in range(count)]
+    for suite in sorted(durations, key=lambda suite: (-durations[suite], suite)):
+        load, index = heapq.heappop(loads)
+        shards[index].append(suite)
+        totals[index] = load + durations[suite]
+        heapq.heappush(loads, (totals[index], index))
+    return [Shard(index, shards[index], totals[index]) for index in range(count)]
+
+
+def _renumber(event, offset):
+    """Shift every reporter id in an event by offset; returns the largest id seen"""
+    largest = -1
+    for key in _ID_OBJECTS:
+        item = event.get(key)
+        if isinstance(item, dict):
+            for field in ('id',) + _ID_FIELDS:
+                if isinstance(item.get(field), int):
+                    item[field] += offset
+                    largest = max(largest, item[field])
+            if item.get('groupIDs'):
+                item['groupIDs'] = [group_id + offset for group_id in item['groupIDs']]
+    for field in _ID_FIELDS:
+        if isinstance(event.get(field), int):
+            event[field] += offset
+            largest = max(largest, event[field])
+    return largest
+
+
+def merge_reports(paths, output):
+    """Merge shards' reporter files into one; returns (suites, success, missing shard files).
+
+    Ids are renumbered so they stay unique, one `start`/`allSuites`/`done`
+    triple frames the merged stream, and `done.time` is the slowest shard's
+    (the shards ran side by side). A missing shard file marks the merge failed.
+    """
+    events = []
+    start = None
+    suites = 0
+    success = True
+    finished = 0
+    longest = 0
+    missing = []
+    offset = 0
+    for path in paths:
+        try:
+            f = open(path, encoding='utf-8', errors='replace')
+        except OSError:
+            missing.append(path)
+            continue
+        largest = offset - 1
+        with f:
+            for event in iter_events(f):
+                kind = event['type']
+                if kind == 'start':
+                    start = start or event
+                elif kind == 'allSuites':
+                    suites += event.get('count', 0)
+                elif kind == 'done':
+                    finished += 1
+                    success = success and event.get('success') is True
+                    longest = max(longest, event.get('time', 0))
+                else:
+                    largest = max(largest, _renumber(event, offset))
+                    events.append(event)
+        offset = largest + 1
+
+    success = success and finished == len(paths)
+    framing = [start or {'type': 'start', 'time': 0}, {'type': 'allSuites', 'count': suites, 'time': 0}]
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.merged-report-')
+    with os.fdopen(fd, 'w') as f:
+        for event in framing + events + [{'type': 'done', 'success': success, 'time': longest}]:
+            f.write(json.dumps(event) + "\n")
+    os.replace(tmp_path, output)
+    return suites, success, missing
+
+
+def _format_seconds(ms):
+    return f"{ms / 1000:.1f}s"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Plan balanced flutter test shards and merge their reports")
+    parser.add_argument('--timings', default=DEFAULT_TIMINGS,
+                        help=f"suite timing history (default {DEFAULT_TIMINGS})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    plan = commands.add_parser('plan', help="split the test suites into balanced shards")
+    plan.add_argument('--shards', type=int, required=True, help="number of shards")
+    plan.add_argument('--shard', type=int, help="print only this shard's files (0-based), space separated")
+    plan.add_argument('--report', action='append', default=[],
+                      help=f"also take timings from this reporter file (default {DEFAULT_REPORT} "
+                           "when there is no history)")
+    plan.add_argument('--root', default='.', help="project root holding test/")
+    plan.add_argument('--json', metavar='PATH', help="write the whole plan as JSON")
+    plan.add_argument('--github-output', metavar='PATH',
+                      help="append `shards` (index list) and `files` (per-shard file lists) as step outputs, "
+                           "e.g. $GITHUB_OUTPUT, so every shard runs the same plan")
+
+    merge = commands.add_parser('merge', help="merge shards' reporter files into one report")
+    merge.add_argument('output', help=f"merged report (usually {DEFAULT_REPORT})")
+    merge.add_argument('reports', nargs='+', help="per-shard reporter files")
+    merge.add_argument('--no-record', action='store_true', help="don't add the timings to the history")
+
+    record = commands.add_parser('record', help="add a reporter file's suite timings to the history")
+    record.add_argument('reports', nargs='+')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    history = TimingHistory(args.timings)
+
+    if args.command == 'plan':
+        known = dict(history.suites)
+        reports = args.report or ([DEFAULT_REPORT] if not known and os.path.exists(DEFAULT_REPORT) else [])
+        for path in reports:
+            known.update(suite_durations(build_index(path)))
+        suites = discover_suites(args.root)
+        estimates = estimate_durations(suites, known)
+        shards = plan_shards({suite: ms for suite, (ms, _) in estimates.items()}, args.shards)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump([{'shard': shard.index, 'suites': shard.suites, 'estimated_ms': shard.total}
+                           for shard in shards], f, indent=1)
+        if args.github_output:
+            with open(args.github_output, 'a') as f:
+                f.write(f"shards={json.dumps([shard.index for shard in shards])}\n")
+                f.write(f"files={json.dumps([shard.suites for shard in shards])}\n")
+        if args.shard is not None:
+            if not 0 <= args.shard < len(shards):
+                print(f"❌ Shard {args.shard} out of range 0-{len(shards) - 1}", file=sys.stderr)
+                sys.exit(1)
+            print(' '.join(shards[args.shard].suites))
+            return
+        guessed = sum(1 for _, estimated in estimates.values() if estimated)
+        serial = sum(ms for ms, _ in estimates.values())
+        slowest = max(shard.total for shard in shards) if shards else 0
+        print(f"🧩 {len(suites)} suite(s) on {len(shards)} shard(s), {guessed} without timings")
+        for shard in shards:
+            print(f"   shard {shard.index}: {_format_seconds(shard.total):>8}  {len(shard.suites)} suite(s)")
+        if slowest:
+            print(f"⏱️  ~{_format_seconds(slowest)} per shard instead of {_format_seconds(serial)} serial "
+                  f"({serial / slowest:.1f}x)")
+    elif args.command == 'merge':
+        suites, success, missing = merge_reports(args.reports, args.output)
+        for path in missing:
+            print(f"⚠️ Shard report missing: {path}")
+        print(f"🧩 Merged {len(args.reports) - len(missing)} shard report(s), {suites} suite(s) into {args.output}"
+              f" - {'passed' if success else 'FAILED'}")
+        if not args.no_record:
+            history.update(suite_durations(build_index(args.output)))
+            history.save()
+        if missing:
+            sys.exit(1)
+    elif args.command == 'record':
+        for path in args.reports:
+            history.update(suite_durations(build_index(path)))
+        history.save()
+        print(f"⏱️  {len(history.suites)} suite timing(s) in {args.timings}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Test-suite performance profile and regression check from reporter output
+Uses the hidden "loading <suite>" tests and testStart/testDone times of
+`flutter test --machine` output to measure per-suite load and run time and
+the slowest tests. Timings are compared with a rolling per-branch baseline
+in .ci_cache/test_perf_baseline.json; a slowdown is reported only when it is
+large enough to matter and significant under a one-sided Welch t-test on
+log durations.
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+from collections import namedtuple
+
+from flutter_reporter import DEFAULT_REPORT, build_index
+
+DEFAULT_BASELINE = os.path.join(os.environ.get('CI_CACHE_DIR', '.ci_cache'), 'test_perf_baseline.json')
+BASELINE_SAMPLES = 20
+MIN_BASELINE_SAMPLES = 3
+ALPHA = 0.05
+# Slowdowns smaller than this are never reported, however significant
+MIN_SLOWDOWN = 1.2
+MIN_DELTA_MS = 100
+# Spread assumed when every baseline sample is identical (timer resolution, scheduler noise)
+MIN_LOG_STDEV = 0.05
+DEFAULT_TOP = 5
+
+SuiteProfile = namedtuple('SuiteProfile', 'path load_ms run_ms tests')
+Regression = namedtuple('Regression', 'suite test metric baseline_ms current_ms p_value')
+
+_LOADING = 'loading '
+
+
+def profile_index(index):
+    """{suite path: SuiteProfile} for one reporter run; tests maps name -> ms"""
+    profiles = {}
+    for suite_id in index.suites:
+        path = index.suite_path(suite_id)
+        tests = [index.tests[test_id] for test_id in index.by_suite.get(suite_id, ())]
+        loading = [t for t in tests if t.hidden and t.name.startswith(_LOADING) and t.end_time is not None]
+        finished = [t for t in tests if t.end_time is not None]
+        if not finished:
+            continue
+        load_ms = loading[0].duration if loading else 0
+        started = loading[0].end_time if loading else min(t.start_time for t in finished)
+        # setUpAll/tearDownAll are hidden tests too; the span from load end to the last testDone covers them
+        run_ms = max(t.end_time for t in finished) - started
+        timed = {t.name: t.duration for t in finished if not t.hidden and not t.skipped}
+        profiles[path] = SuiteProfile(path, load_ms, max(run_ms, 0), timed)
+    return profiles
+
+
+def collect_samples(profiles_list):
+    """Turn [{path: SuiteProfile}] (one per run) into {suite: {'load': [], 'run': [], 'tests': {name: []}}}"""
+    samples = {}
+    for profiles in profiles_list:
+        for path, profile in profiles.items():
+            suite = samples.setdefault(path, {'load': [], 'run': [], 'tests': {}})
+            suite['load'].append(profile.load_ms)
+            suite['run'].append(profile.run_ms)
+            for name, ms in profile.tests.items():
+                suite['tests'].setdefault(name, []).append(ms)
+    return samples
+
+
+def _betacf(a, b, x):
+    """Continued fraction of the incomplete beta function (modified Lentz)"""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 200):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1) < 1e-12:
+            break
+    return result
+
+
+def _betainc(a, b, x):
+    """Regularised incomplete beta function I_x(a, b)"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _betacf(a, b, x) / a
+    return 1 - front * _betacf(b, a, 1 - x) / b
+
+
+def student_t_sf(t, df):
+    """P(T > t) for Student's t with df degrees of freedom"""
+    tail = 0.5 * _betainc(df / 2, 0.5, df / (df + t * t))
+    return tail if t > 0 else 1 - tail
+
+
+def slowdown_p_value(current, baseline):
+    """One-sided p-value that `current` durations are slower than `baseline` ones.
+
+    Welch's t-test on log(1 + ms), so noise is treated as relative; a single
+    current sample is tested against the baseline's prediction interval.
+    """
+    now = [math.log1p(ms) for ms in current]
+    before = [math.log1p(ms) for ms in baseline]
+    n, m = len(before), len(now)
+    var_before = max(statistics.variance(before), MIN_LOG_STDEV ** 2)
+    difference = statistics.fmean(now) - statistics.fmean(before)
+    if m == 1:
+        t = difference / math.sqrt(var_before * (1 + 1 / n))
+        return student_t_sf(t, n - 1)
+    var_now = max(statistics.variance(now), MIN_LOG_STDEV ** 2)
+    a, b = var_before / n, var_now / m
+    t = difference / math.sqrt(a + b)
+    df = (a + b) ** 2 / (a * a / (n - 1) + b * b / (m - 1))
+    return student_t_sf(t, df)
+
+
+def _check(suite, test, metric, current, baseline, found):
+    if len(baseline) < MIN_BASELINE_SAMPLES or not current:
+        return
+    before, now = statistics.median(baseline), statistics.median(current)
+    if now - before < MIN_DELTA_MS or now < before * MIN_SLOWDOWN:
+        return
+    p_value = slowdown_p_value(current, baseline)
+    if p_value <= ALPHA:
+        found.append(Regression(suite, test, metric, before, now, p_value))
+
+
+def find_regressions(samples, baseline):
+    """Regressions of `samples` against `baseline` (same shape), largest slowdown first"""
+    found = []
+    for path, suite in samples.items():
+        reference = baseline.get(path)
+        if not reference:
+            continue
+        _check(path, None, 'load', suite['load'], reference.get('load', []), found)
+        _check(path, None, 'run', suite['run'], reference.get('run', []), found)
+        for name, durations in suite['tests'].items():
+            _check(path, name, 'test', durations, reference.get('tests', {}).get(name, []), found)
+    return sorted(found, key=lambda r: (-(r.current_ms - r.baseline_ms), r.suite, r.test or ''))
+
+
+class PerformanceBaseline:
+    """The newest BASELINE_SAMPLES runs' timing samples per key (e.g. repo@branch), kept in one JSON file"""
+
+    def __init__(self, path=DEFAULT_BASELINE):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def suites(self, key, exclude_run=None):
+        """Baseline samples for key, leaving out run `exclude_run` (so a re-processed run isn't its own baseline)"""
+        exclude_run = None if exclude_run is None else str(exclude_run)
+        runs = [entry['suites'] for entry in self.data.get(key, [])
+                if exclude_run is None or entry['run'] != exclude_run]
+        merged = {}
+        for samples in runs:
+            for path, suite in samples.items():
+                stored = merged.setdefault(path, {'load': [], 'run': [], 'tests': {}})
+                stored['load'].extend(suite['load'])
+                stored['run'].extend(suite['run'])
+                for name, durations in suite['tests'].items():
+                    stored['tests'].setdefault(name, []).extend(durations)
+        return merged
+
+    def record(self, key, samples, run=None):
+        """Add a run's samples under key, replacing an earlier recording of the same run"""
+        run = None if run is None else str(run)
+        entries = [entry for entry in self.data.get(key, []) if run is None or entry['run'] != run]
+        entries.append({'run': run, 'suites': samples})
+        self.data[key] = entries[-BASELINE_SAMPLES:]
+        self.save()
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.test-perf-baseline-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+
+def _seconds(ms):
+    return f"{ms / 1000:.2f}s"
+
+
+def _p(value):
+    return "p<0.001" if value < 0.001 else f"p={value:.3f}"
+
+
+def render_regressions(regressions, limit=10):
+    """Markdown bullets for the feedback files ('' when there are none)"""
+    if not regressions:
+        return ""
+    labels = {'load': 'suite load time', 'run': 'suite run time'}
+    lines = []
+    for regression in regressions[:limit]:
+        what = f"**{regression.test}**" if regression.test else labels[regression.metric]
+        change = (regression.current_ms / regression.baseline_ms - 1) * 100 if regression.baseline_ms else math.inf
+        lines.append(f"- `{regression.suite}` {what}: {_seconds(regression.baseline_ms)} → "
+                     f"{_seconds(regression.current_ms)} (+{change:.0f}%, {_p(regression.p_value)})")
+    if len(regressions) > limit:
+        lines.append(f"- …and {len(regressions) - limit} more")
+    return "\n".join(lines) + "\n"
+
+
+def render_profile(profiles, top=DEFAULT_TOP):
+    """Plain-text profile: suites by load + run time, each with its slowest tests"""
+    lines = []
+    for profile in sorted(profiles.values(), key=lambda p: -(p.load_ms + p.run_ms)):
+        lines.append(f"{profile.path}: load {_seconds(profile.load_ms)}, run {_seconds(profile.run_ms)}, "
+                     f"{len(profile.tests)} test(s)")
+        for name, ms in sorted(profile.tests.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"   {_seconds(ms):>8}  {name}")
+    return "\n".join(lines)
+
+
+def performance_feedback(report_paths, key, run=None, baseline_path=DEFAULT_BASELINE):
+    """Compare reporter files with the key's baseline, then add them to it; markdown ('' if nothing to say)"""
+    profiles_list = []
+    for path in report_paths:
+        try:
+            profiles_list.append(profile_index(build_index(path)))
+        except OSError:
+            continue
+    samples = collect_samples(profiles_list)
+    if not samples:
+        return ""
+    baseline = PerformanceBaseline(baseline_path)
+    regressions = find_regressions(samples, baseline.suites(key, exclude_run=run))
+    baseline.record(key, samples, run)
+    return render_regressions(regressions)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Profile flutter test suites and check for slowdowns")
+    parser.add_argument('reports', nargs='*', default=[DEFAULT_REPORT],
+                        help=f"reporter files, one per run (default {DEFAULT_REPORT})")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="slowest tests to list per suite")
+    parser.add_argument('--key', default='local', help="baseline key to compare against")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="JSON file with the baseline timings")
+    parser.add_argument('--record', action='store_true', help="add these timings to the baseline afterwards")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiles_list = []
+    for path in args.reports:
+        try:
+            profiles_list.append(profile_index(build_index(path)))
+        except OSError as e:
+            print(f"❌ Could not read {path}: {e}")
+            sys.exit(1)
+
+    # Several files are several runs of the same suites; show the median of each
+    samples = collect_samples(profiles_list)
+    median = {path: SuiteProfile(path, statistics.median(suite['load']), statistics.median(suite['run']),
+                                 {name: statistics.median(ms) for name, ms in suite['tests'].items()})
+              for path, suite in samples.items()}
+    print(render_profile(median, args.top))
+
+    baseline = PerformanceBaseline(args.baseline)
+    reference = baseline.suites(args.key)
+    regressions = find_regressions(samples, reference)
+    print()
+    if not reference:
+        print(f"ℹ️  No baseline for '{args.key}' yet (use --record to start one)")
+    elif regressions:
+        print(f"🐢 {len(regressions)} significant slowdown(s) against the '{args.key}' baseline:")
+        print(render_regressions(regressions, limit=len(regressions)), end='')
+    else:
+        print(f"✅ No significant slowdowns against the '{args.key}' baseline")
+    if args.record:
+        baseline.record(args.key, samples)
+        print(f"💾 Recorded {len(profiles_list)} run(s) in {args.baseline}")
+    sys.exit(2 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
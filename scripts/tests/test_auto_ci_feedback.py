@@ -0,0 +1,70 @@
+"""get_ci_logs returns what it could fetch within one deadline, in job order"""
+
+import contextlib
+import io
+import threading
+import time
+import unittest
+from unittest import mock
+
+import auto_ci_feedback
+
+JOB_TIMEOUT = 0.5
+
+
+class FakeClient:
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+
+    def repo_url(self, repo, path):
+        return f"https://api.github.com/repos/{repo}/{path}"
+
+    def get_json(self, url):
+        return {'jobs': self.jobs}, False
+
+
+class GetCiLogsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def fetch(self, names, hanging=(), max_workers=4):
+        jobs = [{'name': name, 'conclusion': 'failure'} for name in names]
+
+        def diagnostics(client, repo, job, *args):
+            if job['name'] in hanging:
+                self.release.wait()
+            else:
+                time.sleep(0.01 * (len(names) - names.index(job['name'])))
+            return {'job_name': job['name'], 'logs': '', 'source': 'annotations'}
+
+        with mock.patch.object(auto_ci_feedback, 'get_client', return_value=FakeClient(jobs)), \
+                mock.patch.object(auto_ci_feedback, 'fetch_job_diagnostics', side_effect=diagnostics), \
+                contextlib.redirect_stdout(io.StringIO()):
+            started = time.monotonic()
+            logs, complete = auto_ci_feedback.get_ci_logs(1, max_workers, JOB_TIMEOUT)
+        return [log['job_name'] for log in logs], complete, time.monotonic() - started
+
+    def test_all_jobs_in_job_order(self):
+        names, complete, _ = self.fetch(['analyze', 'test', 'build'])
+        self.assertEqual(names, ['analyze', 'test', 'build'])
+        self.assertTrue(complete)
+
+    def test_hanging_job_returns_partial_logs_within_the_timeout(self):
+        names, complete, elapsed = self.fetch(['analyze', 'test', 'build'], hanging={'analyze'})
+        self.assertEqual(names, ['test', 'build'])
+        self.assertFalse(complete)
+        self.assertLess(elapsed, JOB_TIMEOUT + 0.3)
+
+    def test_deadline_is_shared_by_the_batch(self):
+        # Three hanging jobs waited on one after another would take three timeouts
+        names, complete, elapsed = self.fetch(['a', 'b', 'c', 'd'], hanging={'a', 'b', 'c'})
+        self.assertEqual(names, ['d'])
+        self.assertFalse(complete)
+        self.assertLess(elapsed, JOB_TIMEOUT + 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""Failure normalisation and fingerprints stay stable across runs"""
+
+import unittest
+
+from failure_extractor import FailureRecord, normalize, fingerprint
+
+
+class NormalizeTest(unittest.TestCase):
+
+    def test_strips_timestamps_and_runner_prefix(self):
+        self.assertEqual(normalize("2025-01-01T10:00:00.123Z +3 -1: loads events [E]"), "loads events [E]")
+        self.assertEqual(normalize("00:05 +3 ~1 -1: loads events [E]"), "loads events [E]")
+
+    def test_strips_checkout_paths_and_line_numbers(self):
+        first = normalize("/home/runner/work/app/app/lib/main.dart:12:5: Error: Undefined name 'foo'.")
+        second = normalize("file:///Users/dev/app/lib/main.dart:40:1: Error: Undefined name 'foo'.")
+        self.assertEqual(first, "lib/main.dart: Error: Undefined name 'foo'.")
+        self.assertEqual(first, second)
+
+    def test_masks_numbers_and_hashes(self):
+        self.assertEqual(normalize("Expected: <3>  Actual: <0>"), "Expected: <<n>> Actual: <<n>>")
+        self.assertEqual(normalize("Instance of 0x7f3a9c2e1b00"), "Instance of <hex>")
+
+    def test_is_idempotent(self):
+        text = "00:05 +3 -1: /tmp/x/test/a_test.dart:12:5 took 1.5s [E]"
+        self.assertEqual(normalize(normalize(text)), normalize(text))
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def test_same_failure_in_another_run(self):
+        before = FailureRecord('job-1', 'compile_error', 'lib/main.dart:12', "Undefined name 'foo' at 10:02")
+        after = FailureRecord('job-2', 'compile_error', 'lib/main.dart:40', "Undefined name 'foo' at 11:15")
+        self.assertEqual(fingerprint(before), fingerprint(after))
+
+    def test_category_location_and_message_matter(self):
+        record = FailureRecord('job', 'compile_error', 'lib/main.dart:12', "Undefined name 'foo'")
+        others = [record._replace(category='analyzer'), record._replace(location='lib/other.dart:12'),
+                  record._replace(message="Undefined name 'bar'")]
+        self.assertEqual(len({fingerprint(record)} | {fingerprint(other) for other in others}), 4)
+
+    def test_format(self):
+        key = fingerprint(FailureRecord('job', 'error', '', 'boom'))
+        self.assertEqual(len(key), 16)
+        int(key, 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""HTTPCache hits, LRU eviction and sharing a directory between processes"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from http_cache import HTTPCache
+
+
+class HTTPCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='http-cache-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def indexed_urls(self):
+        with open(os.path.join(self.directory, HTTPCache.INDEX_NAME)) as f:
+            return sorted(entry['url'] for entry in json.load(f).values())
+
+    def age(self, cache, url, seconds):
+        path = cache._body_path(cache._key(url))
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+    def test_hit_does_not_rewrite_the_index(self):
+        cache = HTTPCache(self.directory)
+        cache.store('https://api.test/a', b'{}', etag='"a"')
+        with mock.patch.object(HTTPCache, '_save_index') as save:
+            self.assertEqual(cache.load('https://api.test/a'), b'{}')
+        save.assert_not_called()
+        self.assertEqual(cache.conditional_headers('https://api.test/a'), {'If-None-Match': '"a"'})
+
+    def test_least_recently_loaded_entry_is_evicted(self):
+        cache = HTTPCache(self.directory, max_bytes=250)
+        cache.store('https://api.test/a', b'a' * 100, etag='"a"')
+        cache.store('https://api.test/b', b'b' * 100, etag='"b"')
+        self.age(cache, 'https://api.test/a', 60)
+        self.age(cache, 'https://api.test/b', 30)
+        cache.load('https://api.test/a')
+        cache.store('https://api.test/c', b'c' * 100, etag='"c"')
+        self.assertEqual(self.indexed_urls(), ['https://api.test/a', 'https://api.test/c'])
+        self.assertIsNone(cache.load('https://api.test/b'))
+
+    def test_processes_sharing_a_directory_keep_each_others_entries(self):
+        first, second = HTTPCache(self.directory), HTTPCache(self.directory)
+        first.conditional_headers('https://api.test/a')  # loads the (empty) index
+        second.store('https://api.test/b', b'b', etag='"b"')
+        first.store('https://api.test/a', b'a', etag='"a"')
+        self.assertEqual(self.indexed_urls(), ['https://api.test/a', 'https://api.test/b'])
+        self.assertEqual(first.load('https://api.test/b'), b'b')
+
+    def test_parsed_bodies_keep_only_the_latest_etag(self):
+        cache = HTTPCache(self.directory, max_parsed=2)
+        response = mock.Mock(headers={'ETag': '"1"'})
+        response.json.return_value = [1]
+        self.assertEqual(cache.cached_json('u', response), [1])
+        newer = mock.Mock(headers={'ETag': '"2"'})
+        newer.json.return_value = [2]
+        self.assertEqual(cache.cached_json('u', newer), [2])
+        for url in ('v', 'w'):
+            cache.cached_json(url, mock.Mock(headers={'ETag': '"x"'}))
+        self.assertEqual(list(cache._parsed), ['v', 'w'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Annotation-first diagnostics fall back to the step log only when failures were left out"""
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import job_diagnostics
+from emit_annotations import MAX_ANNOTATIONS, OVERFLOW_TITLE
+
+JOB = {'id': 7, 'name': 'test', 'steps': [{'name': 'Run tests', 'conclusion': 'failure', 'number': 4}]}
+GENERIC = {'path': '.github', 'annotation_level': 'failure', 'title': '', 'message': 'Process completed with exit code 1.'}
+OVERFLOW = {'path': '.github', 'annotation_level': 'warning', 'title': OVERFLOW_TITLE,
+            'message': '3 more failure(s) in test_reports/'}
+
+
+def failures(count):
+    return [{'path': '.github', 'start_line': 1, 'annotation_level': 'failure', 'title': 'test_failure',
+             'message': f'Suite test {i} fails'} for i in range(count)]
+
+
+class FakeClient:
+
+    def __init__(self, annotations):
+        self.annotations = annotations
+
+    def repo_url(self, repo, path):
+        return f'https://api.github.test/repos/{repo}/{path}'
+
+    def get_json(self, url, conditional=True):
+        return self.annotations, False
+
+
+class FetchJobDiagnosticsTest(unittest.TestCase):
+
+    def diagnostics(self, annotations):
+        with mock.patch.object(job_diagnostics, 'fetch_step_log', return_value='step log') as step_log, \
+                contextlib.redirect_stdout(io.StringIO()):
+            result = job_diagnostics.fetch_job_diagnostics(FakeClient(annotations), 'owner/app', JOB)
+        return result, step_log
+
+    def test_exactly_the_cap_uses_annotations(self):
+        annotations = failures(MAX_ANNOTATIONS) + [GENERIC]
+        self.assertFalse(job_diagnostics.is_truncated(annotations))
+        result, step_log = self.diagnostics(annotations)
+        self.assertEqual(result['source'], 'annotations')
+        self.assertEqual(result['logs'].count('Suite test'), MAX_ANNOTATIONS)
+        step_log.assert_not_called()
+
+    def test_cap_plus_overflow_marker_reads_the_step_log(self):
+        annotations = failures(MAX_ANNOTATIONS) + [OVERFLOW, GENERIC]
+        self.assertTrue(job_diagnostics.is_truncated(annotations))
+        result, step_log = self.diagnostics(annotations)
+        self.assertEqual((result['source'], result['logs']), ('step', 'step log'))
+        step_log.assert_called_once()
+
+    def test_more_than_the_cap_reads_the_step_log(self):
+        self.assertTrue(job_diagnostics.is_truncated(failures(MAX_ANNOTATIONS + 1)))
+
+    def test_generic_annotations_only_read_the_step_log(self):
+        result, step_log = self.diagnostics([GENERIC])
+        self.assertEqual(result['source'], 'step')
+        step_log.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""lcov_report.iter_file_coverage parsing of lcov tracefiles"""
+
+import io
+import os
+import tempfile
+import unittest
+
+from lcov_report import CoverageSummary, iter_file_coverage
+
+
+def parse(text):
+    return list(iter_file_coverage(io.BytesIO(text.encode())))
+
+
+class IterFileCoverageTest(unittest.TestCase):
+
+    def test_counts_da_records(self):
+        [record] = parse("TN:\nSF:lib/a.dart\nDA:1,1\nDA:2,0\nDA:3,12\nDA:4,0\nLF:4\nLH:2\nend_of_record\n")
+        self.assertEqual(record.path, 'lib/a.dart')
+        self.assertEqual((record.lines_found, record.lines_hit), (4, 2))
+
+    def test_zero_prefixed_and_checksummed_counts(self):
+        [record] = parse("SF:lib/a.dart\nDA:1,0,abc123\nDA:2,05\nDA:3,10\nDA:4,0\r\nDA:5,1,0\nend_of_record\n")
+        # Only a count of exactly 0 is a miss, whatever follows it
+        self.assertEqual((record.lines_found, record.lines_hit), (5, 3))
+
+    def test_da_records_win_over_lf_lh(self):
+        [record] = parse("SF:lib/a.dart\nDA:1,1\nDA:2,0\nLF:10\nLH:9\nend_of_record\n")
+        self.assertEqual((record.lines_found, record.lines_hit), (2, 1))
+
+    def test_lf_lh_without_da_records(self):
+        [record] = parse("SF:lib/a.dart\nLF:10\nLH:7\nend_of_record\n")
+        self.assertEqual((record.lines_found, record.lines_hit), (10, 7))
+
+    def test_function_and_branch_counters(self):
+        [record] = parse("SF:lib/a.dart\nFN:3,main\nFNDA:1,main\nFNF:4\nFNH:3\nBRDA:5,0,0,1\nBRF:6\nBRH:2\n"
+                         "DA:3,1\nend_of_record\n")
+        self.assertEqual((record.functions_found, record.functions_hit), (4, 3))
+        self.assertEqual((record.branches_found, record.branches_hit), (6, 2))
+
+    def test_several_records_and_stray_lines(self):
+        records = parse("DA:9,1\nSF:lib/a.dart\nDA:1,1\nend_of_record\nDA:9,1\n"
+                        "SF:lib/b.dart\nDA:1,0\nDA:bad\nend_of_record\n")
+        self.assertEqual([(r.path, r.lines_found, r.lines_hit) for r in records],
+                         [('lib/a.dart', 1, 1), ('lib/b.dart', 1, 0)])
+
+    def test_truncated_file_keeps_last_record(self):
+        records = parse("SF:lib/a.dart\nDA:1,1\nend_of_record\nSF:lib/b.dart\nDA:1,1\nDA:2,0")
+        self.assertEqual([(r.path, r.lines_found, r.lines_hit) for r in records],
+                         [('lib/a.dart', 1, 1), ('lib/b.dart', 2, 1)])
+
+    def test_summary_merges_repeated_files(self):
+        fd, path = tempfile.mkstemp(suffix='.info')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write("SF:lib/a.dart\nDA:1,1\nDA:2,0\nFNF:1\nFNH:1\nend_of_record\n"
+                    "SF:lib/a.dart\nDA:3,1\nend_of_record\nSF:lib/b.dart\nDA:1,0\nend_of_record\n")
+        summary = CoverageSummary.from_lcov(path)
+        self.assertEqual(summary.files, {'lib/a.dart': (3, 2), 'lib/b.dart': (1, 0)})
+        self.assertEqual(summary.lines, (4, 2))
+        self.assertEqual(summary.functions, (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
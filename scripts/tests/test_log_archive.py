@@ -0,0 +1,102 @@
+"""LogArchive add, search and prune"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from log_archive import LogArchive
+
+REPO = 'owner/app'
+
+
+def job_log(run_id, failing_test, filler=200):
+    lines = [f"2025-01-01T00:00:{i % 60:02d}.0000000Z step output line {i} for run {run_id}" for i in range(filler)]
+    lines.insert(filler // 2, f"2025-01-01T00:00:30.0000000Z 00:05 +3 -1: {failing_test} [E]")
+    lines.append("2025-01-01T00:01:00.0000000Z ##[error]Process completed with exit code 1.")
+    return "\n".join(lines) + "\n"
+
+
+class LogArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='log-archive-test-')
+        # Tiny segments so every run lands in its own one
+        self.archive = LogArchive(self.directory, segment_bytes=1024)
+
+    def tearDown(self):
+        self.archive.close()
+        shutil.rmtree(self.directory)
+
+    def add_run(self, run_id, failing_test='EventProvider loads events'):
+        return self.archive.add(REPO, run_id, [
+            {'job_name': 'test', 'logs': job_log(run_id, failing_test), 'source': 'step'},
+            {'job_name': 'analyze', 'logs': job_log(run_id, 'analyzer warm-up', filler=10)},
+        ])
+
+    def test_add_round_trips_and_skips_archived_jobs(self):
+        self.assertEqual(self.add_run(1), 2)
+        self.assertEqual(self.add_run(1), 0)
+        self.assertEqual(self.archive.read(REPO, 1, 'test'), job_log(1, 'EventProvider loads events'))
+        self.assertIsNone(self.archive.read(REPO, 1, 'build'))
+        stats = self.archive.stats()
+        self.assertEqual((stats['jobs'], stats['runs']), (2, 1))
+        self.assertLess(stats['stored'], stats['size'])
+
+    def test_search_indexed_error_lines(self):
+        self.add_run(1, 'EventProvider loads events')
+        self.add_run(2, 'CalendarService syncs')
+        hits = self.archive.search('calendarservice')
+        self.assertEqual([(hit.run_id, hit.job) for hit in hits], [(2, 'test')])
+        self.assertIn('CalendarService syncs [E]', hits[0].line)
+        # Partial words match through prefix lookups; newest run first
+        self.assertEqual([hit.run_id for hit in self.archive.search('Process compl') if hit.job == 'test'], [2, 1])
+        self.assertEqual(self.archive.search('no such failure'), [])
+
+    def test_search_matches_full_scan_on_error_lines(self):
+        for run_id in range(1, 4):
+            self.add_run(run_id, f"Suite {run_id} fails")
+        indexed = self.archive.search('fails')
+        scanned = self.archive.search('fails', full=True)
+        self.assertEqual(indexed, scanned)
+        # Lines without error keywords are only reachable with a full scan
+        self.assertEqual(self.archive.search('step output line 7 for run 3'), [])
+        self.assertEqual(len(self.archive.search('step output line 7 for run 3', full=True)), 2)
+
+    def test_search_options(self):
+        self.add_run(1)
+        self.add_run(2)
+        self.add_run(3)
+        self.assertEqual({hit.run_id for hit in self.archive.search('loads events', runs=2)}, {2, 3})
+        self.assertEqual(len(self.archive.search('exit code', limit=1)), 1)
+        self.assertEqual(self.archive.search('loads events', repo='other/app'), [])
+        self.assertEqual(len(self.archive.search(r'\+\d+ -1: EventProvider', regex=True)), 3)
+
+    def test_prune_by_size_drops_oldest_segments(self):
+        for run_id in range(1, 4):
+            self.add_run(run_id)
+        segments = sorted(os.listdir(self.directory))
+        total = self.archive.stats()['stored']
+        dropped = self.archive.prune(max_bytes=total // 2)
+        self.assertTrue(dropped)
+        self.assertEqual(dropped, sorted(dropped))
+        self.assertLessEqual(self.archive.stats()['stored'], total // 2)
+        self.assertIsNone(self.archive.read(REPO, 1, 'test'))
+        self.assertIsNotNone(self.archive.read(REPO, 3, 'test'))
+        self.assertLess(len(os.listdir(self.directory)), len(segments))
+        self.assertNotIn(1, {hit.run_id for hit in self.archive.search('loads events')})
+
+    def test_prune_by_age_and_re_add(self):
+        self.add_run(1)
+        self.archive._conn.execute("UPDATE segments SET updated_at = updated_at - 10 * 24 * 3600")
+        self.add_run(2)
+        self.assertTrue(self.archive.prune(max_age_days=5))
+        self.assertEqual(self.archive.stats()['runs'], 1)
+        self.assertEqual({hit.run_id for hit in self.archive.search('loads events')}, {2})
+        # A pruned run can be archived again
+        self.assertEqual(self.add_run(1), 2)
+        self.assertEqual({hit.run_id for hit in self.archive.search('loads events')}, {1, 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""Pooled failure extraction on matrix-sized batches"""
+
+import unittest
+from unittest import mock
+
+import parallel_extract
+from auto_ci_feedback import LOG_TAIL_BYTES
+from fake_github import build_log
+from parallel_extract import extract_logs, extract_sequential, use_pool
+
+
+def matrix_run(jobs=24):
+    """Failed-job diagnostics as auto_ci_feedback fetches them: a <=10 KB tail per job"""
+    return [{'job_name': f'test ({i})', 'logs': build_log(i, 200_000).decode()[-LOG_TAIL_BYTES:]}
+            for i in range(jobs)]
+
+
+class ExtractLogsTest(unittest.TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        parallel_extract.shutdown()
+
+    def test_matrix_run_goes_to_the_pool(self):
+        logs = matrix_run()
+        self.assertTrue(use_pool(logs, workers=2))
+        expected = extract_sequential(logs)
+        self.assertTrue(expected)
+        with mock.patch.object(parallel_extract, 'extract_parallel', wraps=parallel_extract.extract_parallel) as pool:
+            records = extract_logs(logs, workers=2)
+        pool.assert_called_once()
+        # Same findings in the same (job, line) order as the in-process pass
+        self.assertEqual(records, expected)
+
+    def test_small_batches_stay_in_process(self):
+        self.assertFalse(use_pool(matrix_run(4), workers=2))
+        self.assertFalse(use_pool(matrix_run(), workers=1))
+        with mock.patch.object(parallel_extract, 'extract_parallel') as pool:
+            records = extract_logs(matrix_run(4), workers=2)
+        pool.assert_not_called()
+        self.assertEqual(records, extract_sequential(matrix_run(4)))
+
+    def test_chunked_logs_match_in_process_pass(self):
+        logs = matrix_run(3)
+        self.assertEqual(parallel_extract.extract_parallel(logs, 2, chunk_bytes=1024), extract_sequential(logs))
+
+
+if __name__ == '__main__':
+    unittest.main()
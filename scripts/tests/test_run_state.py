@@ -0,0 +1,72 @@
+"""RunStateStore.record_failure_set deltas between runs of a scope"""
+
+import unittest
+
+from failure_extractor import FailureRecord, fingerprint
+from run_state import RunStateStore
+
+SCOPE = 'owner/app@main'
+ANALYZER = FailureRecord('analyze', 'analyzer', 'lib/a.dart:3', "Undefined name 'x'")
+TEST = FailureRecord('test', 'test_failure', '', 'EventProvider loads events [E]')
+FORMAT = FailureRecord('format', 'format', 'lib/b.dart', 'Changed lib/b.dart')
+
+
+def keys(failures):
+    return [failure.fingerprint for failure in failures]
+
+
+class RecordFailureSetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.state = RunStateStore(':memory:')
+
+    def tearDown(self):
+        self.state.close()
+
+    def test_first_run(self):
+        delta = self.state.record_failure_set(SCOPE, 1, [ANALYZER, TEST])
+        self.assertIsNone(delta.previous_run)
+        self.assertTrue(delta.changed)
+        self.assertEqual(keys(delta.new), [fingerprint(ANALYZER), fingerprint(TEST)])
+        self.assertEqual(delta.recurring, [])
+        self.assertEqual(delta.resolved, [])
+
+    def test_new_recurring_and_resolved(self):
+        self.state.record_failure_set(SCOPE, 1, [ANALYZER, TEST])
+        delta = self.state.record_failure_set(SCOPE, 2, [TEST, FORMAT])
+        self.assertEqual(delta.previous_run, '1')
+        self.assertTrue(delta.changed)
+        self.assertEqual(keys(delta.new), [fingerprint(FORMAT)])
+        self.assertEqual(keys(delta.recurring), [fingerprint(TEST)])
+        self.assertEqual(keys(delta.resolved), [fingerprint(ANALYZER)])
+        self.assertEqual(delta.recurring[0].occurrences, 2)
+        self.assertEqual(delta.recurring[0].first_run, '1')
+
+    def test_same_failures_are_unchanged(self):
+        self.state.record_failure_set(SCOPE, 1, [ANALYZER])
+        moved = ANALYZER._replace(location='lib/a.dart:9')
+        delta = self.state.record_failure_set(SCOPE, 2, [moved])
+        self.assertFalse(delta.changed)
+        self.assertEqual(keys(delta.recurring), [fingerprint(ANALYZER)])
+        self.assertEqual(delta.new, [])
+
+    def test_recording_a_run_again_repeats_its_delta(self):
+        self.state.record_failure_set(SCOPE, 1, [ANALYZER, TEST])
+        first = self.state.record_failure_set(SCOPE, 2, [TEST, FORMAT])
+        again = self.state.record_failure_set(SCOPE, 2, [TEST, FORMAT])
+        self.assertEqual(again.previous_run, '1')
+        self.assertEqual((keys(again.new), keys(again.recurring), keys(again.resolved)),
+                         (keys(first.new), keys(first.recurring), keys(first.resolved)))
+        self.assertFalse(again.changed)
+        # A re-recorded run doesn't count as another occurrence
+        self.assertEqual(again.recurring[0].occurrences, 2)
+
+    def test_scopes_are_independent(self):
+        self.state.record_failure_set(SCOPE, 1, [ANALYZER])
+        delta = self.state.record_failure_set('owner/app@develop', 2, [ANALYZER])
+        self.assertIsNone(delta.previous_run)
+        self.assertEqual(keys(delta.new), [fingerprint(ANALYZER)])
+
+
+if __name__ == '__main__':
+    unittest.main()
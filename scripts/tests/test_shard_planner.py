@@ -0,0 +1,124 @@
+"""shard_planner.merge_reports keeps reporter ids unique across shards"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from flutter_reporter import build_index
+from shard_planner import main, merge_reports
+
+
+def shard_report(suite_path, test_names, success=True, time=1000):
+    """One shard's reporter output; ids restart at 0 like in every `flutter test` process"""
+    events = [
+        {'type': 'start', 'protocolVersion': '0.1.1', 'time': 0},
+        {'type': 'allSuites', 'count': 1, 'time': 0},
+        {'type': 'suite', 'suite': {'id': 0, 'platform': 'vm', 'path': suite_path}, 'time': 0},
+        {'type': 'group', 'group': {'id': 1, 'suiteID': 0, 'parentID': None, 'name': '', 'testCount': len(test_names)},
+         'time': 10},
+    ]
+    for i, name in enumerate(test_names):
+        test_id = 2 + i
+        events.append({'type': 'testStart', 'test': {'id': test_id, 'name': name, 'suiteID': 0, 'groupIDs': [1]},
+                       'time': 10 + i * 100})
+        events.append({'type': 'print', 'testID': test_id, 'message': f'running {name}', 'time': 20 + i * 100})
+        events.append({'type': 'testDone', 'testID': test_id, 'result': 'success' if success else 'failure',
+                       'hidden': False, 'skipped': False, 'time': 100 + i * 100})
+    events.append({'type': 'done', 'success': success, 'time': time})
+    return "".join(json.dumps(event) + "\n" for event in events)
+
+
+class MergeReportsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='shard-merge-test-')
+        self.output = os.path.join(self.directory, 'merged', 'test_results.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_shard(self, index, content):
+        path = os.path.join(self.directory, f'shard-{index}.json')
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def events(self):
+        with open(self.output) as f:
+            return [json.loads(line) for line in f]
+
+    def test_ids_are_renumbered(self):
+        paths = [self.write_shard(0, shard_report('/w/test/a_test.dart', ['a1', 'a2'], time=3000)),
+                 self.write_shard(1, shard_report('/w/test/b_test.dart', ['b1'], time=5000))]
+        self.assertEqual(merge_reports(paths, self.output), (2, True, []))
+
+        events = self.events()
+        self.assertEqual([e['type'] for e in events[:2]], ['start', 'allSuites'])
+        self.assertEqual(events[1]['count'], 2)
+        self.assertEqual(events[-1], {'type': 'done', 'success': True, 'time': 5000})
+        self.assertEqual(sum(1 for e in events if e['type'] in ('start', 'allSuites', 'done')), 3)
+
+        suite_ids = [e['suite']['id'] for e in events if e['type'] == 'suite']
+        group_ids = [e['group']['id'] for e in events if e['type'] == 'group']
+        test_ids = [e['test']['id'] for e in events if e['type'] == 'testStart']
+        ids = suite_ids + group_ids + test_ids
+        self.assertEqual(len(ids), len(set(ids)))
+        # Shard 1 starts after shard 0's largest id (3)
+        self.assertEqual(suite_ids, [0, 4])
+        self.assertEqual(group_ids, [1, 5])
+        self.assertEqual(test_ids, [2, 3, 6])
+
+        second = [e for e in events if e.get('test', {}).get('name') == 'b1'][0]['test']
+        self.assertEqual((second['suiteID'], second['groupIDs']), (4, [5]))
+        group = [e for e in events if e['type'] == 'group'][1]['group']
+        self.assertEqual((group['suiteID'], group['parentID']), (4, None))
+        self.assertEqual([e['testID'] for e in events if e['type'] in ('print', 'testDone')], [2, 2, 3, 3, 6, 6])
+
+    def test_merged_report_indexes_every_test(self):
+        paths = [self.write_shard(i, shard_report(f'/w/test/s{i}_test.dart', [f't{i}a', f't{i}b']))
+                 for i in range(3)]
+        merge_reports(paths, self.output)
+        index = build_index(self.output)
+        self.assertEqual(sorted(index.suite_path(suite_id) for suite_id in index.suites),
+                         ['test/s0_test.dart', 'test/s1_test.dart', 'test/s2_test.dart'])
+        self.assertEqual(sorted(test.name for test in index.tests.values()),
+                         ['t0a', 't0b', 't1a', 't1b', 't2a', 't2b'])
+
+    def test_failed_or_missing_shard_fails_the_merge(self):
+        passed = self.write_shard(0, shard_report('/w/test/a_test.dart', ['a1']))
+        failed = self.write_shard(1, shard_report('/w/test/b_test.dart', ['b1'], success=False))
+        self.assertEqual(merge_reports([passed, failed], self.output)[1], False)
+
+        missing = os.path.join(self.directory, 'shard-2.json')
+        suites, success, missing_paths = merge_reports([passed, missing], self.output)
+        self.assertEqual((suites, success, missing_paths), (1, False, [missing]))
+        self.assertFalse(self.events()[-1]['success'])
+
+    def test_shard_without_done_event_fails_the_merge(self):
+        complete = self.write_shard(0, shard_report('/w/test/a_test.dart', ['a1']))
+        truncated = shard_report('/w/test/b_test.dart', ['b1']).splitlines(keepends=True)[:-1]
+        self.assertFalse(merge_reports([complete, self.write_shard(1, ''.join(truncated))], self.output)[1])
+
+
+    def merge_command(self, *reports):
+        timings = os.path.join(self.directory, 'timings.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(['--timings', timings, 'merge', self.output, *reports])
+
+    def test_merge_command_exits_non_zero_for_a_missing_shard(self):
+        passed = self.write_shard(0, shard_report('/w/test/a_test.dart', ['a1']))
+        self.merge_command(passed, self.write_shard(1, shard_report('/w/test/b_test.dart', ['b1'])))
+
+        with self.assertRaises(SystemExit) as raised:
+            self.merge_command(passed, os.path.join(self.directory, 'shard-1.missing.json'))
+        self.assertEqual(raised.exception.code, 1)
+        # The partial report is still written for debugging
+        self.assertFalse(self.events()[-1]['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
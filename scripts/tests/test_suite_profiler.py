@@ -0,0 +1,70 @@
+"""Student t tail probabilities and slowdown detection"""
+
+import unittest
+
+from suite_profiler import MIN_BASELINE_SAMPLES, find_regressions, student_t_sf
+
+
+def suite(load, run, **tests):
+    return {'load': list(load), 'run': list(run), 'tests': {name: list(ms) for name, ms in tests.items()}}
+
+
+class StudentTTest(unittest.TestCase):
+
+    def test_matches_t_table(self):
+        # One-sided critical values: P(T > t) for the listed df
+        for t, df, tail in [(1.812, 10, 0.05), (2.764, 10, 0.01), (2.086, 20, 0.025), (6.314, 1, 0.05),
+                            (1.676, 50, 0.05)]:
+            with self.subTest(t=t, df=df):
+                self.assertAlmostEqual(student_t_sf(t, df), tail, places=3)
+
+    def test_symmetry(self):
+        self.assertAlmostEqual(student_t_sf(0, 7), 0.5)
+        for t in (0.3, 1.5, 4.0):
+            self.assertAlmostEqual(student_t_sf(-t, 7), 1 - student_t_sf(t, 7))
+
+    def test_fractional_df_lies_between_neighbours(self):
+        low, high = student_t_sf(2.0, 5), student_t_sf(2.0, 6)
+        self.assertTrue(high < student_t_sf(2.0, 5.5) < low)
+
+
+class FindRegressionsTest(unittest.TestCase):
+
+    baseline = {'test/a_test.dart': suite([400, 410, 390, 405, 395], [1000, 1020, 980, 1010, 990],
+                                          loads=[200, 210, 190, 205, 195], fast=[20, 21, 19, 20, 22])}
+
+    def test_reports_significant_slowdowns_largest_first(self):
+        current = {'test/a_test.dart': suite([405], [2500], loads=[900], fast=[20])}
+        found = find_regressions(current, self.baseline)
+        self.assertEqual([(r.metric, r.test) for r in found], [('run', None), ('test', 'loads')])
+        self.assertEqual((found[0].baseline_ms, found[0].current_ms), (1000, 2500))
+        self.assertTrue(all(r.p_value <= 0.05 for r in found))
+
+    def test_ignores_noise_and_small_slowdowns(self):
+        # +15% run time, and a doubled 20ms test: below MIN_SLOWDOWN / MIN_DELTA_MS
+        current = {'test/a_test.dart': suite([400], [1150], loads=[200], fast=[45])}
+        self.assertEqual(find_regressions(current, self.baseline), [])
+
+    def test_needs_enough_baseline_samples(self):
+        short = {'test/a_test.dart': suite([400] * (MIN_BASELINE_SAMPLES - 1), [1000] * (MIN_BASELINE_SAMPLES - 1))}
+        current = {'test/a_test.dart': suite([400], [5000])}
+        self.assertEqual(find_regressions(current, short), [])
+
+    def test_noisy_baseline_is_not_significant(self):
+        noisy = {'test/b_test.dart': suite([0] * 5, [500, 3000, 800, 2600, 600])}
+        current = {'test/b_test.dart': suite([0], [2900])}
+        self.assertEqual(find_regressions(current, noisy), [])
+
+    def test_unknown_suites_and_tests_are_skipped(self):
+        current = {'test/new_test.dart': suite([5000], [9000]),
+                   'test/a_test.dart': suite([400], [1000], brand_new=[5000])}
+        self.assertEqual(find_regressions(current, self.baseline), [])
+
+    def test_several_current_samples(self):
+        current = {'test/a_test.dart': suite([400, 402], [1600, 1650, 1580], loads=[200, 201])}
+        found = find_regressions(current, self.baseline)
+        self.assertEqual([(r.metric, r.current_ms) for r in found], [('run', 1600)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""Webhook feedback is rewritten only when the run's failure set changes"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import vscode_webhook_server
+from feedback_writer import get_writer
+from run_state import RunStateStore
+
+FAILING_TEST = "00:05 +3 -1: EventProvider loads events [E]\n"
+ANALYZER_ERROR = "  error • Undefined name 'x' • lib/a.dart:3:5 • undefined_identifier\n"
+
+
+class GenerateAgentFeedbackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.state = RunStateStore(':memory:')
+        patch = mock.patch.object(vscode_webhook_server.AmpWebhookHandler, 'state', self.state)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.state.close()
+        self.tmp.cleanup()
+
+    def deliver(self, run_id, tests):
+        with open(f'tests-{run_id}.txt', 'w') as f:
+            f.write(tests)
+        payload = {'repository': 'owner/app', 'branch': 'main', 'commit': f'{run_id:040d}',
+                   'run_id': run_id, 'workflow': 'Flutter CI'}
+        with mock.patch.object(vscode_webhook_server, 'fetch_reports_for_feedback',
+                               return_value={'tests.txt': os.path.abspath(f'tests-{run_id}.txt')}), \
+                contextlib.redirect_stdout(io.StringIO()):
+            vscode_webhook_server.generate_agent_feedback(payload)
+        get_writer().flush()
+        with open('AGENT_FEEDBACK.md', encoding='utf-8') as f:
+            return f.read()
+
+    def test_same_failures_leave_feedback_as_is(self):
+        first = self.deliver(1, FAILING_TEST)
+        self.assertIn("Failures (first run recorded for this branch)", first)
+        self.assertIn("EventProvider loads events", first)
+        os.utime('AGENT_FEEDBACK.md', (0, 0))
+        self.assertEqual(self.deliver(2, FAILING_TEST), first)
+        self.assertEqual(os.stat('AGENT_FEEDBACK.md').st_mtime, 0)
+
+    def test_changed_failures_rewrite_feedback(self):
+        self.deliver(1, FAILING_TEST)
+        second = self.deliver(2, FAILING_TEST + ANALYZER_ERROR)
+        self.assertIn("New since run 1 (1)", second)
+        self.assertIn("Still failing (1)", second)
+
+
+if __name__ == '__main__':
+    unittest.main()
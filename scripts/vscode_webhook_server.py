@@ -4,17 +4,211 @@ VS Code Webhook Server for Amp Integration
 Runs a local webhook endpoint that Amp can interact with for CI feedback
 """
 
+import argparse
+import hashlib
 import json
-import os
 import sys
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from datetime import datetime
 import threading
 import time
 
+import metrics
+from artifact_fetcher import fetch_reports_for_feedback, render_artifact_reports, run_id_from_payload
+from auto_ci_feedback import render_failure_delta, sections_unchanged
+from emit_annotations import collect_failures
+from feedback_writer import get_writer
+from github_client import DEFAULT_REPO
+from lcov_report import coverage_feedback
+from run_state import RunStateStore, DEFAULT_STATE_DB, get_state_store
+from suite_profiler import performance_feedback
+
+DEFAULT_PORT = 8080
+DEFAULT_QUEUE_DEPTH = 32
+DEFAULT_WORKERS = 2
+MAX_BATCH_ITEMS = 10000
+
+
+class FeedbackQueue:
+    """Bounded background queue that keeps only the newest payload per branch"""
+
+    def __init__(self, process, max_depth=DEFAULT_QUEUE_DEPTH, workers=DEFAULT_WORKERS):
+        self.process = process
+        self.max_depth = max_depth
+        self.worker_count = workers
+        self._pending = OrderedDict()  # branch -> newest payload
+        self._active = set()  # branches currently being processed
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+    def submit(self, payload):
+        """Queue a payload, replacing any older one for the same branch.
+
+        Returns False when the queue is full and the payload was rejected.
+        """
+        branch = payload.get('branch', 'Unknown')
+        with self._cond:
+            if branch in self._pending:
+                # Newer delivery supersedes the queued one but keeps its slot
+                self._pending[branch] = payload
+                return True
+            if len(self._pending) >= self.max_depth:
+                return False
+            self._pending[branch] = payload
+            self._cond.notify()
+            return True
+
+    def depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def start(self):
+        for i in range(self.worker_count):
+            thread = threading.Thread(target=self._worker, name=f"feedback-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """Let workers drain the queue, then stop them"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _next_branch(self):
+        # Skip branches a worker is already rendering so one branch is never written concurrently
+        for branch in self._pending:
+            if branch not in self._active:
+                return branch
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                branch = self._next_branch()
+                while branch is None:
+                    if self._stopping and not self._pending:
+                        return
+                    self._cond.wait()
+                    branch = self._next_branch()
+                payload = self._pending.pop(branch)
+                self._active.add(branch)
+            try:
+                self.process(payload)
+            except Exception as e:
+                print(f"❌ Feedback generation error for {branch}: {e}")
+            finally:
+                with self._cond:
+                    self._active.discard(branch)
+                    self._cond.notify_all()
+
+
+class WebhookHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default backlog of 5 resets connections during delivery bursts
+    request_queue_size = 128
+
+
+def delivery_key(payload, delivery_id=None):
+    """GitHub's delivery id when present, otherwise a digest of the payload"""
+    if delivery_id:
+        return delivery_id
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def iter_body_chunks(rfile, headers, chunk_size=64 * 1024):
+    """Yield the raw request body, honouring Content-Length or chunked transfer encoding"""
+    if headers.get('Transfer-Encoding', '').lower() == 'chunked':
+        while True:
+            size_line = rfile.readline(1024)
+            size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+            if size == 0:
+                # Skip optional trailers up to the terminating blank line
+                while rfile.readline(1024) not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            yield rfile.read(size)
+            rfile.readline(2)
+    remaining = int(headers.get('Content-Length') or 0)
+    while remaining > 0:
+        chunk = rfile.read(min(chunk_size, remaining))
+        if not chunk:
+            return
+        remaining -= len(chunk)
+        yield chunk
+
+
+def iter_batch_items(chunks):
+    """Yield (payload, error) per item of a JSON array or NDJSON body.
+
+    NDJSON bodies are split and decoded one line at a time as chunks arrive.
+    """
+    chunks = iter(chunks)
+    first = b''
+    for chunk in chunks:
+        first += chunk
+        if first.strip():
+            break
+    if first.lstrip().startswith(b'['):
+        body = first + b''.join(chunks)
+        try:
+            items = json.loads(body.decode('utf-8'))
+        except ValueError as e:
+            yield None, f"invalid JSON array: {e}"
+            return
+        for item in items:
+            yield item, None
+        return
+
+    buffer = bytearray(first)
+    while True:
+        newline = buffer.find(b'\n')
+        if newline < 0:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            buffer += chunk
+            continue
+        line = bytes(buffer[:newline])
+        del buffer[:newline + 1]
+        if line.strip():
+            yield _decode_line(line)
+    if buffer.strip():
+        yield _decode_line(bytes(buffer))
+
+
+def _decode_line(line):
+    try:
+        return json.loads(line.decode('utf-8')), None
+    except ValueError as e:
+        return None, f"invalid JSON: {e}"
+
+
 class AmpWebhookHandler(BaseHTTPRequestHandler):
+    # Set by start_webhook_server()
+    feedback_queue = None
+    state = None
+
+    def route(self):
+        """Request path without the query string or trailing slash ('/' for the root)"""
+        return self.path.split('?', 1)[0].rstrip('/') or '/'
+
     def do_POST(self):
         """Handle incoming webhook POSTs from GitHub Actions"""
+        route = self.route()
+        with metrics.timer('ci_webhook_request_seconds', method='POST',
+                           path=route if route in ('/', '/batch') else 'other'):
+            if route == '/batch':
+                self.handle_batch()
+            else:
+                self.handle_single()
+
+    def handle_single(self):
+        """Accept one JSON payload"""
         try:
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
@@ -22,42 +216,200 @@ class AmpWebhookHandler(BaseHTTPRequestHandler):
             
             print(f"🔔 Webhook received: {payload.get('message', 'Unknown')}")
             
-            # Generate agent feedback
-            self.generate_agent_feedback(payload)
+            # Redelivered webhooks have already been handled
+            key = delivery_key(payload, self.headers.get('X-GitHub-Delivery'))
+            if self.state.seen_delivery(key):
+                self.send_json(200, {
+                    "status": "duplicate",
+                    "message": "Delivery already processed"
+                })
+                return
             
-            # Send success response
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({
-                "status": "success", 
-                "message": "Agent feedback generated"
-            }).encode())
+            # Hand feedback generation to the background workers and answer immediately
+            if not self.feedback_queue.submit(payload):
+                # Let the sender's retry through
+                self.state.forget_delivery(key)
+                self.send_json(503, {
+                    "status": "busy",
+                    "message": "Feedback queue is full, retry later"
+                }, extra_headers={'Retry-After': '5'})
+                return
+            
+            self.send_json(202, {
+                "status": "accepted",
+                "message": "Agent feedback queued"
+            })
             
         except Exception as e:
             print(f"❌ Webhook error: {e}")
             self.send_response(500)
             self.end_headers()
     
+    def handle_batch(self):
+        """Accept a JSON array or NDJSON stream of payloads at POST /batch.
+
+        Events are folded into one feedback render per branch (the newest event
+        wins) and the response lists a result for every item in order.
+        """
+        try:
+            results = []
+            folded = OrderedDict()  # branch -> (newest payload, item indexes, delivery keys)
+            for index, (payload, error) in enumerate(iter_batch_items(iter_body_chunks(self.rfile, self.headers))):
+                if index >= MAX_BATCH_ITEMS:
+                    results.append({"index": index, "status": "rejected", "error": "batch too large"})
+                    # The rest of the body is left unread, so this connection can't be reused
+                    self.close_connection = True
+                    break
+                if error is None and not isinstance(payload, dict):
+                    error = "item is not a JSON object"
+                if error:
+                    results.append({"index": index, "status": "invalid", "error": error})
+                    continue
+                branch = payload.get('branch', 'Unknown')
+                result = {"index": index, "branch": branch}
+                results.append(result)
+                key = delivery_key(payload, payload.get('delivery_id'))
+                if self.state.seen_delivery(key):
+                    result["status"] = "duplicate"
+                    continue
+                entry = folded.setdefault(branch, [None, [], []])
+                entry[0] = payload
+                entry[1].append(index)
+                entry[2].append(key)
+            
+            statuses = {}
+            for branch, (payload, indexes, keys) in folded.items():
+                if len(indexes) > 1:
+                    payload = dict(payload, folded_events=len(indexes))
+                accepted = self.feedback_queue.submit(payload)
+                if not accepted:
+                    # Let the sender's retry through
+                    for key in keys:
+                        self.state.forget_delivery(key)
+                for index in indexes:
+                    statuses[index] = "busy" if not accepted else ("accepted" if index == indexes[-1] else "folded")
+            for result in results:
+                if result["index"] in statuses:
+                    result["status"] = statuses[result["index"]]
+            
+            counts = {}
+            for result in results:
+                counts[result["status"]] = counts.get(result["status"], 0) + 1
+            print(f"📦 Batch received: {len(results)} event(s), {len(folded)} branch render(s) {counts}")
+            
+            body = {"results": results, "counts": counts, "renders": len(folded)}
+            if counts.get("accepted"):
+                self.send_json(202, body)
+            elif counts.get("busy"):
+                self.send_json(503, body, extra_headers={'Retry-After': '5'})
+            elif results and counts.get("invalid", 0) + counts.get("rejected", 0) == len(results):
+                self.send_json(400, body)
+            else:
+                self.send_json(200, body)
+        
+        except Exception as e:
+            print(f"❌ Batch webhook error: {e}")
+            self.send_json(500, {"status": "error", "message": str(e)})
+    
     def do_GET(self):
-        """Health check endpoint"""
+        """Health check and metrics endpoints"""
+        route = self.route()
+        with metrics.timer('ci_webhook_request_seconds', method='GET',
+                           path=route if route in ('/', '/metrics', '/metrics.json') else 'other'):
+            if route == '/metrics':
+                self.send_text(200, metrics.REGISTRY.render_prometheus(), 'text/plain; version=0.0.4')
+            elif route == '/metrics.json':
+                self.send_json(200, metrics.REGISTRY.to_dict())
+            else:
+                self.send_health()
+
+    def send_health(self):
         self.send_response(200)
         self.send_header('Content-type', 'text/html')
         self.end_headers()
-        html_response = """
+        html_response = f"""
         <html><body>
         <h2>Amp Webhook Server Running</h2>
         <p>EventFlow CI integration active!</p>
         <p>Ready to receive GitHub Actions failure notifications.</p>
+        <p>Queued feedback jobs: {self.feedback_queue.depth()}</p>
         </body></html>
         """
         self.wfile.write(html_response.encode('utf-8'))
     
-    def generate_agent_feedback(self, payload):
-        """Generate structured feedback for Amp"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
-        
-        feedback = f"""# 🚨 Live CI Failure - Amp Action Required
+    def send_text(self, code, text, content_type):
+        data = text.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def send_json(self, code, body, extra_headers=None):
+        """Send a JSON response with the given status code"""
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        """Custom logging for cleaner output"""
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {format % args}")
+
+
+@metrics.timed('ci_feedback_render_seconds', generator='webhook_server')
+def generate_agent_feedback(payload):
+    """Generate structured feedback for Amp"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+    folded = ""
+    if payload.get('folded_events', 1) > 1:
+        folded = f"**Events folded into this report**: {payload['folded_events']} (showing the newest)\n"
+    
+    repo = payload.get('repository') or DEFAULT_REPO
+    scope = f"{repo}@{payload.get('branch')}"
+    run = run_id_from_payload(payload) or payload.get('commit')
+    
+    # Downloaded at most once per artifact id, however many deliveries mention the run
+    artifacts = fetch_reports_for_feedback(repo, run_id_from_payload(payload))
+    
+    # Failures in the run's report files, compared with the branch's previous run
+    delta = None
+    reports = [artifacts[name] for name in ('analysis.txt', 'tests.txt') if artifacts.get(name)]
+    if reports and run:
+        delta = (AmpWebhookHandler.state or get_state_store()).record_failure_set(scope, run, collect_failures(reports))
+    
+    coverage_section = performance_section = ""
+    if artifacts.get('lcov.info'):
+        coverage = coverage_feedback(artifacts['lcov.info'], scope, run_id_from_payload(payload))
+        if coverage:
+            coverage_section = f"\n## 📈 Coverage\n{coverage}"
+    if artifacts.get('test_results.json'):
+        performance = performance_feedback([artifacts['test_results.json']], scope, run_id_from_payload(payload))
+        if performance:
+            performance_section = f"\n## 🐢 Performance Regressions\n{performance}"
+    
+    # Existing feedback already describes this failure set
+    if delta is not None and not delta.changed and \
+            sections_unchanged('AGENT_FEEDBACK.md', coverage_section, performance_section):
+        print(f"⏭️  Same {len(delta.current)} failure(s) as run {delta.previous_run} - AGENT_FEEDBACK.md left as is")
+        return
+    
+    if artifacts:
+        artifact_steps = "1. **Review the CI test reports** below (downloaded from the run's artifacts)\n" \
+                         "2. **Check the failing tests** in tests.txt\n" \
+                         "3. **Review analysis.txt** for static analysis issues"
+    else:
+        artifact_steps = f"""1. **Download GitHub Actions artifacts** from: {payload.get('artifacts_url', 'Check GitHub Actions')}
+2. **Check test_reports/failures.txt** for specific test failures
+3. **Review test_reports/analysis.txt** for static analysis issues"""
+    
+    failures = f"\n{render_failure_delta(delta)}" if delta is not None else ""
+    
+    feedback = f"""# 🚨 Live CI Failure - Amp Action Required
 
 ## Webhook Notification - {timestamp}
 
@@ -66,16 +418,14 @@ class AmpWebhookHandler(BaseHTTPRequestHandler):
 **Commit**: {payload.get('commit', 'Unknown')[:8]}
 **Workflow**: {payload.get('workflow', 'Unknown')}
 **Status**: {payload.get('status', 'failed')}
-
+{folded}
 ## 🤖 Automated Detection
 
 This failure was detected by GitHub Actions and automatically reported via webhook integration.
-
+{failures}
 ## 🎯 Immediate Actions for Amp
 
-1. **Download GitHub Actions artifacts** from: {payload.get('artifacts_url', 'Check GitHub Actions')}
-2. **Check test_reports/failures.txt** for specific test failures
-3. **Review test_reports/analysis.txt** for static analysis issues
+{artifact_steps}
 4. **Fix failing tests** using the error messages provided
 5. **Run tests locally** to verify fixes: `flutter test`
 6. **Push fixes** and monitor next CI run
@@ -88,17 +438,19 @@ This failure was detected by GitHub Actions and automatically reported via webho
 
 **Amp**: Please read the failure details and fix the issues systematically.
 """
-        
-        # Write feedback file for Amp to read
-        with open('AGENT_FEEDBACK.md', 'w') as f:
-            f.write(feedback)
-        
-        print(f"✅ Agent feedback generated: AGENT_FEEDBACK.md")
-        print(f"📋 Amp can now read and fix the CI failures!")
-        
-        # Create VS Code notification file
-        with open('.vscode/amp_notification.md', 'w') as f:
-            f.write(f"""# 🚨 Amp: CI Failure Detected
+    if artifacts:
+        feedback += f"\n## 📦 CI Test Reports\n\n{render_artifact_reports(artifacts)}"
+    feedback += coverage_section + performance_section
+    
+    # Write feedback file for Amp to read; bursts of deliveries coalesce into one write
+    writer = get_writer()
+    writer.write('AGENT_FEEDBACK.md', feedback)
+    
+    print(f"✅ Agent feedback generated: AGENT_FEEDBACK.md")
+    print(f"📋 Amp can now read and fix the CI failures!")
+    
+    # Create VS Code notification file
+    writer.write('.vscode/amp_notification.md', f"""# 🚨 Amp: CI Failure Detected
 
 {payload.get('message', 'CI tests failed')}
 
@@ -106,18 +458,25 @@ This failure was detected by GitHub Actions and automatically reported via webho
 
 Time: {timestamp}
 """)
-    
-    def log_message(self, format, *args):
-        """Custom logging for cleaner output"""
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] {format % args}")
 
-def start_webhook_server():
+
+def start_webhook_server(port=DEFAULT_PORT, queue_depth=DEFAULT_QUEUE_DEPTH, workers=DEFAULT_WORKERS,
+                         state_db=DEFAULT_STATE_DB, collect_metrics=True):
     """Start the webhook server for Amp integration"""
-    port = 8080
-    server = HTTPServer(('localhost', port), AmpWebhookHandler)
+    if collect_metrics:
+        metrics.enable()
+    feedback_queue = FeedbackQueue(generate_agent_feedback, max_depth=queue_depth, workers=workers)
+    feedback_queue.start()
+    AmpWebhookHandler.feedback_queue = feedback_queue
+    AmpWebhookHandler.state = RunStateStore(state_db)
+    
+    server = WebhookHTTPServer(('localhost', port), AmpWebhookHandler)
     
     print(f"🚀 Amp Webhook Server starting on http://localhost:{port}")
     print(f"🔗 Configure GitHub webhook to POST to this URL")
+    print(f"⚙️  Feedback queue: depth {queue_depth}, {workers} worker(s)")
+    if collect_metrics:
+        print(f"📈 Metrics at http://localhost:{port}/metrics (JSON: /metrics.json)")
     print(f"📡 Ready to receive CI failure notifications for Amp...")
     print(f"🛑 Press Ctrl+C to stop")
     
@@ -125,7 +484,26 @@ def start_webhook_server():
         server.serve_forever()
     except KeyboardInterrupt:
         print(f"\n🛑 Webhook server stopped")
-        server.shutdown()
+    finally:
+        server.server_close()
+        feedback_queue.stop()
+        get_writer().flush()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local webhook server for Amp CI feedback")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument('--queue-depth', type=int, default=DEFAULT_QUEUE_DEPTH,
+                        help="maximum number of branches waiting for feedback generation")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="number of background feedback workers")
+    parser.add_argument('--state-db', default=DEFAULT_STATE_DB,
+                        help="SQLite file used to drop duplicate deliveries across restarts")
+    parser.add_argument('--no-metrics', action='store_true', help="disable the /metrics endpoint and timing hooks")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    start_webhook_server()
+    args = parse_args()
+    start_webhook_server(args.port, args.queue_depth, args.workers, args.state_db, not args.no_metrics)